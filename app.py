@@ -1,67 +1,1037 @@
+import functools
+import hashlib
+import io
+import json
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, send_file
-from werkzeug.utils import secure_filename
-from utils.converter import convert_to_markdown
+import shutil
 import tempfile
+import threading
+import uuid
+import zipfile
+from flask import Flask, Request, Response, g, render_template, request, jsonify, send_file
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
+from utils.batch import BatchError, BatchItem, iter_results, ndjson_lines, zip_chunks, zip_items
+from utils.cache import ResultCache, make_key
+from utils.compression import DEFAULT_MIN_BYTES, compress, negotiate_encoding
+from utils.converter import ALLOWED_EXTENSIONS, allowed_file, convert_stream_to_markdown, describes_images, image_pipeline, warm_up
+from utils.images import IMAGE_EXTENSIONS, IMAGE_MODES, ImageOptionError
+from utils.jobs import DONE, FAILED, JobManager, QueueFullError
+from utils.logs import configure_logging, set_request_id
+from utils.markup import MarkupLimitError
+from utils.metrics import SlowRequestProfiler, finish_request, record_conversion, registry, request_seconds, start_request, timed
+from utils.pdf_pages import PageRangeError, convert_pages, count_pages, parse_page_ranges, source_for
+from utils.pool import DEFAULT_TIMEOUT, ConversionTimeout, ProcessPool
+from utils.results import DEFAULT_CHUNK_BYTES, ResultNotFound, ResultStore, ResultStoreError
+from utils.resumable import UploadIncomplete, UploadNotFound, UploadSessionError, UploadSessions
+from utils.scheduler import PRIORITIES, Scheduler, SchedulerFull
+from utils.sniffing import ContentMismatch, check_upload
+from utils.streaming import iter_markdown
+from utils.tables import STREAM_MIN_BYTES, TABULAR_EXTENSIONS, TableOptionError, TableOptions, iter_table_markdown
+from utils.uploads import ByteBudget, UploadLimits, UploadTooLarge, format_size
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configured once per process from FILE2MD_LOG_LEVEL / FILE2MD_LOG_FORMAT; records are written off-thread
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Uploads up to this size are buffered in memory; larger ones spill to a temp file
+UPLOAD_MEMORY_LIMIT = int(os.getenv('FILE2MD_UPLOAD_MEMORY_LIMIT', 4 * 1024 * 1024))
+
+# Request and per-format upload caps, and the upload bytes one worker admits at once
+upload_limits = UploadLimits.from_env()
+upload_budget = ByteBudget.from_env()
+
+# "strict" refuses uploads whose content contradicts their extension, "log" only counts them, "off" skips sniffing
+SNIFF_MODE = os.getenv('FILE2MD_SNIFF', 'strict')
+
+# Endpoints whose body carries a single document, so the request length is the file size
+SINGLE_FILE_ENDPOINTS = {'convert', 'submit_job'}
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in SINGLE_FILE_ENDPOINTS and filename:
+            # Reject before the file part is read instead of after buffering it
+            try:
+                upload_limits.check(filename, total_content_length)
+            except UploadTooLarge as e:
+                raise RequestEntityTooLarge(str(e))
+        if total_content_length is not None and total_content_length <= UPLOAD_MEMORY_LIMIT:
+            return io.BytesIO()
+        return tempfile.TemporaryFile('w+b')
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.secret_key = "markitdown-converter-secret-key"
+# Werkzeug answers 413 from Content-Length before reading the body
+app.config['MAX_CONTENT_LENGTH'] = upload_limits.max_upload or None
+
+def _behind_proxies(wsgi_app, hops):
+    """
+    Trust ``X-Forwarded-For`` and ``X-Forwarded-Proto`` from ``hops`` reverse proxies.
+    """
+    return ProxyFix(wsgi_app, x_for=hops, x_proto=hops) if hops else wsgi_app
+
+# Reverse proxies in front of the app; without them every client behind a proxy shares its address
+TRUSTED_PROXIES = int(os.getenv('FILE2MD_TRUSTED_PROXIES', 0))
+app.wsgi_app = _behind_proxies(app.wsgi_app, TRUSTED_PROXIES)
+
+# "thread" converts inside the web worker; "process" hands conversions to a process pool
+CONVERSION_BACKEND = os.getenv('FILE2MD_BACKEND', 'thread')
+process_pool = ProcessPool.from_env() if CONVERSION_BACKEND == 'process' else None
+
+# "lazy" loads the conversion engine on the first request; "eager" loads it at import;
+# "preload" loads it in a pre-fork master (see gunicorn.conf.py), which starts the pool per worker
+STARTUP_MODE = os.getenv('FILE2MD_STARTUP', 'lazy')
+if STARTUP_MODE in ('eager', 'preload'):
+    warm_up()
+if STARTUP_MODE == 'eager' and process_pool is not None:
+    process_pool.start()
+
+# Conversion results keyed by upload content, shared by all requests in this process
+result_cache = ResultCache.from_env()
+
+# Converted results kept on disk with a section index, served in parts from /results
+result_store = ResultStore.from_env()
+
+# Conversion slots shared fairly between clients, with a fast lane for cheap conversions
+scheduler = Scheduler.from_env()
+
+# Background conversions for large documents submitted through /jobs
+job_manager = JobManager.from_env()
+
+# Chunked, resumable uploads for documents too large to send in one request
+upload_sessions = UploadSessions.from_env()
+chunked_upload_limits = UploadLimits(upload_sessions.max_bytes, upload_limits.format_limits)
+
+# Limits for /batch requests
+BATCH_WORKERS = int(os.getenv('FILE2MD_BATCH_WORKERS', min(4, os.cpu_count() or 1)))
+BATCH_MAX_FILES = int(os.getenv('FILE2MD_BATCH_MAX_FILES', 500))
+BATCH_MAX_UNCOMPRESSED = int(os.getenv('FILE2MD_BATCH_MAX_UNCOMPRESSED', 1024 * 1024 * 1024))
+
+# PDFs with this many pages are converted page by page in parallel chunks, each page cached on its own
+# in page_cache, so one long PDF cannot evict every other client's results
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('FILE2MD_PDF_PARALLEL_MIN_PAGES', 32))
+PDF_CHUNK_PAGES = int(os.getenv('FILE2MD_PDF_CHUNK_PAGES', 8))
+PDF_PAGE_PROCESSES = int(os.getenv('FILE2MD_PDF_PAGE_PROCESSES', os.cpu_count() or 1))
+_page_pool = None
+_page_pool_lock = threading.Lock()
+page_cache = ResultCache(
+    max_entries=int(os.getenv('FILE2MD_PAGE_CACHE_ENTRIES', 1024)),
+    max_bytes=int(os.getenv('FILE2MD_PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    ttl=result_cache.ttl,
+)
+
+# Results smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('FILE2MD_COMPRESS_MIN_BYTES', DEFAULT_MIN_BYTES))
+RESPONSE_FORMATS = ('json', 'markdown', 'download')
+_PRIORITY_ERROR = f'priority must be one of: {", ".join(PRIORITIES)}'
+
+# CSV and XLSX uploads from this size are written row by row instead of through the full converter
+TABLE_STREAM_MIN_BYTES = int(os.getenv('FILE2MD_TABLE_STREAM_MIN_BYTES', STREAM_MIN_BYTES))
 
-# Configure upload settings
-ALLOWED_EXTENSIONS = {
-    'pdf', 'docx', 'pptx', 'xlsx', 
-    'png', 'jpg', 'jpeg', 'gif',
-    'mp3', 'wav', 'html', 'csv', 
-    'json', 'xml'
-}
+# Opt-in cProfile dumps for slow requests (FILE2MD_PROFILE_DIR)
+profiler = SlowRequestProfiler.from_env()
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def _collect_gauges():
+    gauges = {}
+    for name, value in result_cache.stats().items():
+        gauges[f'file2md_cache_{name}'] = (f'Result cache {name.replace("_", " ")}.', value)
+    for name, value in page_cache.stats().items():
+        gauges[f'file2md_page_cache_{name}'] = (f'PDF page cache {name.replace("_", " ")}.', value)
+    for name, value in job_manager.stats().items():
+        gauges[f'file2md_jobs_{name}'] = (f'Background jobs {name.replace("_", " ")}.', value)
+    if process_pool is not None:
+        for name, value in process_pool.stats().items():
+            gauges[f'file2md_pool_{name}'] = (f'Process pool {name.replace("_", " ")}.', value)
+    for name, value in scheduler.stats().items():
+        gauges[f'file2md_scheduler_{name}'] = (f'Conversion scheduler {name.replace("_", " ")}.', value)
+    for name, value in upload_budget.stats().items():
+        gauges[f'file2md_uploads_{name}'] = (f'Upload admission {name.replace("_", " ")}.', value)
+    for name, value in image_pipeline.cache.stats().items():
+        gauges[f'file2md_image_cache_{name}'] = (f'Normalised image cache {name.replace("_", " ")}.', value)
+    return gauges
+
+registry.add_collector(_collect_gauges)
+
+@app.before_request
+def _start_timing():
+    # Reuse a proxy's request id so its access log and ours can be joined
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    set_request_id(g.request_id)
+    start_request()
+    g.profile = profiler.start() if profiler else None
+
+@app.after_request
+def _finish_timing(response):
+    timings = finish_request()
+    if timings is None:
+        return response
+    duration = timings.total()
+    response.headers['Server-Timing'] = timings.server_timing()
+    response.headers['X-Request-ID'] = g.request_id
+    logger.info(
+        '%s %s %s', request.method, request.path, response.status_code,
+        extra={
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'stages_ms': {stage: round(seconds * 1000, 1) for stage, seconds in timings.merged().items()},
+        },
+    )
+    request_seconds.observe(
+        duration,
+        endpoint=request.endpoint or 'unmatched',
+        method=request.method,
+        status=response.status_code,
+    )
+    if profiler:
+        profiler.stop(g.pop('profile', None), f'{request.method} {request.path}', duration)
+    return response
+
+@app.before_request
+def _admit_upload():
+    """
+    Refuse uploads while this worker already holds too many upload bytes.
+    """
+    if request.method not in ('POST', 'PUT'):
+        return None
+    size = request.content_length
+    if size is None:
+        if request.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            return None
+        # Without a length, assume the worst case the request cap allows
+        size = upload_limits.max_upload
+    if not size:
+        return None
+    reservation = upload_budget.try_reserve(size)
+    if reservation is None:
+        response = jsonify({'error': 'Server is busy with other uploads, try again shortly'})
+        return response, 503, {'Retry-After': '1'}
+    g.upload_reservation = reservation
+    return None
+
+@app.after_request
+def _release_upload_on_close(response):
+    reservation = g.pop('upload_reservation', None)
+    if reservation is not None:
+        # Streamed responses read the upload after this hook, so hold it until the body is sent
+        response.call_on_close(reservation.release)
+    return response
+
+@app.teardown_request
+def _release_upload(exc):
+    reservation = g.pop('upload_reservation', None)
+    if reservation is not None:
+        reservation.release()
+
+@app.teardown_request
+def _clear_request_id(exc):
+    set_request_id(None)
+
+@app.errorhandler(RequestEntityTooLarge)
+def _upload_too_large(e):
+    message = e.description
+    if message == RequestEntityTooLarge.description:
+        message = f'Upload is larger than the {format_size(upload_limits.max_upload)} limit'
+    return jsonify({'error': message}), 413
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/convert', methods=['POST'])
-def convert():
+def _response_format():
+    """
+    Return how to send the result: ``json`` (the default envelope), raw
+    ``markdown`` or a ``download`` attachment, from ``format`` or the Accept
+    header. Returns ``None`` for an unknown ``format``.
+    """
+    response_format = request.values.get('format')
+    if response_format:
+        return response_format if response_format in RESPONSE_FORMATS else None
+    if request.accept_mimetypes.best_match(['application/json', 'text/markdown']) == 'text/markdown':
+        return 'markdown'
+    return 'json'
+
+def _client_id():
+    """
+    Identify the caller for scheduling: a hash of its ``X-API-Key`` when it
+    sends one, otherwise its address (the forwarded one behind
+    ``FILE2MD_TRUSTED_PROXIES``).
+    """
+    api_key = request.headers.get('X-API-Key')
+    if api_key:
+        return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    return 'ip:' + (request.remote_addr or 'unknown')
+
+def _priority():
+    """
+    Return the scheduling priority from ``X-Priority`` or ``priority``
+    (``low``, ``normal`` or ``high``), or ``None`` for an unknown one.
+    """
+    priority = request.headers.get('X-Priority') or request.values.get('priority') or 'normal'
+    return PRIORITIES.get(priority.lower())
+
+def _markdown_filename(filename):
+    return (filename.rsplit('.', 1)[0] if '.' in filename else filename) + '.md'
+
+def _conversion_response(markdown_content, cache_status, cache_key=None, filename=None, response_format='json'):
+    """
+    Serialise a result in the negotiated format and content coding.
+
+    The result is also written to the result store, and its id is returned
+    in ``X-Result-ID`` (and in the JSON body) for the ``/results`` endpoints.
+
+    Compressed bodies are stored in the result cache next to the markdown,
+    under ``cache_key`` plus the body format and coding, so a hit is sent
+    without recompressing.
+    """
+    body_format = 'json' if response_format == 'json' else 'markdown'
+    result_id = _store_result(markdown_content)
+    with timed('serialize'):
+        if body_format == 'json':
+            payload = {'success': True, 'markdown': markdown_content}
+            if result_id:
+                payload.update(result_id=result_id, toc_url=f'/results/{result_id}/toc')
+            body = app.json.dumps(payload).encode('utf-8') + b'\n'
+        else:
+            body = markdown_content.encode('utf-8')
+
+    encoding = negotiate_encoding(request.accept_encodings, len(body), COMPRESS_MIN_BYTES)
+    variant = f'{cache_key}.{body_format}.{encoding or "identity"}' if cache_key else None
+    if encoding:
+        with timed('compress'):
+            compressed = result_cache.get(variant) if variant else None
+            if compressed is None:
+                compressed = compress(body, encoding)
+                if variant:
+                    result_cache.set(variant, compressed)
+        body = compressed
+
+    mimetype = 'application/json' if body_format == 'json' else 'text/markdown'
+    if response_format == 'download':
+        response = send_file(
+            io.BytesIO(body),
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=_markdown_filename(filename or 'converted'),
+            etag=variant or False,
+            max_age=0,
+        )
+    else:
+        response = Response(body, mimetype=mimetype)
+        if variant:
+            response.set_etag(variant)
+        response.make_conditional(request)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    if cache_status:
+        response.headers['X-Cache'] = cache_status
+    if result_id:
+        response.headers['X-Result-ID'] = result_id
+    return response
+
+def _store_result(markdown_content):
+    """
+    Keep a result for partial retrieval and return its id, or ``None`` when it is not stored.
+    """
+    try:
+        with timed('store'):
+            return result_store.save(markdown_content)
+    except OSError as e:
+        logger.warning('Could not store result: %s', e)
+        return None
+
+def _extension(filename):
+    return filename.rsplit('.', 1)[1].lower()
+
+def _stream_size(stream):
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+def _uploaded_file():
+    """
+    Return the validated upload and ``None``, or ``None`` and an error response.
+    """
     if 'file' not in request.files:
-        return jsonify({'error': 'No file uploaded'}), 400
-    
+        return None, (jsonify({'error': 'No file uploaded'}), 400)
+
     file = request.files['file']
     if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
+        return None, (jsonify({'error': 'No file selected'}), 400)
+
     if not allowed_file(file.filename):
-        return jsonify({'error': 'File type not supported'}), 400
+        return None, (jsonify({'error': 'File type not supported'}), 400)
+
+    # Catches uploads sent without a Content-Length, which could not be checked up front
+    try:
+        upload_limits.check(file.filename, _stream_size(file.stream))
+    except UploadTooLarge as e:
+        return None, (jsonify({'error': str(e)}), 413)
+
+    # A mislabeled or corrupt file is refused here instead of failing in the wrong parser
+    try:
+        with timed('sniff'):
+            check_upload(file.stream, file.filename, SNIFF_MODE)
+    except ContentMismatch as e:
+        return None, (jsonify({'error': str(e)}), 415)
+
+    return file, None
+
+def _batch_upload_item(file):
+    if not allowed_file(file.filename):
+        return BatchItem(file.filename, error='File type not supported')
+    try:
+        upload_limits.check(file.filename, _stream_size(file.stream))
+    except UploadTooLarge as e:
+        return BatchItem(file.filename, error=str(e))
+    return BatchItem(file.filename, lambda stream=_detach_upload(file): stream)
+
+def _detach_upload(file):
+    """
+    Copy an upload out of the request so it outlives the request context.
+    """
+    if isinstance(file.stream, io.BytesIO):
+        return io.BytesIO(file.stream.getvalue())
+    copy = tempfile.TemporaryFile('w+b')
+    shutil.copyfileobj(file.stream, copy)
+    copy.seek(0)
+    return copy
+
+def _page_selection(file, pages):
+    """
+    Return the PDF page indexes to convert page by page, or ``None`` to
+    convert the upload whole. Raises ``PageRangeError`` for a bad range.
+    """
+    if _extension(file.filename) != 'pdf':
+        if pages:
+            raise PageRangeError('Page ranges are only supported for PDF files')
+        return None
+    if not pages and not PDF_PARALLEL_MIN_PAGES:
+        return None
+    try:
+        page_count = count_pages(file.stream)
+    except Exception as e:
+        if pages:
+            raise PageRangeError(f'Could not read the PDF page tree: {str(e)}')
+        # Leave broken files to the regular converter and its error reporting
+        return None
+    if pages:
+        return parse_page_ranges(pages, page_count)
+    if page_count >= PDF_PARALLEL_MIN_PAGES:
+        return list(range(page_count))
+    return None
+
+def _conversion_options(file):
+    """
+    Read page, table and image options for an upload from the request.
+
+    Returns ``(page_indexes, table_options, image_mode, key_options)``: the
+    PDF pages to convert page by page and the options for the row-by-row
+    table path (each ``None`` when the regular converter should run), the
+    image mode for images, plus the options that set this result apart in
+    the cache. Raises ``PageRangeError``, ``TableOptionError`` or
+    ``ImageOptionError`` for options that do not fit the upload.
+    """
+    pages = request.values.get('pages')
+    page_indexes = _page_selection(file, pages)
+    key_options = {}
+    if pages:
+        key_options['pages'] = ','.join(str(index + 1) for index in page_indexes)
+
+    table_options = TableOptions.parse(
+        request.values.get('max_rows'), request.values.get('sheets'), request.values.get('columns')
+    )
+    tabular = '.' + _extension(file.filename) in TABULAR_EXTENSIONS
+    if table_options.selective:
+        if not tabular:
+            raise TableOptionError('Row, sheet and column options are only supported for CSV and XLSX files')
+        key_options.update(
+            max_rows=table_options.max_rows,
+            sheets=','.join(table_options.sheets or []),
+            columns=','.join(table_options.columns or []),
+        )
+    large = TABLE_STREAM_MIN_BYTES and _stream_size(file.stream) >= TABLE_STREAM_MIN_BYTES
+    if not (tabular and (table_options.selective or large)):
+        table_options = None
+
+    image_mode = request.values.get('image_mode') or None
+    image = '.' + _extension(file.filename) in IMAGE_EXTENSIONS
+    if image_mode is not None:
+        if image_mode not in IMAGE_MODES:
+            raise ImageOptionError(f'Invalid image mode: {image_mode!r}')
+        if not image:
+            raise ImageOptionError('image_mode is only supported for image files')
+    if image:
+        image_mode = image_mode or image_pipeline.mode
+        key_options['image_mode'] = image_mode
+    return page_indexes, table_options, image_mode, key_options
+
+def _cache_keys(stream, extension, key_options):
+    """
+    Return the result cache key and the document key pages are cached under.
+    """
+    doc_key = make_key(stream, extension)
+    if not key_options:
+        return doc_key, doc_key
+    return make_key(doc_key.encode(), extension, **key_options), doc_key
+
+def _pdf_page_runner():
+    """
+    Return a ``(run, workers)`` pair that converts page chunks in worker processes.
+    """
+    global _page_pool
+    if process_pool is not None:
+        return process_pool.run, process_pool.processes
+    with _page_pool_lock:
+        if _page_pool is None:
+            # Page workers only need pdfminer, so they skip the full engine warm-up
+            _page_pool = ProcessPool(
+                processes=PDF_PAGE_PROCESSES,
+                timeout=float(os.getenv('FILE2MD_POOL_TIMEOUT', DEFAULT_TIMEOUT)),
+                warm=False,
+            )
+    return _page_pool.run, _page_pool.processes
+
+def _convert_pdf_pages(stream, page_indexes, doc_key):
+    run, workers = None, 1
+    if len(page_indexes) > PDF_CHUNK_PAGES:
+        run, workers = _pdf_page_runner()
+    source, cleanup = source_for(stream)
+    try:
+        with timed('convert'):
+            markdown_content, _ = convert_pages(
+                source,
+                page_indexes,
+                run=run,
+                cache=page_cache,
+                page_key=lambda index: make_key(doc_key.encode(), 'pdf', page=index),
+                chunk_pages=PDF_CHUNK_PAGES,
+                workers=workers,
+            )
+    finally:
+        cleanup()
+    return markdown_content
+
+def _convert_upload(
+    stream, filename, page_indexes=None, doc_key=None, table_options=None, image_mode=None,
+    client=None, priority=0, background=False,
+):
+    """
+    Convert an upload once the scheduler grants ``client`` a slot. Raises
+    ``SchedulerFull`` when the client may not queue another conversion.
+    """
+    extension = _extension(filename)
+    size = _stream_size(stream)
+    with scheduler.slot(client or 'anonymous', '.' + extension, size, priority, background):
+        try:
+            if page_indexes is not None:
+                markdown_content = _convert_pdf_pages(stream, page_indexes, doc_key)
+            elif table_options is not None:
+                with timed('convert'):
+                    markdown_content = ''.join(iter_table_markdown(stream, filename, table_options))
+            elif image_mode == 'metadata' or (image_mode and not describes_images()):
+                # Reads only the image header, cheaper than a round trip to a worker; without an LLM client
+                # full mode reads nothing more
+                markdown_content = convert_stream_to_markdown(stream, filename, image_mode=image_mode)
+            elif process_pool is not None:
+                # The worker's own stage timings stay in the worker, so time the round trip here
+                with timed('convert'):
+                    markdown_content = process_pool.convert_stream(stream, filename, image_mode)
+            else:
+                markdown_content = convert_stream_to_markdown(stream, filename, image_mode=image_mode)
+        except Exception:
+            record_conversion(extension, 'error', size)
+            raise
+    record_conversion(extension, 'success', size, len(markdown_content.encode('utf-8')))
+    return markdown_content
+
+def _convert_cached(stream, filename, client=None, priority=0):
+    check_upload(stream, filename, SNIFF_MODE)
+    extension = _extension(filename)
+    cache_key = make_key(stream, extension)
+    markdown_content = result_cache.get(cache_key)
+    if markdown_content is None:
+        markdown_content = _convert_upload(stream, filename, client=client, priority=priority, background=True)
+        result_cache.set(cache_key, markdown_content)
+    else:
+        record_conversion(extension, 'cache_hit')
+    return markdown_content
+
+def _convert_job(
+    stream, filename, cache_key, page_indexes=None, doc_key=None, table_options=None, image_mode=None,
+    client=None, priority=0,
+):
+    try:
+        markdown_content = _convert_upload(
+            stream, filename, page_indexes, doc_key, table_options, image_mode, client, priority, background=True
+        )
+    finally:
+        stream.close()
+    result_cache.set(cache_key, markdown_content)
+    return markdown_content
+
+def _job_links(job):
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/jobs/{job.id}',
+        'result_url': f'/jobs/{job.id}/result',
+    }
+
+def _stream_mode():
+    """
+    Return 'sse', 'chunked' or None depending on how the client asked for output.
+    """
+    mode = request.args.get('stream', '').lower()
+    if mode in ('sse', 'events') or request.accept_mimetypes.best == 'text/event-stream':
+        return 'sse'
+    if mode in ('1', 'true', 'chunked'):
+        return 'chunked'
+    return None
+
+def _sse_events(chunks):
+    count = 0
+    try:
+        for chunk in chunks:
+            yield f"event: chunk\ndata: {json.dumps({'index': count, 'markdown': chunk})}\n\n"
+            count += 1
+    except Exception as e:
+        logger.error('Streaming conversion error: %s', e)
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        return
+    yield f"event: done\ndata: {json.dumps({'chunks': count})}\n\n"
 
+def _plain_chunks(chunks):
     try:
-        # Create temp directory for processing
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Save uploaded file
-            temp_file_path = os.path.join(temp_dir, secure_filename(file.filename))
-            file.save(temp_file_path)
-            
-            # Convert file to markdown
-            markdown_content = convert_to_markdown(temp_file_path)
-            
-            # Create temporary markdown file
-            output_path = os.path.join(temp_dir, 'converted.md')
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
-            
-            return jsonify({
-                'success': True,
-                'markdown': markdown_content
-            })
-    
+        for chunk in chunks:
+            yield chunk
     except Exception as e:
-        logger.error(f"Conversion error: {str(e)}")
+        # Headers are already sent, so the error can only be logged and the body cut short
+        logger.error('Streaming conversion error: %s', e)
+
+def _iter_detached(stream, filename, pages=None, table_options=None, image_mode=None, ticket=None):
+    try:
+        for chunk in iter_markdown(stream, filename, pages, table_options, image_mode):
+            yield chunk
+    finally:
+        scheduler.release(ticket)
+        stream.close()
+
+def _streaming_response(file, mode, cached, pages=None, table_options=None, image_mode=None, priority=0):
+    """
+    Stream the markdown of an upload. The scheduler slot is taken before the
+    response starts, under the client's usual quota and wait limit, so
+    ``SchedulerFull`` can still become a 429; it is held until the
+    conversion finishes or the response is closed.
+    """
+    ticket = None
+    stream = None
+    if cached is not None:
+        chunks = iter([cached])
+        cache_status = 'HIT'
+    else:
+        ticket = scheduler.acquire(_client_id(), '.' + _extension(file.filename), _stream_size(file.stream), priority)
+        try:
+            # Detach the upload because the body is produced after the request is torn down
+            stream = _detach_upload(file)
+        except Exception:
+            scheduler.release(ticket)
+            raise
+        chunks = _iter_detached(stream, file.filename, pages, table_options, image_mode, ticket)
+        cache_status = 'MISS'
+
+    if mode == 'sse':
+        response = Response(_sse_events(chunks), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response = Response(_plain_chunks(chunks), mimetype='text/markdown')
+    response.headers['X-Cache'] = cache_status
+    response.headers['X-Accel-Buffering'] = 'no'
+    if stream is not None:
+        # Runs even when the client goes away before the body is iterated, which skips the generator's cleanup
+        response.call_on_close(stream.close)
+        response.call_on_close(functools.partial(scheduler.release, ticket))
+    return response
+
+@app.route('/convert', methods=['POST'])
+def convert():
+    with timed('upload'):
+        file, error = _uploaded_file()
+    if error:
+        return error
+
+    try:
+        page_indexes, table_options, image_mode, key_options = _conversion_options(file)
+    except (PageRangeError, TableOptionError, ImageOptionError) as e:
+        return jsonify({'error': str(e)}), 400
+    response_format = _response_format()
+    if response_format is None:
+        return jsonify({'error': f'format must be one of: {", ".join(RESPONSE_FORMATS)}'}), 400
+    priority = _priority()
+    if priority is None:
+        return jsonify({'error': _PRIORITY_ERROR}), 400
+
+    try:
+        extension = _extension(file.filename)
+        with timed('hash'):
+            cache_key, doc_key = _cache_keys(file.stream, extension, key_options)
+
+        with timed('cache'):
+            markdown_content = result_cache.get(cache_key)
+        stream_mode = _stream_mode()
+        if stream_mode:
+            return _streaming_response(
+                file, stream_mode, markdown_content, request.values.get('pages'), table_options, image_mode, priority
+            )
+
+        if markdown_content is not None:
+            record_conversion(extension, 'cache_hit')
+            return _conversion_response(markdown_content, 'HIT', cache_key, file.filename, response_format)
+
+        markdown_content = _convert_upload(
+            file.stream, file.filename, page_indexes, doc_key, table_options, image_mode, _client_id(), priority
+        )
+
+        result_cache.set(cache_key, markdown_content)
+        return _conversion_response(markdown_content, 'MISS', cache_key, file.filename, response_format)
+
+    except TableOptionError as e:
+        return jsonify({'error': str(e)}), 400
+
+    except MarkupLimitError as e:
+        return jsonify({'error': str(e)}), 422
+
+    except SchedulerFull as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+
+    except ConversionTimeout as e:
+        logger.error('Conversion timeout: %s', e)
+        return jsonify({'error': str(e)}), 504
+
+    except Exception as e:
+        logger.error('Conversion error: %s', e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/batch', methods=['POST'])
+def convert_batch():
+    uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not uploads:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    output_format = request.args.get('format') or request.form.get('format') or 'ndjson'
+    if output_format not in ('ndjson', 'zip'):
+        return jsonify({'error': 'Unsupported batch format'}), 400
+    priority = _priority()
+    if priority is None:
+        return jsonify({'error': _PRIORITY_ERROR}), 400
+
+    if len(uploads) == 1 and uploads[0].filename.lower().endswith('.zip'):
+        try:
+            archive = zipfile.ZipFile(_detach_upload(uploads[0]))
+            items = zip_items(
+                archive, allowed_file, BATCH_MAX_FILES, BATCH_MAX_UNCOMPRESSED, upload_limits.limit_for
+            )
+        except zipfile.BadZipFile:
+            return jsonify({'error': 'Invalid ZIP archive'}), 400
+        except BatchError as e:
+            return jsonify({'error': str(e)}), 413
+    else:
+        if len(uploads) > BATCH_MAX_FILES:
+            return jsonify({'error': f'Batch contains more than {BATCH_MAX_FILES} files'}), 413
+        items = [_batch_upload_item(f) for f in uploads]
+
+    # Uploads are detached above because the response streams after the request is torn down
+    convert_item = functools.partial(_convert_cached, client=_client_id(), priority=priority)
+    results = iter_results(items, convert_item, BATCH_WORKERS)
+    if output_format == 'zip':
+        return Response(
+            zip_chunks(results),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=converted.zip'},
+        )
+    return Response(ndjson_lines(results), mimetype='application/x-ndjson')
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    file, error = _uploaded_file()
+    if error:
+        return error
+
+    try:
+        page_indexes, table_options, image_mode, key_options = _conversion_options(file)
+    except (PageRangeError, TableOptionError, ImageOptionError) as e:
+        return jsonify({'error': str(e)}), 400
+    priority = _priority()
+    if priority is None:
+        return jsonify({'error': _PRIORITY_ERROR}), 400
+
+    return _submit_upload(file, page_indexes, table_options, image_mode, key_options, priority=priority)
+
+def _submit_upload(file, page_indexes, table_options, image_mode, key_options, detach=True, priority=0):
+    """
+    Queue a validated upload for background conversion and answer with its job links.
+
+    With ``detach=False`` the job takes over ``file.stream`` instead of a copy,
+    for streams that already outlive the request. The job runs under the
+    requesting client's scheduler share at ``priority``.
+    """
+    filename = file.filename
+    extension = _extension(filename)
+    cache_key, doc_key = _cache_keys(file.stream, extension, key_options)
+    markdown_content = result_cache.get(cache_key)
+    if markdown_content is not None:
+        record_conversion(extension, 'cache_hit')
+        if not detach:
+            file.stream.close()
+        job = job_manager.complete(filename, markdown_content)
+        response = jsonify(_job_links(job))
+        response.headers['X-Cache'] = 'HIT'
+        return response, 202, {'Location': f'/jobs/{job.id}'}
+
+    stream = _detach_upload(file) if detach else file.stream
+    try:
+        job = job_manager.submit(
+            filename, _convert_job, stream, filename, cache_key, page_indexes, doc_key,
+            table_options, image_mode, _client_id(), priority
+        )
+    except QueueFullError as e:
+        stream.close()
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+
+    response = jsonify(_job_links(job))
+    response.headers['X-Cache'] = 'MISS'
+    return response, 202, {'Location': f'/jobs/{job.id}'}
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    payload = job.to_dict()
+    payload['queue_position'] = job_manager.queue_position(job)
+    payload.update(_job_links(job))
+    return jsonify(payload)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job.status == FAILED:
+        return jsonify({'error': job.error, 'status': job.status}), 500
+
+    if job.status != DONE:
+        return jsonify(_job_links(job)), 202
+
+    response_format = _response_format()
+    if response_format is None:
+        return jsonify({'error': f'format must be one of: {", ".join(RESPONSE_FORMATS)}'}), 400
+    # A finished job's result never changes, so its id keys the compressed copies
+    return _conversion_response(job.result, None, f'job-{job.id}', job.filename, response_format)
+
+def _upload_session():
+    """
+    Return the upload session named in the URL and ``None``, or ``None`` and a 404.
+    """
+    try:
+        return upload_sessions.get(request.view_args['upload_id']), None
+    except UploadNotFound as e:
+        return None, (jsonify({'error': str(e)}), 404)
+
+def _upload_payload(session):
+    payload = session.to_dict()
+    payload.update(
+        status_url=f'/uploads/{session.id}',
+        chunk_url=f'/uploads/{session.id}/chunks/{{index}}',
+        complete_url=f'/uploads/{session.id}/complete',
+    )
+    return payload
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    payload = request.get_json(silent=True) or {}
+    filename = payload.get('filename') or ''
+    size = payload.get('size')
+    chunk_size = payload.get('chunk_size')
+    if not filename:
+        return jsonify({'error': 'No file selected'}), 400
+    if not allowed_file(filename):
+        return jsonify({'error': 'File type not supported'}), 400
+    if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+        return jsonify({'error': 'size must be the file size in bytes'}), 400
+    if chunk_size is not None and (not isinstance(chunk_size, int) or isinstance(chunk_size, bool)):
+        return jsonify({'error': 'chunk_size must be a number of bytes'}), 400
+
+    try:
+        chunked_upload_limits.check(filename, size)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+
+    try:
+        session = upload_sessions.create(filename, size, chunk_size)
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(_upload_payload(session)), 201, {'Location': f'/uploads/{session.id}'}
+
+@app.route('/uploads/<upload_id>')
+def upload_status(upload_id):
+    session, error = _upload_session()
+    if error:
+        return error
+    return jsonify(_upload_payload(session))
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    session, error = _upload_session()
+    if error:
+        return error
+    upload_sessions.discard(session.id)
+    return '', 204
+
+@app.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    session, error = _upload_session()
+    if error:
+        return error
+    if request.content_length is None:
+        return jsonify({'error': 'Chunks must be sent with a Content-Length'}), 411
+
+    try:
+        with timed('upload'):
+            status = upload_sessions.write_chunk(
+                session, index, request.stream, request.content_length, request.headers.get('X-Chunk-SHA256')
+            )
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(status)
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """
+    Queue a fully received upload for conversion, reading the assembled file in place.
+
+    Takes the same options as /jobs. The session is kept when the options
+    are wrong or the queue is full, so the client can retry without sending
+    the file again.
+    """
+    session, error = _upload_session()
+    if error:
+        return error
+    priority = _priority()
+    if priority is None:
+        return jsonify({'error': _PRIORITY_ERROR}), 400
+    try:
+        stream = upload_sessions.open_data(session)
+    except UploadIncomplete as e:
+        return jsonify({'error': str(e), 'missing': e.missing}), 409
+
+    file = FileStorage(stream, filename=session.filename)
+    try:
+        with timed('sniff'):
+            check_upload(stream, session.filename, SNIFF_MODE)
+    except ContentMismatch as e:
+        stream.close()
+        upload_sessions.discard(session.id)
+        return jsonify({'error': str(e)}), 415
+
+    try:
+        page_indexes, table_options, image_mode, key_options = _conversion_options(file)
+    except (PageRangeError, TableOptionError, ImageOptionError) as e:
+        stream.close()
+        return jsonify({'error': str(e)}), 400
+
+    response = _submit_upload(file, page_indexes, table_options, image_mode, key_options, detach=False, priority=priority)
+    if response[1] == 202:
+        upload_sessions.discard(session.id)
+    return response
+
+def _stored_result():
+    """
+    Return the stored result named in the URL and ``None``, or ``None`` and a 404.
+    """
+    try:
+        return result_store.get(request.view_args['result_id']), None
+    except ResultNotFound as e:
+        return None, (jsonify({'error': str(e)}), 404)
+
+@app.route('/results/<result_id>')
+def stored_result(result_id):
+    result, error = _stored_result()
+    if error:
+        return error
+    # Honours Range and If-Range, so clients can fetch any byte span of the markdown
+    return send_file(result.data_path, mimetype='text/markdown', conditional=True, etag=result_id, max_age=0)
+
+@app.route('/results/<result_id>/toc')
+def result_toc(result_id):
+    result, error = _stored_result()
+    if error:
+        return error
+    payload = result.toc()
+    for section in payload['sections']:
+        section['url'] = f'/results/{result_id}/sections/{section["id"]}'
+    payload.update(markdown_url=f'/results/{result_id}', chunks_url=f'/results/{result_id}/chunks')
+    return jsonify(payload)
+
+@app.route('/results/<result_id>/sections/<int:section_id>')
+def result_section(result_id, section_id):
+    result, error = _stored_result()
+    if error:
+        return error
+    try:
+        markdown_content = result.section(section_id)
+    except ResultNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    response = Response(markdown_content, mimetype='text/markdown')
+    response.set_etag(f'{result_id}.{section_id}')
+    return response.make_conditional(request)
+
+@app.route('/results/<result_id>/chunks')
+def result_chunks(result_id):
+    result, error = _stored_result()
+    if error:
+        return error
+    try:
+        max_bytes = int(request.args.get('max_bytes', DEFAULT_CHUNK_BYTES))
+        include_text = request.args.get('text', '').lower() in ('1', 'true', 'yes')
+        chunks = result.chunks(max_bytes, include_text)
+    except ValueError:
+        return jsonify({'error': 'max_bytes must be an integer'}), 400
+    except ResultStoreError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'result_id': result_id, 'max_bytes': max_bytes, 'chunks': chunks})
+
+@app.route('/metrics')
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+@app.route('/scheduler/stats')
+def scheduler_stats():
+    return jsonify(scheduler.stats())
+
+@app.route('/pool/stats')
+def pool_stats():
+    if process_pool is None:
+        return jsonify({'backend': CONVERSION_BACKEND})
+    stats = process_pool.stats()
+    stats['backend'] = CONVERSION_BACKEND
+    return jsonify(stats)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs under gunicorn (see main.py)
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv('FILE2MD_DEBUG') == '1')
@@ -0,0 +1 @@
+# Makes benchmarks a package so it can run with python -m benchmarks.
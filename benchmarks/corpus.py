@@ -0,0 +1,101 @@
+"""
+Scaled synthetic documents for benchmarking.
+
+The sizes below are the ``scale=1.0`` baseline; every generator multiplies
+them by ``scale`` so the same corpus can be produced tiny for smoke runs or
+large for capacity tests. Output is deterministic for a given scale.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+
+from tests.sample_files import _write_pdf_pages
+
+PDF_PAGES = 200
+DOCX_PARAGRAPHS = 5000
+XLSX_ROWS = 5000
+XLSX_COLUMNS = 20
+HTML_SECTIONS = 5000
+CSV_ROWS = 50000
+JSON_RECORDS = 50000
+
+FORMATS = (".pdf", ".docx", ".xlsx", ".html", ".csv", ".json")
+
+
+def _scaled(count: int, scale: float) -> int:
+    return max(1, int(count * scale))
+
+
+def create_corpus(base_dir: Path, scale: float = 1.0, formats=FORMATS) -> dict[str, Path]:
+    base_dir.mkdir(parents=True, exist_ok=True)
+    writers = {
+        ".pdf": write_pdf,
+        ".docx": write_docx,
+        ".xlsx": write_xlsx,
+        ".html": write_html,
+        ".csv": write_csv,
+        ".json": write_json,
+    }
+    files: dict[str, Path] = {}
+    for extension in formats:
+        path = base_dir / f"bench{extension}"
+        writers[extension](path, scale)
+        files[extension] = path
+    return files
+
+
+def write_pdf(path: Path, scale: float) -> None:
+    _write_pdf_pages(path, [f"Benchmark page {index}" for index in range(_scaled(PDF_PAGES, scale))])
+
+
+def write_docx(path: Path, scale: float) -> None:
+    from docx import Document
+
+    document = Document()
+    document.add_heading("Benchmark DOCX", level=1)
+    for index in range(_scaled(DOCX_PARAGRAPHS, scale)):
+        if index % 100 == 0:
+            document.add_heading(f"Section {index // 100}", level=2)
+        document.add_paragraph(f"Paragraph {index}: the quick brown fox jumps over the lazy dog.")
+    document.save(path)
+
+
+def write_xlsx(path: Path, scale: float) -> None:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Data")
+    worksheet.append([f"column_{column}" for column in range(XLSX_COLUMNS)])
+    for row in range(_scaled(XLSX_ROWS, scale)):
+        worksheet.append([row * XLSX_COLUMNS + column for column in range(XLSX_COLUMNS)])
+    workbook.save(path)
+
+
+def write_html(path: Path, scale: float) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write("<!doctype html><html><head><title>Benchmark HTML</title></head><body>")
+        for index in range(_scaled(HTML_SECTIONS, scale)):
+            handle.write(
+                f"<h2>Section {index}</h2><p>Paragraph {index} with <b>bold</b> and "
+                f"<a href='https://example.com/{index}'>a link</a>.</p>"
+                f"<ul><li>First {index}</li><li>Second {index}</li></ul>"
+            )
+        handle.write("</body></html>")
+
+
+def write_csv(path: Path, scale: float) -> None:
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["id", "name", "value", "comment"])
+        for index in range(_scaled(CSV_ROWS, scale)):
+            writer.writerow([index, f"name {index}", index * 3.5, f"comment for row {index}"])
+
+
+def write_json(path: Path, scale: float) -> None:
+    records = [
+        {"id": index, "name": f"record {index}", "tags": ["a", "b"], "nested": {"value": index}}
+        for index in range(_scaled(JSON_RECORDS, scale))
+    ]
+    path.write_text(json.dumps(records), encoding="utf-8")
@@ -0,0 +1,200 @@
+"""
+Load-test the production server and show how throughput scales with workers.
+
+    python -m benchmarks.load --workers 1,2,4 --concurrency 16 --duration 10
+
+For each worker count a gunicorn server is started from ``gunicorn.conf.py``
+with the result cache disabled, then ``--concurrency`` client threads post
+the same document to ``/convert`` over keep-alive connections for
+``--duration`` seconds. The report lists requests per second and latency
+percentiles per worker count, plus the speed-up over the first row.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from benchmarks.run import percentile
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DOCUMENT = b"<!doctype html><html><body><h1>Load test</h1>" + b"<p>Paragraph of text.</p>" * 200 + b"</body></html>"
+
+
+def multipart_body(filename: str, data: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/metrics")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start within {timeout:.0f} s")
+
+
+def start_server(workers: int, threads: int, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        FILE2MD_WORKERS=str(workers),
+        FILE2MD_THREADS=str(threads),
+        FILE2MD_BIND=f"127.0.0.1:{port}",
+        FILE2MD_CACHE_ENTRIES="0",
+    )
+    env.pop("FILE2MD_CACHE_DIR", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        _wait_until_ready(port)
+    except BaseException:
+        stop_server(process)
+        raise
+    return process
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def run_load(port: int, body: bytes, content_type: str, concurrency: int, duration: float) -> dict:
+    """
+    Post ``body`` to ``/convert`` from ``concurrency`` threads for ``duration`` seconds.
+    """
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client() -> None:
+        nonlocal errors
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        local: list[float] = []
+        failed = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request("POST", "/convert", body=body, headers={"Content-Type": content_type})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {"requests": len(latencies), "errors": errors, "seconds": elapsed}
+    result["requests_per_second"] = len(latencies) / elapsed if elapsed else 0.0
+    if latencies:
+        result["latency_ms"] = {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p90": percentile(latencies, 0.90) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+        }
+    return result
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [f"{'workers':>8}{'threads':>9}{'req/s':>9}{'speed-up':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'errors':>8}"]
+    base = results[0]["requests_per_second"] if results else 0.0
+    for result in results:
+        latency = result.get("latency_ms", {})
+        speedup = result["requests_per_second"] / base if base else 0.0
+        lines.append(
+            f"{result['workers']:>8}{result['threads']:>9}{result['requests_per_second']:>9.1f}{speedup:>9.2f}x"
+            f"{latency.get('p50', 0.0):>9.1f}{latency.get('p90', 0.0):>9.1f}{latency.get('p99', 0.0):>9.1f}{result['errors']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test file2md under gunicorn at several worker counts.")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})), help="comma-separated worker counts (default: 1,2,CPUs)")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--file", help="document to post (default: a generated HTML page)")
+    parser.add_argument("-o", "--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args(argv)
+
+    worker_counts = [int(value) for value in args.workers.split(",") if value.strip()]
+    if args.file:
+        body, content_type = multipart_body(os.path.basename(args.file), Path(args.file).read_bytes())
+    else:
+        body, content_type = multipart_body("load.html", DEFAULT_DOCUMENT)
+
+    results = []
+    for workers in worker_counts:
+        port = _free_port()
+        server = start_server(workers, args.threads, port)
+        try:
+            # One untimed request per worker so start-up is not measured
+            run_load(port, body, content_type, concurrency=workers, duration=0.5)
+            result = run_load(port, body, content_type, args.concurrency, args.duration)
+        finally:
+            stop_server(server)
+        result.update(workers=workers, threads=args.threads, concurrency=args.concurrency)
+        results.append(result)
+        print(f"{workers} workers: {result['requests_per_second']:.1f} req/s", file=sys.stderr)
+
+    print(format_report(results))
+    if args.output:
+        Path(args.output).write_text(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Compare the incremental JSON/XML/HTML reader with MarkItDown's converters.
+
+    python -m benchmarks.markup --records 200000
+
+A JSON array of records, the same records as XML and an HTML page with one
+section per record are generated. Each conversion then runs in a fresh
+interpreter, once through ``utils.markup`` (consuming the markdown chunk by
+chunk, the way the streaming endpoint does) and once through MarkItDown. The
+report shows wall time and the peak resident memory each run added on top of
+its imports.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+METHODS = ("stream", "full")
+FORMATS = ("json", "xml", "html")
+
+
+def create_json(path: Path, records: int) -> Path:
+    """
+    Write ``{"records": [...]}`` with ``records`` small nested objects, one per line.
+    """
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write('{"source": "benchmark", "records": [\n')
+        for number in range(records):
+            record = {"id": number, "name": f"Customer {number}", "address": {"city": "Springfield", "zip": f"{number:05d}"}, "tags": ["a", "b"]}
+            handle.write(("," if number else "") + json.dumps(record) + "\n")
+        handle.write("]}\n")
+    return path
+
+
+def create_xml(path: Path, records: int) -> Path:
+    """
+    Write the same records as ``create_json`` as XML elements with attributes.
+    """
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write('<?xml version="1.0" encoding="utf-8"?>\n<records source="benchmark">\n')
+        for number in range(records):
+            handle.write(
+                f'<record id="{number}"><name>Customer {number}</name>'
+                f'<address city="Springfield" zip="{number:05d}"/></record>\n'
+            )
+        handle.write("</records>\n")
+    return path
+
+
+def create_html(path: Path, records: int) -> Path:
+    """
+    Write a page with navigation, scripts and one heading, paragraph and list per record.
+    """
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("<html><head><title>Customers</title><script>var tracking = 1;</script></head><body>\n")
+        handle.write('<nav><a href="/">Home</a> <a href="/about">About</a></nav><main>\n')
+        for number in range(records):
+            handle.write(
+                f"<section><h2>Customer {number}</h2><p>Lives in <b>Springfield</b>, "
+                f'see <a href="/c/{number}">profile</a>.</p><ul><li>zip {number:05d}</li><li>tags a, b</li></ul></section>\n'
+            )
+        handle.write("</main><footer>Generated</footer></body></html>\n")
+    return path
+
+
+def _memory_mb(field: str) -> float | None:
+    try:
+        with open("/proc/self/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _child(method: str, path: str) -> dict:
+    """
+    Convert one file and report time and memory. Executed inside a fresh interpreter.
+    """
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from utils.converter import get_engine
+    from utils.markup import iter_markup_markdown
+
+    engine = get_engine()
+    baseline = _memory_mb("VmRSS")
+    started = time.perf_counter()
+    if method == "stream":
+        with open(path, "rb") as handle:
+            output_bytes = sum(len(chunk.encode("utf-8")) for chunk in iter_markup_markdown(handle, Path(path).suffix))
+    else:
+        output_bytes = len(engine.convert(path).text_content.encode("utf-8"))
+    seconds = time.perf_counter() - started
+    peak = _memory_mb("VmHWM")
+    return {
+        "seconds": seconds,
+        "output_bytes": output_bytes,
+        "peak_mb": None if baseline is None or peak is None else peak - baseline,
+    }
+
+
+def measure(method: str, path: Path) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.markup", "--child", method, "--path", str(path)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [f"{'document':<10}{'input MB':>10}{'method':>8}{'seconds':>9}{'peak MB':>9}{'output KB':>11}"]
+    for result in results:
+        peak = result["peak_mb"]
+        lines.append(
+            f"{result['document']:<10}{result['input_bytes'] / (1024 * 1024):>10.1f}{result['method']:>8}"
+            f"{result['seconds']:>9.2f}{'n/a' if peak is None else f'{peak:.1f}':>9}{result['output_bytes'] / 1024:>11.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare JSON/XML/HTML conversion time and memory.")
+    parser.add_argument("--records", type=int, default=200000, help="records in each generated document")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated formats: json, xml, html")
+    parser.add_argument("--methods", default=",".join(METHODS), help="comma-separated methods: stream, full")
+    parser.add_argument("-o", "--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--child", choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.path)))
+        return 0
+
+    methods = [value.strip() for value in args.methods.split(",") if value.strip()]
+    formats = [value.strip() for value in args.formats.split(",") if value.strip()]
+    unknown = [value for value in methods if value not in METHODS] + [value for value in formats if value not in FORMATS]
+    if unknown:
+        parser.error(f"unknown method or format: {', '.join(unknown)}")
+
+    creators = {"json": create_json, "xml": create_xml, "html": create_html}
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in formats:
+            path = creators[name](Path(directory) / f"records.{name}", args.records)
+            for method in methods:
+                result = measure(method, path)
+                result.update(document=name, method=method, input_bytes=path.stat().st_size)
+                results.append(result)
+                print(f"{name} {method}: {result['seconds']:.2f} s, {result['peak_mb']} MB", file=sys.stderr)
+
+    print(format_report(results))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Compare the incremental DOCX/PPTX reader with MarkItDown's object-model converters.
+
+    python -m benchmarks.ooxml --slides 1000 --paragraphs 5000
+
+A slide deck and a Word report are generated. Each conversion then runs in a
+fresh interpreter, once through ``utils.ooxml`` (consuming the markdown
+chunk by chunk, the way the streaming endpoint does) and once through
+MarkItDown. The report shows wall time and the peak resident memory each run
+added on top of its imports.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+METHODS = ("stream", "full")
+
+
+def create_docx(path: Path, paragraphs: int) -> Path:
+    """
+    Write a report with ``paragraphs`` body paragraphs, a heading every 50 and a
+    short table every 500.
+    """
+    from docx import Document
+
+    document = Document()
+    for number in range(paragraphs):
+        if number % 50 == 0:
+            document.add_heading(f"Section {number // 50 + 1}", level=1)
+        paragraph = document.add_paragraph(f"Paragraph {number} explains one more detail of the quarterly results. ")
+        paragraph.add_run("Key figure").bold = True
+        paragraph.add_run(f" {number * 7} units.")
+        if number % 500 == 499:
+            table = document.add_table(rows=3, cols=3)
+            for row in range(3):
+                for column in range(3):
+                    table.cell(row, column).text = f"r{row}c{column}"
+    document.save(path)
+    return path
+
+
+def create_pptx(path: Path, slides: int) -> Path:
+    """
+    Write a deck of ``slides`` title-and-content slides with speaker notes.
+    """
+    from pptx import Presentation
+
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for number in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {number + 1}"
+        slide.placeholders[1].text = f"Point one of slide {number + 1}\nPoint two\nPoint three"
+        slide.notes_slide.notes_text_frame.text = f"Speaker notes for slide {number + 1}"
+    presentation.save(path)
+    return path
+
+
+def _memory_mb(field: str) -> float | None:
+    try:
+        with open("/proc/self/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _child(method: str, path: str) -> dict:
+    """
+    Convert one file and report time and memory. Executed inside a fresh interpreter.
+    """
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from utils.converter import get_engine
+    from utils.ooxml import iter_docx_markdown, iter_pptx_markdown
+
+    import docx  # noqa: F401  imported up front so they are not counted as conversion memory
+    import pptx  # noqa: F401
+
+    engine = get_engine()
+    baseline = _memory_mb("VmRSS")
+    started = time.perf_counter()
+    if method == "stream":
+        reader = iter_docx_markdown if path.endswith(".docx") else iter_pptx_markdown
+        with open(path, "rb") as handle:
+            output_bytes = sum(len(chunk.encode("utf-8")) for chunk in reader(handle))
+    else:
+        output_bytes = len(engine.convert(path).text_content.encode("utf-8"))
+    seconds = time.perf_counter() - started
+    peak = _memory_mb("VmHWM")
+    return {
+        "seconds": seconds,
+        "output_bytes": output_bytes,
+        "peak_mb": None if baseline is None or peak is None else peak - baseline,
+    }
+
+
+def measure(method: str, path: Path) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.ooxml", "--child", method, "--path", str(path)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [f"{'document':<18}{'input MB':>10}{'method':>8}{'seconds':>9}{'peak MB':>9}{'output KB':>11}"]
+    for result in results:
+        peak = result["peak_mb"]
+        lines.append(
+            f"{result['document']:<18}{result['input_bytes'] / (1024 * 1024):>10.1f}{result['method']:>8}"
+            f"{result['seconds']:>9.2f}{'n/a' if peak is None else f'{peak:.1f}':>9}{result['output_bytes'] / 1024:>11.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare DOCX/PPTX conversion time and memory.")
+    parser.add_argument("--slides", type=int, default=1000, help="slides in the generated deck (0 skips it)")
+    parser.add_argument("--paragraphs", type=int, default=5000, help="paragraphs in the generated report (0 skips it)")
+    parser.add_argument("--methods", default=",".join(METHODS), help="comma-separated methods: stream, full")
+    parser.add_argument("-o", "--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--child", choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.path)))
+        return 0
+
+    methods = [value.strip() for value in args.methods.split(",") if value.strip()]
+    unknown = [value for value in methods if value not in METHODS]
+    if unknown:
+        parser.error(f"unknown method: {', '.join(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        documents = []
+        if args.slides:
+            documents.append((f"{args.slides} slides", create_pptx(Path(directory) / "deck.pptx", args.slides)))
+        if args.paragraphs:
+            documents.append((f"{args.paragraphs} paragraphs", create_docx(Path(directory) / "report.docx", args.paragraphs)))
+        for label, path in documents:
+            for method in methods:
+                result = measure(method, path)
+                result.update(document=label, method=method, input_bytes=path.stat().st_size)
+                results.append(result)
+                print(f"{label} {method}: {result['seconds']:.2f} s, {result['peak_mb']} MB", file=sys.stderr)
+
+    print(format_report(results))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Benchmark conversion latency, throughput and memory per format.
+
+    python -m benchmarks.run --scale 0.1 --iterations 5 -o results.json
+    python -m benchmarks.run --compare baseline.json
+
+Each (format, mode) pair is measured in a fresh spawned process, so peak RSS
+reflects that pair alone and engine warm-up never leaks between runs. The
+``direct`` mode calls ``convert_to_markdown`` on the file, while ``flask``
+posts it to ``/convert`` through the Flask test client with the result cache
+disabled.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.corpus import FORMATS, create_corpus
+
+MODES = ("direct", "flask")
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of ``values`` (``fraction`` between 0 and 1).
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _measure(path: str, mode: str, iterations: int, warmup: int) -> dict:
+    """
+    Run one (file, mode) measurement. Executed inside a fresh child process.
+    """
+    os.environ["FILE2MD_CACHE_ENTRIES"] = "0"
+    os.environ.pop("FILE2MD_CACHE_DIR", None)
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    baseline_rss = peak_rss_mb()
+
+    if mode == "direct":
+        from utils.converter import convert_to_markdown, warm_up
+
+        warm_up()
+
+        def run_once() -> str:
+            return convert_to_markdown(path)
+
+    else:
+        from app import app
+
+        client = app.test_client()
+        filename = os.path.basename(path)
+
+        def run_once() -> str:
+            with open(path, "rb") as handle:
+                response = client.post(
+                    "/convert",
+                    data={"file": (handle, filename)},
+                    content_type="multipart/form-data",
+                )
+            if response.status_code != 200:
+                raise RuntimeError(f"/convert returned {response.status_code}: {response.get_data(as_text=True)}")
+            return response.get_json()["markdown"]
+
+    for _ in range(warmup):
+        run_once()
+
+    latencies = []
+    output = ""
+    for _ in range(iterations):
+        started = time.perf_counter()
+        output = run_once()
+        latencies.append(time.perf_counter() - started)
+
+    input_bytes = os.path.getsize(path)
+    total = sum(latencies)
+    return {
+        "format": os.path.splitext(path)[1],
+        "mode": mode,
+        "iterations": iterations,
+        "input_bytes": input_bytes,
+        "output_bytes": len(output.encode("utf-8")),
+        "latency_ms": {
+            "min": min(latencies) * 1000,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p90": percentile(latencies, 0.90) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": max(latencies) * 1000,
+            "mean": statistics.fmean(latencies) * 1000,
+        },
+        "docs_per_second": iterations / total if total else 0.0,
+        "mb_per_second": input_bytes * iterations / (1024 * 1024) / total if total else 0.0,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parents[1],
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scale=1.0, iterations=5, warmup=1, formats=FORMATS, modes=MODES, corpus_dir=None) -> dict:
+    """
+    Generate the corpus and measure every (format, mode) pair.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = create_corpus(Path(corpus_dir or temp_dir), scale, formats)
+        context = multiprocessing.get_context("spawn")
+        results = []
+        for extension, path in corpus.items():
+            for mode in modes:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    results.append(executor.submit(_measure, str(path), mode, iterations, warmup).result())
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "results": results,
+    }
+
+
+def format_report(report: dict, baseline: dict | None = None) -> str:
+    previous = {}
+    if baseline:
+        previous = {(item["format"], item["mode"]): item for item in baseline["results"]}
+
+    header = f"{'format':<7}{'mode':<8}{'input MB':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'docs/s':>9}{'MB/s':>8}{'peak MB':>9}"
+    if previous:
+        header += f"{'p50 vs base':>13}{'RSS vs base':>13}"
+    lines = [header]
+    for item in report["results"]:
+        latency = item["latency_ms"]
+        line = (
+            f"{item['format']:<7}{item['mode']:<8}{item['input_bytes'] / (1024 * 1024):>10.2f}"
+            f"{latency['p50']:>10.1f}{latency['p90']:>10.1f}{latency['p99']:>10.1f}"
+            f"{item['docs_per_second']:>9.2f}{item['mb_per_second']:>8.2f}{item['peak_rss_mb']:>9.1f}"
+        )
+        old = previous.get((item["format"], item["mode"]))
+        if old:
+            line += f"{_change(latency['p50'], old['latency_ms']['p50']):>13}{_change(item['peak_rss_mb'], old['peak_rss_mb']):>13}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _change(current: float, previous: float) -> str:
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark file2md conversions per format.")
+    parser.add_argument("--scale", type=float, default=1.0, help="corpus size multiplier (default: 1.0)")
+    parser.add_argument("--iterations", type=int, default=5, help="timed conversions per format and mode")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed conversions before measuring")
+    parser.add_argument("--formats", default=",".join(ext.lstrip(".") for ext in FORMATS), help="comma-separated formats")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes: direct, flask")
+    parser.add_argument("--corpus-dir", help="keep the generated corpus in this directory")
+    parser.add_argument("-o", "--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    formats = tuple("." + name.strip().lstrip(".") for name in args.formats.split(",") if name.strip())
+    modes = tuple(name.strip() for name in args.modes.split(",") if name.strip())
+    unknown = [name for name in formats if name not in FORMATS] + [name for name in modes if name not in MODES]
+    if unknown:
+        parser.error(f"unknown format or mode: {', '.join(unknown)}")
+
+    report = run_benchmarks(args.scale, args.iterations, args.warmup, formats, modes, args.corpus_dir)
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+    print(format_report(report, baseline))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Simulate mixed load against the conversion scheduler.
+
+    python -m benchmarks.scheduler --duration 10
+
+One client keeps a queue of large PDFs going while several others send small
+HTML files. Conversions are simulated by sleeping for their estimated cost
+(scaled by ``--time-scale``), so the run measures scheduling alone. The same
+load is replayed through a first-come, first-served pool with the same
+number of slots and through ``utils.scheduler.Scheduler``; the report shows
+the queue wait and end-to-end latency of the small files in each.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+from benchmarks.run import percentile
+from utils.scheduler import Scheduler, estimate_cost
+
+MODES = ("fifo", "fair")
+MB = 1024 * 1024
+
+
+class _FifoPool:
+    """
+    The baseline: a fixed number of slots handed out in arrival order.
+    """
+
+    def __init__(self, workers: int):
+        self._free = workers
+        self._cond = threading.Condition()
+        self._waiting = deque()
+
+    @contextmanager
+    def slot(self, client, extension, size, priority=0, background=False):
+        with self._cond:
+            turn = object()
+            self._waiting.append(turn)
+            while self._waiting[0] is not turn or not self._free:
+                self._cond.wait()
+            self._waiting.popleft()
+            self._free -= 1
+            self._cond.notify_all()
+        try:
+            yield None
+        finally:
+            with self._cond:
+                self._free += 1
+                self._cond.notify_all()
+
+
+def simulate(mode: str, duration: float, workers: int, small_clients: int, time_scale: float) -> dict:
+    """
+    Run the mixed load for ``duration`` seconds and return latency percentiles of the small files.
+    """
+    if mode == "fair":
+        scheduler = Scheduler(workers=workers, fast_workers=1, client_concurrency=workers, client_queue=0, max_wait=0)
+    else:
+        scheduler = _FifoPool(workers + 1)
+    waits, latencies = [], []
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def convert(client, extension, size):
+        submitted = time.perf_counter()
+        with scheduler.slot(client, extension, size):
+            started = time.perf_counter()
+            time.sleep(estimate_cost(extension, size) * time_scale)
+        return started - submitted, time.perf_counter() - submitted
+
+    def large_client(number):
+        while time.perf_counter() < stop:
+            convert("large", ".pdf", 20 * MB)
+
+    def small_client(number):
+        while time.perf_counter() < stop:
+            wait, latency = convert(f"small-{number}", ".html", 50 * 1024)
+            with lock:
+                waits.append(wait)
+                latencies.append(latency)
+            time.sleep(0.01)
+
+    # The large client keeps several conversions in flight, like a batch upload would
+    threads = [threading.Thread(target=large_client, args=(number,)) for number in range(workers * 2)]
+    threads += [threading.Thread(target=small_client, args=(number,)) for number in range(small_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "small_files": len(latencies),
+        "wait_p50_ms": percentile(waits, 0.5) * 1000,
+        "wait_p99_ms": percentile(waits, 0.99) * 1000,
+        "latency_p50_ms": percentile(latencies, 0.5) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [f"{'mode':<6}{'small files':>13}{'wait p50':>10}{'wait p99':>10}{'p50 ms':>9}{'p99 ms':>9}"]
+    for result in results:
+        lines.append(
+            f"{result['mode']:<6}{result['small_files']:>13}{result['wait_p50_ms']:>10.1f}{result['wait_p99_ms']:>10.1f}"
+            f"{result['latency_p50_ms']:>9.1f}{result['latency_p99_ms']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare small-file latency under mixed load with and without the scheduler.")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per mode")
+    parser.add_argument("--workers", type=int, default=2, help="standard conversion slots")
+    parser.add_argument("--small-clients", type=int, default=4, help="clients sending small HTML files")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="simulated seconds per estimated conversion second")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes: fifo, fair")
+    parser.add_argument("-o", "--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args(argv)
+
+    modes = [value.strip() for value in args.modes.split(",") if value.strip()]
+    unknown = [value for value in modes if value not in MODES]
+    if unknown:
+        parser.error(f"unknown mode: {', '.join(unknown)}")
+
+    results = []
+    for mode in modes:
+        result = simulate(mode, args.duration, args.workers, args.small_clients, args.time_scale)
+        result["mode"] = mode
+        results.append(result)
+        print(f"{mode}: p99 {result['latency_p99_ms']:.1f} ms", file=sys.stderr)
+
+    print(format_report(results))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Measure start-up cost of the web app in each start-up mode.
+
+    python -m benchmarks.startup --workers 4 -o startup.json
+
+Every mode runs in a fresh interpreter:
+
+- ``lazy``: ``import app`` loads nothing heavy; the first request builds the engine
+- ``eager``: ``import app`` builds and warms the engine before serving
+- ``preload``: a master imports and warms once, then forks ``--workers``
+  children the way ``gunicorn --preload`` does; each child serves its first
+  request from the shared, already-warm pages
+
+For each worker the report shows how long it took from process start (or
+fork) until its first ``/convert`` response, and how much memory it does not
+share with other processes.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MODES = ("lazy", "eager", "preload")
+SAMPLE = b"<!doctype html><html><body><h1>Start-up</h1><p>First request.</p></body></html>"
+
+
+def private_memory_mb() -> float | None:
+    """
+    Memory private to this process (not shared copy-on-write), Linux only.
+    """
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as handle:
+            fields = dict(line.split(":", 1) for line in handle if ":" in line)
+    except OSError:
+        return None
+    kilobytes = sum(int(fields[name].split()[0]) for name in ("Private_Clean", "Private_Dirty") if name in fields)
+    return kilobytes / 1024
+
+
+def _first_request(app) -> float:
+    import io
+
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.post(
+        "/convert",
+        data={"file": (io.BytesIO(SAMPLE), "startup.html")},
+        content_type="multipart/form-data",
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"/convert returned {response.status_code}")
+    return (time.perf_counter() - started) * 1000
+
+
+def _child(mode: str, workers: int) -> dict:
+    """
+    Run one mode. Executed inside a fresh interpreter.
+    """
+    os.environ["FILE2MD_STARTUP"] = mode
+    os.environ["FILE2MD_CACHE_ENTRIES"] = "0"
+    os.environ.pop("FILE2MD_CACHE_DIR", None)
+    import logging
+
+    logging.disable(logging.CRITICAL)
+
+    started = time.perf_counter()
+    from app import app
+
+    import_ms = (time.perf_counter() - started) * 1000
+    if mode != "preload":
+        first_ms = _first_request(app)
+        return {
+            "mode": mode,
+            "import_ms": import_ms,
+            "workers": [{"ready_ms": import_ms + first_ms, "first_request_ms": first_ms, "private_mb": private_memory_mb()}],
+        }
+
+    gc.freeze()
+    results = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            first_ms = _first_request(app)
+            record = {
+                "ready_ms": (time.perf_counter() - forked) * 1000,
+                "first_request_ms": first_ms,
+                "private_mb": private_memory_mb(),
+            }
+            with os.fdopen(write_fd, "w") as pipe:
+                pipe.write(json.dumps(record))
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            results.append(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+    return {"mode": mode, "import_ms": import_ms, "workers": results}
+
+
+def measure(mode: str, workers: int = 2) -> dict:
+    """
+    Measure one mode in a fresh interpreter, including interpreter start-up.
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", mode, "--workers", str(workers)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [f"{'mode':<9}{'import ms':>11}{'worker':>8}{'ready ms':>10}{'1st req ms':>12}{'private MB':>12}"]
+    for result in results:
+        for number, worker in enumerate(result["workers"], start=1):
+            private = worker["private_mb"]
+            lines.append(
+                f"{result['mode']:<9}{result['import_ms']:>11.0f}{number:>8}{worker['ready_ms']:>10.0f}"
+                f"{worker['first_request_ms']:>12.0f}{'n/a' if private is None else f'{private:.1f}':>12}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure file2md start-up time per start-up mode.")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes: lazy, eager, preload")
+    parser.add_argument("--workers", type=int, default=2, help="workers forked in preload mode")
+    parser.add_argument("-o", "--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(args.child, max(1, args.workers))))
+        return 0
+
+    modes = tuple(name.strip() for name in args.modes.split(",") if name.strip())
+    unknown = [name for name in modes if name not in MODES]
+    if unknown:
+        parser.error(f"unknown mode: {', '.join(unknown)}")
+    if "preload" in modes and not hasattr(os, "fork"):
+        parser.error("preload mode needs os.fork")
+
+    results = [measure(mode, max(1, args.workers)) for mode in modes]
+    print(format_report(results))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Compare peak memory of the row-by-row spreadsheet path with the full converter.
+
+    python -m benchmarks.tables --rows 10000,50000,200000 --formats .csv,.xlsx
+
+A CSV or XLSX file is generated at each row count. Each conversion then runs
+in a fresh interpreter, once through the streaming table writer and once
+through MarkItDown. The report shows the peak resident memory each run added
+on top of its imports. The streaming figure should stay flat as the row count
+grows, while the full converter grows with the file.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+METHODS = ("stream", "full")
+FORMATS = (".csv", ".xlsx")
+COLUMNS = ("id", "name", "city", "amount", "note")
+
+
+def create_table(path: Path, rows: int) -> Path:
+    """
+    Write a ``.csv`` or ``.xlsx`` file with a header and ``rows`` data rows.
+    """
+    def data():
+        for number in range(rows):
+            yield [number, f"Customer {number}", f"City {number % 97}", number * 3.25, f"Row {number} of {rows}"]
+
+    if path.suffix == ".xlsx":
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Data")
+        sheet.append(list(COLUMNS))
+        for row in data():
+            sheet.append(row)
+        workbook.save(path)
+    else:
+        with path.open("w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(COLUMNS)
+            writer.writerows(data())
+    return path
+
+
+def _memory_mb(field: str) -> float | None:
+    try:
+        with open("/proc/self/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _child(method: str, path: str) -> dict:
+    """
+    Convert one file and report memory. Executed inside a fresh interpreter.
+    """
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from utils.converter import convert_to_markdown, get_engine
+    from utils.tables import write_table_markdown
+
+    import openpyxl  # noqa: F401  imported up front so it is not counted as conversion memory
+
+    get_engine()
+    baseline = _memory_mb("VmRSS")
+    started = time.perf_counter()
+    if method == "stream":
+        with tempfile.TemporaryDirectory() as directory:
+            output_bytes = write_table_markdown(path, os.path.join(directory, "out.md"))
+    else:
+        output_bytes = len(convert_to_markdown(path).encode("utf-8"))
+    seconds = time.perf_counter() - started
+    peak = _memory_mb("VmHWM")
+    return {
+        "seconds": seconds,
+        "output_bytes": output_bytes,
+        "peak_mb": None if baseline is None or peak is None else peak - baseline,
+    }
+
+
+def measure(method: str, path: Path) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.tables", "--child", method, "--path", str(path)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [f"{'format':<7}{'rows':>9}{'input MB':>10}{'method':>8}{'seconds':>9}{'peak MB':>9}"]
+    for result in results:
+        peak = result["peak_mb"]
+        lines.append(
+            f"{result['format']:<7}{result['rows']:>9}{result['input_bytes'] / (1024 * 1024):>10.1f}{result['method']:>8}"
+            f"{result['seconds']:>9.2f}{'n/a' if peak is None else f'{peak:.1f}':>9}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare spreadsheet conversion memory by row count.")
+    parser.add_argument("--rows", default="10000,50000,200000", help="comma-separated row counts")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated formats: .csv, .xlsx")
+    parser.add_argument("--methods", default=",".join(METHODS), help="comma-separated methods: stream, full")
+    parser.add_argument("-o", "--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--child", choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.path)))
+        return 0
+
+    formats = [value.strip() for value in args.formats.split(",") if value.strip()]
+    methods = [value.strip() for value in args.methods.split(",") if value.strip()]
+    unknown = [value for value in formats if value not in FORMATS] + [value for value in methods if value not in METHODS]
+    if unknown:
+        parser.error(f"unknown format or method: {', '.join(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in formats:
+            for rows in (int(value) for value in args.rows.split(",") if value.strip()):
+                path = create_table(Path(directory) / f"table-{rows}{extension}", rows)
+                for method in methods:
+                    result = measure(method, path)
+                    result.update(format=extension, rows=rows, method=method, input_bytes=path.stat().st_size)
+                    results.append(result)
+                    print(f"{extension} {rows} rows {method}: {result['peak_mb']} MB", file=sys.stderr)
+
+    print(format_report(results))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
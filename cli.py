@@ -0,0 +1,197 @@
+"""
+Convert a directory tree of documents to markdown from the command line.
+
+    python cli.py SOURCE_DIR -o OUTPUT_DIR -j 8
+
+Every supported file under SOURCE_DIR is converted to a ``.md`` file at the
+same relative path under OUTPUT_DIR. Files whose output is already newer than
+the input are skipped unless ``--force`` is given. CSV and XLSX files of
+``FILE2MD_TABLE_STREAM_MIN_BYTES`` or more are written row by row, so large
+spreadsheets convert in flat memory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.converter import allowed_file, convert_to_markdown
+from utils.logs import configure_logging
+from utils.pool import ProcessPool
+from utils.tables import STREAM_MIN_BYTES, TABULAR_EXTENSIONS, write_table_markdown
+
+# Spreadsheets from this size skip the full converter, as on the server
+TABLE_STREAM_MIN_BYTES = int(os.getenv("FILE2MD_TABLE_STREAM_MIN_BYTES", STREAM_MIN_BYTES))
+
+
+def plan_conversions(source_dir, output_dir):
+    """
+    Walk ``source_dir`` and return ``(input_path, output_path)`` pairs for
+    every supported file, mirroring the tree under ``output_dir``.
+
+    Outputs replace the input extension with ``.md``; when two inputs in the
+    same directory share a stem, both keep their extension (``a.pdf.md``).
+    """
+    plan = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        relative_root = os.path.relpath(root, source_dir)
+        names = sorted(name for name in files if allowed_file(name))
+        stems = [os.path.splitext(name)[0] for name in names]
+        for name, stem in zip(names, stems):
+            output_name = stem + ".md" if stems.count(stem) == 1 else name + ".md"
+            plan.append((
+                os.path.join(root, name),
+                os.path.normpath(os.path.join(output_dir, relative_root, output_name)),
+            ))
+    return plan
+
+
+def is_up_to_date(input_path, output_path):
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+
+def write_output(output_path, markdown):
+    directory = os.path.dirname(output_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(markdown)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def is_large_table(input_path):
+    """
+    Whether ``input_path`` is a spreadsheet big enough to write row by row.
+    """
+    if os.path.splitext(input_path)[1].lower() not in TABULAR_EXTENSIONS:
+        return False
+    return bool(TABLE_STREAM_MIN_BYTES) and os.path.getsize(input_path) >= TABLE_STREAM_MIN_BYTES
+
+
+def write_table_output(output_path, input_path, run_in=None):
+    """
+    Write a spreadsheet's markdown straight to ``output_path`` without holding
+    it in memory, through ``run_in(fn, *args)`` (a worker pool) when given.
+    Returns the number of bytes written.
+    """
+    directory = os.path.dirname(output_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        if run_in is None:
+            written = write_table_markdown(input_path, temp_path)
+        else:
+            written = run_in(write_table_markdown, input_path, temp_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return written
+
+
+def run(source_dir, output_dir, jobs, force=False, timeout=None, quiet=False):
+    """
+    Convert ``source_dir`` into ``output_dir`` and return a summary dict.
+    """
+    plan = plan_conversions(source_dir, output_dir)
+    pending = [item for item in plan if force or not is_up_to_date(*item)]
+    summary = {
+        "total": len(plan),
+        "skipped": len(plan) - len(pending),
+        "converted": 0,
+        "failed": [],
+        "input_bytes": 0,
+        "output_bytes": 0,
+    }
+
+    pool = None
+    # Only a worker process can be abandoned mid-conversion, so a timeout always needs the pool
+    if pending and (timeout or (jobs > 1 and len(pending) > 1)):
+        pool = ProcessPool(processes=max(1, min(jobs, len(pending))), timeout=timeout)
+        pool.start()
+        convert = pool.convert_path
+    else:
+        convert = convert_to_markdown
+
+    def convert_one(input_path, output_path):
+        if is_large_table(input_path):
+            return write_table_output(output_path, input_path, pool.run if pool is not None else None)
+        markdown = convert(input_path)
+        write_output(output_path, markdown)
+        return len(markdown.encode("utf-8"))
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(pending)))) as executor:
+            futures = {executor.submit(convert_one, *item): item for item in pending}
+            for future in as_completed(futures):
+                input_path, output_path = futures[future]
+                try:
+                    written = future.result()
+                except Exception as e:
+                    summary["failed"].append((input_path, str(e)))
+                    if not quiet:
+                        print(f"FAILED {input_path}: {e}", file=sys.stderr)
+                    continue
+                summary["converted"] += 1
+                summary["input_bytes"] += os.path.getsize(input_path)
+                summary["output_bytes"] += written
+                if not quiet:
+                    print(f"converted {input_path} -> {output_path}")
+    finally:
+        if pool is not None:
+            pool.close()
+    summary["elapsed"] = time.perf_counter() - started
+    return summary
+
+
+def format_summary(summary):
+    elapsed = summary["elapsed"]
+    files_per_second = summary["converted"] / elapsed if elapsed else 0.0
+    mb_per_second = summary["input_bytes"] / (1024 * 1024) / elapsed if elapsed else 0.0
+    lines = [
+        f"{summary['converted']} converted, {summary['skipped']} up to date, "
+        f"{len(summary['failed'])} failed, {summary['total']} total",
+        f"{elapsed:.2f} s, {files_per_second:.1f} files/s, {mb_per_second:.2f} MB/s input, "
+        f"{summary['output_bytes']} bytes of markdown written",
+    ]
+    for input_path, error in summary["failed"]:
+        lines.append(f"  failed: {input_path}: {error}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a directory tree of documents to markdown.")
+    parser.add_argument("source", help="directory to convert")
+    parser.add_argument("-o", "--output", help="output directory (default: SOURCE-md)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="parallel worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="convert files even when their output is up to date")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a single conversion is abandoned")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+    # Only problems are worth showing next to the progress lines; worker processes inherit this
+    os.environ.setdefault("FILE2MD_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("FILE2MD_LOG_FORMAT", "text")
+    configure_logging()
+
+    if not os.path.isdir(args.source):
+        parser.error(f"{args.source} is not a directory")
+    output = args.output or os.path.normpath(args.source) + "-md"
+
+    summary = run(args.source, output, max(1, args.jobs), args.force, args.timeout, args.quiet)
+    print(format_summary(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
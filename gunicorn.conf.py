@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for serving file2md in production.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Runs ``FILE2MD_WORKERS`` processes with ``FILE2MD_THREADS`` threads each, so
+conversions use every core while slow uploads and downloads do not tie up a
+whole process. With ``FILE2MD_PRELOAD=1`` (the default) the master imports
+the app and warms the conversion engine once, then forks workers that share
+those pages copy-on-write instead of each paying the import and model load.
+"""
+import gc
+import os
+import tempfile
+
+bind = os.getenv("FILE2MD_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("FILE2MD_WORKERS", os.cpu_count() or 1))
+threads = int(os.getenv("FILE2MD_THREADS", 4))
+worker_class = "gthread"
+# Seconds a worker may go silent before it is killed; conversions run in
+# threads, so this covers hung processes rather than long documents
+timeout = int(os.getenv("FILE2MD_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("FILE2MD_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# Recycle workers to cap memory growth in the parsing libraries
+max_requests = int(os.getenv("FILE2MD_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("FILE2MD_MAX_REQUESTS_JITTER", 100))
+
+preload_app = os.getenv("FILE2MD_PRELOAD", "1") == "1"
+if preload_app:
+    os.environ.setdefault("FILE2MD_STARTUP", "preload")
+
+if workers > 1:
+    # A job's status may be polled on any worker, so job state lives on disk
+    os.environ.setdefault("FILE2MD_JOB_DIR", os.path.join(tempfile.gettempdir(), "file2md-jobs"))
+
+
+def when_ready(server):
+    if preload_app:
+        # Keep the warmed objects out of future collections so the GC does not
+        # write to (and un-share) their pages in every worker
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Pool worker pipes cannot be shared between forked workers, so each one starts its own
+    import app
+
+    if app.process_pool is not None:
+        app.process_pool.start()
@@ -1,4 +1,26 @@
-from app import app
+"""
+Start file2md.
+
+By default this execs gunicorn with ``gunicorn.conf.py`` (see the
+``FILE2MD_WORKERS``, ``FILE2MD_THREADS``, ``FILE2MD_TIMEOUT`` and
+``FILE2MD_MAX_REQUESTS`` variables). ``FILE2MD_DEBUG=1`` runs the Flask
+development server with the debugger and reloader instead.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    if os.getenv("FILE2MD_DEBUG") == "1":
+        from app import app
+
+        app.run(host="0.0.0.0", port=5000, debug=True)
+        return
+    os.chdir(ROOT)
+    os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"])
+
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    main()
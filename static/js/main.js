@@ -10,6 +10,14 @@ document.addEventListener('DOMContentLoaded', function() {
     const alertArea = document.getElementById('alertArea');
     const themeToggle = document.getElementById('themeToggle');
     const featureSection = document.getElementById('featureSection');
+    const JOB_POLL_INTERVAL_MS = 500;
+    const STREAMED_EXTENSIONS = ['pdf', 'docx', 'pptx', 'xlsx'];
+    // Files from this size are sent in chunks that can be retried and resumed
+    const CHUNKED_UPLOAD_MIN_BYTES = 32 * 1024 * 1024;
+    const CHUNK_CONCURRENCY = 3;
+    const CHUNK_RETRIES = 4;
+    // Share of the progress bar given to uploading; conversion fills the rest
+    const UPLOAD_PROGRESS_SHARE = 0.5;
 
     // Initialize theme
     initializeTheme();
@@ -154,29 +162,19 @@ document.addEventListener('DOMContentLoaded', function() {
         previewArea.classList.add('d-none');
         alertArea.innerHTML = '';
 
-        // Simulate upload progress
-        let progress = 0;
-        const progressInterval = setInterval(() => {
-            progress += Math.random() * 30;
-            if (progress > 100) progress = 100;
-            progressBarInner.style.width = `${Math.min(progress, 90)}%`;
-        }, 200);
+        // Large files upload in resumable chunks, page-structured documents stream in
+        // as they convert, and everything else runs as a job
+        let conversion;
+        if (file.size >= CHUNKED_UPLOAD_MIN_BYTES) {
+            conversion = chunkedConversion(file);
+        } else if (isStreamable(file.name)) {
+            conversion = streamConversion(formData);
+        } else {
+            conversion = convertWithJob(formData);
+        }
 
-        // Fetch conversion
-        fetch('/convert', {
-            method: 'POST',
-            body: formData
-        })
-        .then(response => {
-            if (!response.ok) {
-                return response.json().then(data => {
-                    throw new Error(data.error || `Server error: ${response.status}`);
-                });
-            }
-            return response.json();
-        })
+        conversion
         .then(data => {
-            clearInterval(progressInterval);
             progressBarInner.style.width = '100%';
 
             if (data.error) {
@@ -200,7 +198,6 @@ document.addEventListener('DOMContentLoaded', function() {
             showAlert('File converted successfully!', 'success');
         })
         .catch(error => {
-            clearInterval(progressInterval);
             showAlert(error.message || 'An error occurred during conversion', 'danger');
             featureSection.classList.remove('d-none');
             previewArea.classList.add('d-none');
@@ -215,6 +212,250 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function isStreamable(fileName) {
+        const extension = fileName.split('.').pop().toLowerCase();
+        return STREAMED_EXTENSIONS.includes(extension);
+    }
+
+    function setProgress(fraction) {
+        progressBarInner.style.width = `${Math.round(Math.min(1, fraction) * 100)}%`;
+    }
+
+    // Submit a background job, then poll it until the conversion finishes
+    function convertWithJob(formData) {
+        return sendWithProgress('POST', '/jobs', formData, loaded => {
+            setProgress(UPLOAD_PROGRESS_SHARE * loaded / formData.get('file').size);
+        })
+        .then(job => pollJob(job, UPLOAD_PROGRESS_SHARE))
+        .then(job => fetch(job.result_url))
+        .then(readJson);
+    }
+
+    // Send a request with XMLHttpRequest, which reports upload progress unlike fetch
+    function sendWithProgress(method, url, body, onProgress, headers = {}) {
+        return new Promise((resolve, reject) => {
+            const xhr = new XMLHttpRequest();
+            xhr.open(method, url);
+            Object.entries(headers).forEach(([name, value]) => xhr.setRequestHeader(name, value));
+            xhr.responseType = 'json';
+            xhr.upload.onprogress = e => onProgress(e.loaded);
+            xhr.onload = () => {
+                const data = xhr.response || {};
+                if (xhr.status >= 200 && xhr.status < 300) {
+                    resolve(data);
+                } else {
+                    const error = new Error(data.error || `Server error: ${xhr.status}`);
+                    error.status = xhr.status;
+                    reject(error);
+                }
+            };
+            xhr.onerror = () => reject(new Error('Network error while uploading'));
+            xhr.send(body);
+        });
+    }
+
+    // Upload a large file in parallel chunks, resuming an earlier attempt at the same
+    // file, then convert the assembled upload as a background job
+    function chunkedConversion(file) {
+        const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+        const loadedByChunk = {};
+
+        function reportProgress() {
+            const loaded = Object.values(loadedByChunk).reduce((sum, bytes) => sum + bytes, 0);
+            setProgress(UPLOAD_PROGRESS_SHARE * loaded / Math.max(1, file.size));
+        }
+
+        function startSession() {
+            const previous = localStorage.getItem(resumeKey);
+            const fresh = () => fetch('/uploads', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, size: file.size })
+            })
+            .then(readJson)
+            .then(upload => {
+                localStorage.setItem(resumeKey, upload.upload_id);
+                return upload;
+            });
+            if (!previous) {
+                return fresh();
+            }
+            return fetch(`/uploads/${previous}`)
+                .then(response => response.ok ? response.json() : fresh());
+        }
+
+        function sendChunk(upload, index, attempt = 0) {
+            const start = index * upload.chunk_size;
+            const blob = file.slice(start, Math.min(file.size, start + upload.chunk_size));
+            return chunkHeaders(blob)
+                .then(headers => sendWithProgress(
+                    'PUT',
+                    upload.chunk_url.replace('{index}', index),
+                    blob,
+                    loaded => {
+                        loadedByChunk[index] = loaded;
+                        reportProgress();
+                    },
+                    headers
+                ))
+                .then(() => {
+                    loadedByChunk[index] = blob.size;
+                    reportProgress();
+                })
+                .catch(error => {
+                    loadedByChunk[index] = 0;
+                    if (attempt + 1 >= CHUNK_RETRIES || error.status === 404) {
+                        throw error;
+                    }
+                    // Back off before retrying: the server may be busy or the network flaky
+                    return new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt))
+                        .then(() => sendChunk(upload, index, attempt + 1));
+                });
+        }
+
+        return startSession().then(upload => {
+            upload.received.forEach(index => {
+                loadedByChunk[index] = Math.min(upload.chunk_size, file.size - index * upload.chunk_size);
+            });
+            reportProgress();
+            const pending = [];
+            for (let index = 0; index < upload.chunks; index++) {
+                if (!upload.received.includes(index)) {
+                    pending.push(index);
+                }
+            }
+
+            // A fixed number of workers each take the next missing chunk until none are left
+            function worker() {
+                const index = pending.shift();
+                if (index === undefined) {
+                    return Promise.resolve();
+                }
+                return sendChunk(upload, index).then(worker);
+            }
+            const workers = Array.from({ length: Math.min(CHUNK_CONCURRENCY, pending.length) }, worker);
+
+            return Promise.all(workers)
+                .then(() => fetch(upload.complete_url, { method: 'POST' }))
+                .then(readJson)
+                .then(job => {
+                    localStorage.removeItem(resumeKey);
+                    return pollJob(job, UPLOAD_PROGRESS_SHARE);
+                })
+                .then(job => fetch(job.result_url))
+                .then(readJson);
+        });
+    }
+
+    // Checksum a chunk so the server refuses one corrupted in transit; needs a secure context
+    function chunkHeaders(blob) {
+        if (!window.crypto || !window.crypto.subtle) {
+            return Promise.resolve({});
+        }
+        return blob.arrayBuffer()
+            .then(buffer => window.crypto.subtle.digest('SHA-256', buffer))
+            .then(digest => ({
+                'X-Chunk-SHA256': Array.from(new Uint8Array(digest))
+                    .map(byte => byte.toString(16).padStart(2, '0'))
+                    .join('')
+            }));
+    }
+
+    // Read Server-Sent Events from /convert and render each chunk as it arrives
+    function streamConversion(formData) {
+        return fetch('/convert?stream=sse', {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => {
+            if (!response.ok) {
+                return readJson(response);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let markdown = '';
+            let chunkCount = 0;
+
+            markdownContent.textContent = '';
+            previewArea.classList.remove('d-none');
+
+            function handleEvent(block) {
+                let eventName = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        eventName = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+                const payload = data ? JSON.parse(data) : {};
+                if (eventName === 'chunk') {
+                    markdown += payload.markdown;
+                    markdownContent.append(payload.markdown);
+                    chunkCount += 1;
+                    progressBarInner.style.width = `${Math.min(90, 10 + chunkCount * 5)}%`;
+                } else if (eventName === 'error') {
+                    throw new Error(payload.error || 'Conversion failed');
+                }
+                return eventName === 'done';
+            }
+
+            function read() {
+                return reader.read().then(({ done, value }) => {
+                    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                    const blocks = buffer.split('\n\n');
+                    buffer = blocks.pop();
+                    for (const block of blocks) {
+                        if (block.trim() && handleEvent(block)) {
+                            return { success: true, markdown: markdown };
+                        }
+                    }
+                    if (done) {
+                        throw new Error('Conversion stream ended unexpectedly');
+                    }
+                    return read();
+                });
+            }
+
+            return read();
+        });
+    }
+
+    function readJson(response) {
+        return response.json().then(data => {
+            if (!response.ok) {
+                throw new Error(data.error || `Server error: ${response.status}`);
+            }
+            return data;
+        });
+    }
+
+    // Poll a conversion job, reflecting its progress after the first `offset` of the bar,
+    // until it is done or failed
+    function pollJob(job, offset = 0) {
+        return new Promise((resolve, reject) => {
+            function check() {
+                fetch(job.status_url)
+                    .then(readJson)
+                    .then(status => {
+                        setProgress(offset + (1 - offset) * Math.max(0.1, status.progress));
+                        if (status.status === 'done') {
+                            resolve(status);
+                        } else if (status.status === 'failed') {
+                            reject(new Error(status.error || 'Conversion failed'));
+                        } else {
+                            setTimeout(check, JOB_POLL_INTERVAL_MS);
+                        }
+                    })
+                    .catch(reject);
+            }
+            check();
+        });
+    }
+
     // Download markdown
     function downloadMarkdown(content, originalFileName) {
         const baseName = originalFileName.replace(/\.[^/.]+$/, '') || 'converted';
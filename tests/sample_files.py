@@ -61,14 +61,29 @@ def create_sample_files(base_dir: Path) -> dict[str, Path]:
 
 
 def _write_simple_pdf(path: Path, text: str) -> None:
-    content = f"BT\n/F1 24 Tf\n72 120 Td\n({text}) Tj\nET\n"
+    _write_pdf_pages(path, [text])
+
+
+def _write_pdf_pages(path: Path, texts: list[str]) -> None:
+    page_count = len(texts)
+    font_id = 3 + 2 * page_count
+    kids = " ".join(f"{3 + 2 * index} 0 R" for index in range(page_count))
     objects = [
         "1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n",
-        "2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n",
-        "3 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 300 200] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>\nendobj\n",
-        f"4 0 obj\n<< /Length {len(content)} >>\nstream\n{content}endstream\nendobj\n",
-        "5 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n",
+        f"2 0 obj\n<< /Type /Pages /Kids [{kids}] /Count {page_count} >>\nendobj\n",
     ]
+    for index, text in enumerate(texts):
+        page_id = 3 + 2 * index
+        content = f"BT\n/F1 24 Tf\n72 120 Td\n({text}) Tj\nET\n"
+        objects.append(
+            f"{page_id} 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 300 200] /Contents {page_id + 1} 0 R /Resources << /Font << /F1 {font_id} 0 R >> >> >>\nendobj\n"
+        )
+        objects.append(
+            f"{page_id + 1} 0 obj\n<< /Length {len(content)} >>\nstream\n{content}endstream\nendobj\n"
+        )
+    objects.append(
+        f"{font_id} 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n"
+    )
 
     buffer = io.BytesIO()
     buffer.write(b"%PDF-1.4\n")
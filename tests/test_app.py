@@ -1,4 +1,5 @@
 import io
+import os
 
 from app import app as flask_app
 
@@ -30,3 +31,49 @@ def test_convert_endpoint_rejects_unsupported_extension():
     response = client.post("/convert", data=data, content_type="multipart/form-data")
 
     assert response.status_code == 400
+
+
+def test_convert_endpoint_serves_repeat_uploads_from_cache():
+    flask_app.testing = True
+    client = flask_app.test_client()
+    body = b"<!doctype html><html><body><h1>Cached once</h1></body></html>"
+
+    first = client.post("/convert", data={"file": (io.BytesIO(body), "cached.html")}, content_type="multipart/form-data")
+    second = client.post("/convert", data={"file": (io.BytesIO(body), "again.html")}, content_type="multipart/form-data")
+
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.get_json()["markdown"] == first.get_json()["markdown"]
+
+
+def test_upload_request_spools_only_large_bodies_to_disk():
+    from app import UPLOAD_MEMORY_LIMIT, UploadRequest
+
+    with flask_app.test_request_context("/convert", method="POST"):
+        upload_request = UploadRequest({})
+        small = upload_request._get_file_stream(1024, "text/html")
+        large = upload_request._get_file_stream(UPLOAD_MEMORY_LIMIT + 1, "application/pdf")
+
+    assert isinstance(small, io.BytesIO)
+    assert not isinstance(large, io.BytesIO)
+    large.close()
+
+
+def test_lazy_startup_defers_loading_the_conversion_engine():
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    script = "import sys, app; print('markitdown' in sys.modules, app.STARTUP_MODE)"
+    env = {key: value for key, value in os.environ.items() if key != "FILE2MD_STARTUP"}
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+    )
+
+    assert completed.stdout.split() == ["False", "lazy"]
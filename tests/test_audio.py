@@ -0,0 +1,125 @@
+import io
+import threading
+import time
+import wave
+
+from app import app as flask_app
+from utils import converter
+from utils.audio import (
+    TRANSCRIPT_HEADING,
+    Transcriber,
+    TranscriptionBackend,
+    TranscriptionUnavailable,
+    load_backend,
+)
+from utils.cache import ResultCache
+
+
+def _wav(seconds, frame_rate=8000, loud=()):
+    """
+    Mono 16-bit WAV; seconds listed in ``loud`` carry a non-zero level so each
+    second of audio is distinguishable.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(frame_rate)
+        for second in range(seconds):
+            level = (second + 1) * 100 if second in loud else 0
+            writer.writeframes(level.to_bytes(2, "little", signed=True) * frame_rate)
+    return buffer.getvalue()
+
+
+class LevelBackend(TranscriptionBackend):
+    """
+    Reports the level of each chunk, treating silence as no speech.
+    """
+
+    name = "level"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, wav_bytes):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        with wave.open(io.BytesIO(wav_bytes)) as reader:
+            level = int.from_bytes(reader.readframes(1), "little", signed=True)
+        return f"level {level}" if level else ""
+
+
+def test_chunks_are_transcribed_in_parallel_and_kept_in_order():
+    backend = LevelBackend(delay=0.05)
+    transcriber = Transcriber(backend, chunk_seconds=1, workers=3)
+
+    markdown = transcriber.to_markdown(io.BytesIO(_wav(6, loud=range(6))), ".wav")
+
+    assert markdown.startswith("Duration: 00:06\nNumChannels: 1\nSampleRate: 8000\n\n" + TRANSCRIPT_HEADING)
+    assert [line.split("] ")[1] for line in markdown.splitlines() if line.startswith("[")] == [
+        f"level {level}" for level in (100, 200, 300, 400, 500, 600)
+    ]
+    assert 1 < backend.peak <= 3
+
+
+def test_partial_transcripts_stream_and_silence_is_skipped():
+    transcriber = Transcriber(LevelBackend(), chunk_seconds=2, workers=2)
+
+    chunks = list(transcriber.iter_markdown(io.BytesIO(_wav(6, loud={2})), ".wav"))
+
+    assert chunks[1] == "\n" + TRANSCRIPT_HEADING + "[00:02] level 300\n"
+    assert len(chunks) == 2
+    silent = Transcriber(LevelBackend(), chunk_seconds=2).to_markdown(io.BytesIO(_wav(2)), ".wav")
+    assert silent.endswith(TRANSCRIPT_HEADING + "[No speech detected]\n")
+
+
+def test_chunk_transcripts_are_cached_by_audio_hash():
+    backend = LevelBackend()
+    transcriber = Transcriber(backend, chunk_seconds=1, cache=ResultCache(max_entries=16))
+
+    first = transcriber.to_markdown(io.BytesIO(_wav(3, loud={0, 1, 2})), ".wav")
+    second = transcriber.to_markdown(io.BytesIO(_wav(3, loud={0, 1, 2})), ".wav")
+
+    assert first == second
+    assert backend.calls == 3
+
+
+def test_unavailable_backend_and_none_keep_metadata_only():
+    class Missing(TranscriptionBackend):
+        name = "missing"
+
+        def transcribe(self, wav_bytes):
+            raise TranscriptionUnavailable("not installed")
+
+    data = _wav(1, loud={0})
+
+    assert Transcriber(Missing()).to_markdown(io.BytesIO(data), ".wav") == "Duration: 00:01\nNumChannels: 1\nSampleRate: 8000\n"
+    assert Transcriber(load_backend("none")).to_markdown(io.BytesIO(data), ".wav").count("\n") == 3
+    assert load_backend("tests.test_audio:LevelBackend").name == "level"
+
+
+def test_streaming_endpoint_sends_partial_transcripts(monkeypatch):
+    monkeypatch.setattr(converter.transcriber, "backend", LevelBackend())
+    monkeypatch.setattr(converter.transcriber, "chunk_seconds", 1)
+    flask_app.testing = True
+    client = flask_app.test_client()
+
+    response = client.post(
+        "/convert?stream=sse",
+        data={"file": (io.BytesIO(_wav(3, loud={0, 2})), "talk.wav")},
+        content_type="multipart/form-data",
+    )
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "[00:00] level 100" in body
+    assert "[00:02] level 300" in body
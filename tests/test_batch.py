@@ -0,0 +1,120 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from app import app as flask_app
+from utils.batch import BatchError, BatchItem, iter_results, safe_entry_name, zip_items
+
+
+def _zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _ndjson(response):
+    return {record["filename"]: record for record in map(json.loads, response.data.decode("utf-8").splitlines())}
+
+
+def test_iter_results_reports_failures_without_stopping():
+    def convert(stream, name):
+        if name == "bad.pdf":
+            raise ValueError("corrupt")
+        return stream.read().decode("utf-8")
+
+    items = [
+        BatchItem("good.html", lambda: io.BytesIO(b"ok")),
+        BatchItem("bad.pdf", lambda: io.BytesIO(b"")),
+        BatchItem("skip.exe", error="File type not supported"),
+    ]
+
+    results = {name: (markdown, error) for name, markdown, error in iter_results(items, convert, workers=2)}
+
+    assert results["good.html"] == ("ok", None)
+    assert results["bad.pdf"] == (None, "corrupt")
+    assert results["skip.exe"] == (None, "File type not supported")
+
+
+def test_safe_entry_name_strips_traversal():
+    assert safe_entry_name("../../etc/passwd.html") == "etc/passwd.html"
+    assert safe_entry_name("/abs/doc.pdf") == "abs/doc.pdf"
+    assert safe_entry_name("dir\\nested\\doc.csv") == "dir/nested/doc.csv"
+
+
+def test_zip_items_rejects_archives_that_expand_too_far():
+    archive = zipfile.ZipFile(io.BytesIO(_zip_bytes({"a.html": "x" * 100})))
+
+    with pytest.raises(BatchError):
+        zip_items(archive, lambda name: True, max_uncompressed=10)
+
+
+def test_zip_items_reports_members_over_their_format_limit():
+    archive = zipfile.ZipFile(io.BytesIO(_zip_bytes({"big.csv": "a,b\n" * 100, "small.html": "<p>ok</p>"})))
+
+    items = zip_items(archive, lambda name: True, member_limit=lambda name: 64 if name.endswith(".csv") else None)
+
+    by_name = {item.name: item for item in items}
+    assert "limit" in by_name["big.csv"].error
+    assert by_name["small.html"].error is None
+
+
+class TestBatchEndpoint:
+    def setup_method(self):
+        flask_app.testing = True
+        self.client = flask_app.test_client()
+
+    def test_batch_of_files_streams_ndjson(self):
+        data = {
+            "files": [
+                (io.BytesIO(b"<html><body><h1>Batch one</h1></body></html>"), "one.html"),
+                (io.BytesIO(b"title,value\nBatch two,2\n"), "two.csv"),
+                (io.BytesIO(b"MZ"), "three.exe"),
+            ]
+        }
+
+        response = self.client.post("/batch", data=data, content_type="multipart/form-data")
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        records = _ndjson(response)
+        assert "Batch one" in records["one.html"]["markdown"]
+        assert "Batch two" in records["two.csv"]["markdown"]
+        assert records["three.exe"]["success"] is False
+
+    def test_zip_upload_returns_zip_of_markdown(self):
+        archive = _zip_bytes({
+            "docs/page.html": "<html><body><h1>Zipped page</h1></body></html>",
+            "docs/data.json": json.dumps({"message": "Zipped JSON"}),
+            "docs/tool.exe": "MZ",
+        })
+
+        response = self.client.post(
+            "/batch?format=zip",
+            data={"file": (io.BytesIO(archive), "corpus.zip")},
+            content_type="multipart/form-data",
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(response.data)) as result:
+            names = set(result.namelist())
+            assert {"docs/page.md", "docs/data.md", "errors.json"} <= names
+            assert "Zipped page" in result.read("docs/page.md").decode("utf-8")
+            errors = json.loads(result.read("errors.json"))
+            assert errors[0]["filename"] == "docs/tool.exe"
+
+    def test_batch_rejects_invalid_zip(self):
+        response = self.client.post(
+            "/batch",
+            data={"file": (io.BytesIO(b"not a zip"), "broken.zip")},
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 400
+
+    def test_batch_requires_files(self):
+        response = self.client.post("/batch", data={}, content_type="multipart/form-data")
+        assert response.status_code == 400
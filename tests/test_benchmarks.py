@@ -0,0 +1,153 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.corpus import FORMATS, create_corpus
+from benchmarks.run import format_report, main, percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+
+    assert percentile(values, 0.5) == 3.0
+    assert percentile(values, 0.9) == 5.0
+    assert percentile(values, 0.0) == 1.0
+
+
+def test_create_corpus_scales_every_format(tmp_path):
+    small = create_corpus(tmp_path / "small", scale=0.001)
+    large = create_corpus(tmp_path / "large", scale=0.01, formats=(".csv", ".json"))
+
+    assert set(small) == set(FORMATS)
+    assert large[".csv"].stat().st_size > small[".csv"].stat().st_size
+    assert large[".json"].stat().st_size > small[".json"].stat().st_size
+
+
+def test_format_report_compares_against_baseline():
+    result = {
+        "format": ".csv",
+        "mode": "direct",
+        "input_bytes": 1024,
+        "latency_ms": {"p50": 20.0, "p90": 25.0, "p99": 30.0},
+        "docs_per_second": 50.0,
+        "mb_per_second": 0.05,
+        "peak_rss_mb": 110.0,
+    }
+    baseline = {"results": [dict(result, latency_ms={"p50": 40.0}, peak_rss_mb=100.0)]}
+
+    report = format_report({"results": [result]}, baseline)
+
+    assert "-50.0%" in report
+    assert "+10.0%" in report
+
+
+@pytest.mark.slow
+def test_main_writes_machine_readable_results(tmp_path, capsys):
+    output = tmp_path / "results.json"
+
+    assert main(["--scale", "0.001", "--iterations", "2", "--formats", "csv", "--modes", "direct,flask", "-o", str(output)]) == 0
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["meta"]["scale"] == 0.001
+    assert [(item["format"], item["mode"]) for item in report["results"]] == [(".csv", "direct"), (".csv", "flask")]
+    assert report["results"][0]["latency_ms"]["p50"] > 0
+    assert report["results"][0]["peak_rss_mb"] > 0
+    assert ".csv" in capsys.readouterr().out
+
+
+def test_startup_report_lists_every_worker():
+    from benchmarks.startup import format_report
+
+    results = [
+        {"mode": "lazy", "import_ms": 150.0, "workers": [{"ready_ms": 1400.0, "first_request_ms": 1250.0, "private_mb": 160.0}]},
+        {
+            "mode": "preload",
+            "import_ms": 1300.0,
+            "workers": [
+                {"ready_ms": 40.0, "first_request_ms": 25.0, "private_mb": 15.0},
+                {"ready_ms": 45.0, "first_request_ms": 26.0, "private_mb": None},
+            ],
+        },
+    ]
+
+    lines = format_report(results)
+
+    assert len(lines.splitlines()) == 4
+    assert lines.splitlines()[1].split() == ["lazy", "150", "1", "1400", "1250", "160.0"]
+    assert lines.splitlines()[3].split()[-1] == "n/a"
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="preload mode needs os.fork")
+def test_preloaded_workers_start_without_reloading_the_engine():
+    from benchmarks.startup import measure
+
+    result = measure("preload", workers=1)
+
+    worker = result["workers"][0]
+    assert worker["first_request_ms"] < result["import_ms"]
+
+
+def test_load_report_shows_speedup_over_first_row():
+    from benchmarks.load import format_report, multipart_body
+
+    body, content_type = multipart_body("doc.html", b"<p>x</p>")
+    results = [
+        {"workers": 1, "threads": 4, "requests_per_second": 20.0, "errors": 0, "latency_ms": {"p50": 50.0, "p90": 60.0, "p99": 70.0}},
+        {"workers": 4, "threads": 4, "requests_per_second": 70.0, "errors": 1, "latency_ms": {"p50": 55.0, "p90": 65.0, "p99": 90.0}},
+    ]
+
+    lines = format_report(results).splitlines()
+
+    assert content_type.split("boundary=")[1].encode() in body
+    assert b'filename="doc.html"' in body
+    assert lines[2].split()[:4] == ["4", "4", "70.0", "3.50x"]
+
+
+def test_tables_benchmark_keeps_streaming_memory_flat(tmp_path):
+    from benchmarks.tables import create_table, format_report, measure
+
+    path = create_table(tmp_path / "rows.csv", 2000)
+    result = measure("stream", path)
+    result.update(format=".csv", rows=2000, method="stream", input_bytes=path.stat().st_size)
+
+    assert path.read_text(encoding="utf-8").count("\n") == 2001
+    assert result["output_bytes"] > path.stat().st_size
+    assert format_report([result]).splitlines()[1].split()[:4] == [".csv", "2000", "0.1", "stream"]
+
+
+def test_ooxml_benchmark_reports_both_readers(tmp_path):
+    from benchmarks.ooxml import create_docx, create_pptx, format_report, measure
+
+    deck = create_pptx(tmp_path / "deck.pptx", 20)
+    report = create_docx(tmp_path / "report.docx", 120)
+    result = measure("stream", deck)
+    result.update(document="20 slides", method="stream", input_bytes=deck.stat().st_size)
+
+    assert measure("stream", report)["output_bytes"] > 120 * 60
+    assert result["output_bytes"] > 20 * 50
+    assert format_report([result]).splitlines()[1].split()[:2] == ["20", "slides"]
+    assert format_report([result]).splitlines()[1].split()[3] == "stream"
+
+
+def test_markup_benchmark_reports_the_incremental_reader(tmp_path):
+    from benchmarks.markup import create_html, create_json, create_xml, format_report, measure
+
+    document = create_json(tmp_path / "records.json", 30)
+    result = measure("stream", document)
+    result.update(document="json", method="stream", input_bytes=document.stat().st_size)
+
+    assert result["output_bytes"] > 30 * 60
+    assert measure("stream", create_xml(tmp_path / "records.xml", 30))["output_bytes"] > 30 * 60
+    assert measure("stream", create_html(tmp_path / "records.html", 30))["output_bytes"] > 30 * 40
+    assert format_report([result]).splitlines()[1].split()[:3:2] == ["json", "stream"]
+
+
+def test_scheduler_benchmark_reports_both_modes():
+    from benchmarks.scheduler import format_report, simulate
+
+    results = [dict(simulate(mode, 0.3, 1, 2, 0.01), mode=mode) for mode in ("fifo", "fair")]
+
+    assert all(result["small_files"] > 0 for result in results)
+    assert [line.split()[0] for line in format_report(results).splitlines()[1:]] == ["fifo", "fair"]
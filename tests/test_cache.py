@@ -0,0 +1,63 @@
+import os
+
+from utils.cache import ResultCache, make_key
+
+
+def test_make_key_depends_on_content_extension_and_options():
+    base = make_key(b"data", "pdf")
+
+    assert base == make_key(b"data", "PDF")
+    assert base != make_key(b"other", "pdf")
+    assert base != make_key(b"data", "docx")
+    assert base != make_key(b"data", "pdf", pages="1-2")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2, disk_dir=None)
+
+    cache.set("a", "first")
+    cache.set("b", "second")
+    assert cache.get("a") == "first"
+    cache.set("c", "third")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "first"
+    assert cache.get("c") == "third"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_tier_expires_entries_after_ttl(monkeypatch):
+    cache = ResultCache(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr("utils.cache.time.time", lambda: now[0])
+
+    cache.set("key", "value")
+    now[0] += 11
+
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    writer = ResultCache(disk_dir=str(tmp_path))
+    reader = ResultCache(disk_dir=str(tmp_path))
+
+    writer.set("text", "# Heading")
+    writer.set("blob", b"\x00\x01")
+
+    assert reader.get("text") == "# Heading"
+    assert reader.get("blob") == b"\x00\x01"
+    assert reader.stats()["disk_hits"] == 2
+
+
+def test_disk_tier_enforces_size_cap(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=10)
+
+    cache.set("old", "12345678")
+    old_path = tmp_path / "old.md"
+    os.utime(old_path, (1, 1))
+    cache.set("new", "abcdefgh")
+
+    assert cache.get("old") is None
+    assert cache.get("new") == "abcdefgh"
+    assert cache.stats()["disk_evictions"] == 1
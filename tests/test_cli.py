@@ -0,0 +1,92 @@
+import os
+
+import cli
+
+
+def _make_tree(root):
+    (root / "nested").mkdir(parents=True)
+    (root / "page.html").write_text("<html><body><h1>Top page</h1></body></html>", encoding="utf-8")
+    (root / "nested" / "data.csv").write_text("title,value\nNested CSV,1\n", encoding="utf-8")
+    (root / "nested" / "notes.exe").write_bytes(b"MZ")
+    (root / "same.html").write_text("<html><body>Same HTML</body></html>", encoding="utf-8")
+    (root / "same.json").write_text('{"message": "Same JSON"}', encoding="utf-8")
+
+
+def test_plan_conversions_mirrors_tree_and_filters_extensions(tmp_path):
+    source = tmp_path / "in"
+    _make_tree(source)
+
+    plan = {os.path.relpath(output, tmp_path / "out") for _, output in cli.plan_conversions(str(source), str(tmp_path / "out"))}
+
+    assert plan == {
+        "page.md",
+        os.path.join("nested", "data.md"),
+        "same.html.md",
+        "same.json.md",
+    }
+
+
+def test_run_converts_then_skips_up_to_date_outputs(tmp_path):
+    source = tmp_path / "in"
+    output = tmp_path / "out"
+    _make_tree(source)
+
+    first = cli.run(str(source), str(output), jobs=1, quiet=True)
+    second = cli.run(str(source), str(output), jobs=1, quiet=True)
+
+    assert first["converted"] == 4
+    assert not first["failed"]
+    assert "Top page" in (output / "page.md").read_text(encoding="utf-8")
+    assert "Nested CSV" in (output / "nested" / "data.md").read_text(encoding="utf-8")
+    assert second["converted"] == 0
+    assert second["skipped"] == 4
+
+
+def test_run_in_parallel_processes_reports_failures(tmp_path):
+    source = tmp_path / "in"
+    output = tmp_path / "out"
+    _make_tree(source)
+    (source / "broken.pdf").write_bytes(bytes(range(256)) * 4)
+
+    summary = cli.run(str(source), str(output), jobs=2, quiet=True)
+
+    assert summary["converted"] == 4
+    assert [os.path.basename(path) for path, _ in summary["failed"]] == ["broken.pdf"]
+    assert "1 failed" in cli.format_summary(summary)
+
+
+def test_main_returns_nonzero_on_failure(tmp_path, capsys):
+    source = tmp_path / "in"
+    source.mkdir()
+    (source / "broken.pdf").write_bytes(bytes(range(256)) * 4)
+
+    assert cli.main([str(source), "-o", str(tmp_path / "out"), "-j", "1", "-q"]) == 1
+    assert "0 converted" in capsys.readouterr().out
+
+
+def test_run_writes_only_large_spreadsheets_row_by_row(tmp_path, monkeypatch):
+    source = tmp_path / "in"
+    source.mkdir()
+    (source / "small.csv").write_text("title,value\nSmall CSV,1\n", encoding="utf-8")
+    (source / "large.csv").write_text("title,value\n" + "Large CSV,1\n" * 50, encoding="utf-8")
+    monkeypatch.setattr(cli, "TABLE_STREAM_MIN_BYTES", 100)
+    streamed = []
+    original = cli.write_table_markdown
+    monkeypatch.setattr(cli, "write_table_markdown", lambda *args: streamed.append(args[0]) or original(*args))
+
+    summary = cli.run(str(source), str(tmp_path / "out"), jobs=1, quiet=True)
+
+    assert summary["converted"] == 2
+    assert [os.path.basename(path) for path in streamed] == ["large.csv"]
+    assert "Small CSV" in (tmp_path / "out" / "small.md").read_text(encoding="utf-8")
+
+
+def test_run_applies_timeout_to_a_single_file(tmp_path):
+    source = tmp_path / "in"
+    source.mkdir()
+    (source / "page.html").write_text("<html><body>" + "<p>Slow page</p>" * 20000 + "</body></html>", encoding="utf-8")
+
+    summary = cli.run(str(source), str(tmp_path / "out"), jobs=1, timeout=0.001, quiet=True)
+
+    assert summary["converted"] == 0
+    assert "timed out" in summary["failed"][0][1]
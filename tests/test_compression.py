@@ -0,0 +1,87 @@
+import gzip
+import io
+import json
+import time
+
+from werkzeug.http import parse_accept_header
+
+import app as app_module
+from utils.compression import available_encodings, compress, negotiate_encoding
+
+DOCUMENT = b"<html><body>" + b"".join(b"<h2>Part %d</h2><p>Said \"this\" again.</p>" % n for n in range(200)) + b"</body></html>"
+
+
+def test_negotiation_respects_quality_and_size():
+    assert negotiate_encoding(parse_accept_header("gzip"), 10) is None
+    assert negotiate_encoding(parse_accept_header("gzip"), 4096) == "gzip"
+    assert negotiate_encoding(parse_accept_header("gzip;q=0, identity"), 4096) is None
+    assert negotiate_encoding(parse_accept_header(""), 4096) is None
+    assert available_encodings()[-1] == "gzip"
+
+
+def test_gzip_output_is_deterministic():
+    data = b"# Title\n" * 500
+
+    assert compress(data, "gzip") == compress(data, "gzip")
+    assert gzip.decompress(compress(data, "gzip")) == data
+
+
+class TestNegotiatedResponses:
+    def setup_method(self):
+        app_module.app.testing = True
+        self.client = app_module.app.test_client()
+
+    def _post(self, query="", **headers):
+        return self.client.post(
+            "/convert" + query,
+            data={"file": (io.BytesIO(DOCUMENT), "report.html")},
+            content_type="multipart/form-data",
+            headers=headers,
+        )
+
+    def test_raw_markdown_by_format_or_accept_header(self):
+        by_format = self._post("?format=markdown")
+        by_header = self._post(Accept="text/markdown")
+
+        assert by_format.mimetype == "text/markdown"
+        assert by_format.get_data(as_text=True).startswith("## Part 0")
+        assert by_header.data == by_format.data
+        assert self._post().get_json()["success"] is True
+        assert self._post("?format=yaml").status_code == 400
+
+    def test_gzip_bodies_are_cached_between_hits(self, monkeypatch):
+        calls = []
+        real_compress = app_module.compress
+        monkeypatch.setattr(app_module, "compress", lambda data, encoding: calls.append(encoding) or real_compress(data, encoding))
+
+        first = self._post("?format=markdown", **{"Accept-Encoding": "gzip"})
+        second = self._post("?format=markdown", **{"Accept-Encoding": "gzip"})
+
+        assert first.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in first.headers["Vary"]
+        assert gzip.decompress(second.data).decode().startswith("## Part 0")
+        assert first.data == second.data
+        assert len(calls) <= 1
+
+    def test_download_is_an_attachment_named_after_the_upload(self):
+        response = self._post("?format=download", **{"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Disposition"] == "attachment; filename=report.md"
+        assert response.mimetype == "text/markdown"
+        assert gzip.decompress(response.data).decode().startswith("## Part 0")
+
+    def test_job_results_negotiate_and_answer_conditional_requests(self):
+        job_id = self.client.post(
+            "/jobs",
+            data={"file": (io.BytesIO(DOCUMENT), "job.html")},
+            content_type="multipart/form-data",
+        ).get_json()["job_id"]
+        deadline = time.time() + 10
+        while self.client.get(f"/jobs/{job_id}").get_json()["status"] != "done" and time.time() < deadline:
+            time.sleep(0.02)
+
+        result = self.client.get(f"/jobs/{job_id}/result", headers={"Accept-Encoding": "gzip"})
+        again = self.client.get(f"/jobs/{job_id}/result", headers={"Accept-Encoding": "gzip", "If-None-Match": result.headers["ETag"]})
+
+        assert json.loads(gzip.decompress(result.data))["markdown"].startswith("## Part 0")
+        assert again.status_code == 304
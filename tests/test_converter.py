@@ -1,7 +1,10 @@
+import io
+import tempfile
 from pathlib import Path
 
 from app import allowed_file
-from utils.converter import convert_to_markdown
+from tests.sample_files import create_sample_files
+from utils.converter import convert_stream_to_markdown, convert_to_markdown
 
 
 def test_convert_to_markdown_html_fixture():
@@ -17,3 +20,52 @@ def test_allowed_file_accepts_supported_extensions():
     assert allowed_file("sample.pdf")
     assert allowed_file("sample.html")
     assert not allowed_file("sample.exe")
+
+
+def test_convert_to_markdown_reuses_shared_engine(monkeypatch):
+    import markitdown
+
+    from utils import converter
+
+    converter.reset_engine()
+    created = []
+    original = markitdown.MarkItDown
+
+    def tracking_markitdown(*args, **kwargs):
+        engine = original(*args, **kwargs)
+        created.append(engine)
+        return engine
+
+    monkeypatch.setattr(markitdown, "MarkItDown", tracking_markitdown)
+    fixture_path = Path(__file__).parent / "fixtures" / "public" / "sample.html"
+
+    convert_to_markdown(str(fixture_path))
+    convert_to_markdown(str(fixture_path))
+
+    assert len(created) == 1
+    assert converter.get_engine() is created[0]
+
+
+def test_convert_stream_to_markdown_never_touches_disk(tmp_path, monkeypatch):
+    sample_files = create_sample_files(tmp_path)
+    pdf_bytes = sample_files[".pdf"].read_bytes()
+    gif_bytes = sample_files[".gif"].read_bytes()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("stream conversion should not create temp files")
+
+    monkeypatch.setattr(tempfile, "TemporaryDirectory", fail)
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", fail)
+
+    assert "Hello PDF" in convert_stream_to_markdown(io.BytesIO(pdf_bytes), "upload.pdf")
+    assert isinstance(convert_stream_to_markdown(io.BytesIO(gif_bytes), "upload.gif"), str)
+
+
+def test_convert_stream_to_markdown_accepts_spooled_files():
+    with tempfile.SpooledTemporaryFile() as spooled:
+        spooled.write(b"<html><body><h1>Spooled upload</h1></body></html>")
+        spooled.seek(0)
+
+        output = convert_stream_to_markdown(spooled, "upload.html")
+
+    assert "Spooled upload" in output
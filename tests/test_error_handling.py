@@ -102,13 +102,13 @@ class TestEndpointErrorHandling:
 
     def test_convert_allowed_extension_with_wrong_content(self):
         """File with allowed extension but wrong content type."""
-        # PDF extension but HTML content - let converter handle it
+        # PDF extension but HTML content - refused by content sniffing before conversion
         data = {
             "file": (io.BytesIO(b"<!doctype html><html><body>Not a real PDF</body></html>"), "sample.pdf"),
         }
         response = self.client.post("/convert", data=data, content_type="multipart/form-data")
-        # Should attempt conversion; markitdown may fail or succeed
-        assert response.status_code in [200, 500]
+        assert response.status_code == 415
+        assert "text content" in response.get_json()["error"]
 
     def test_convert_very_long_filename(self):
         """Very long filename may cause filesystem errors (expected behavior)."""
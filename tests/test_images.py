@@ -0,0 +1,134 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app import app as flask_app
+from utils import converter
+from utils.cache import ResultCache
+from utils.images import ImageOptionError, ImagePipeline, image_metadata, metadata_markdown
+
+
+def _image_bytes(size=(120, 60), format="PNG", frames=1, exif=None):
+    images = [Image.new("RGB", size, (frame * 40 % 255, 80, 160)) for frame in range(frames)]
+    buffer = io.BytesIO()
+    options = {"save_all": True, "append_images": images[1:]} if frames > 1 else {}
+    if exif is not None:
+        options["exif"] = exif
+    images[0].save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def test_metadata_reads_size_exif_and_animation_without_decoding():
+    exif = Image.Exif()
+    exif[0x013B] = "Ada Lovelace"
+    exif[0x010E] = "Harbour at dusk"
+    jpeg = io.BytesIO(_image_bytes(format="JPEG", exif=exif))
+    gif = io.BytesIO(_image_bytes(format="GIF", frames=3))
+
+    fields = image_metadata(jpeg)
+
+    assert jpeg.tell() == 0
+    assert metadata_markdown(fields).splitlines() == [
+        "ImageSize: 120x60",
+        "Description: Harbour at dusk",
+        "Artist: Ada Lovelace",
+    ]
+    assert image_metadata(gif)["Animated"] == "yes"
+
+
+def test_normalize_downscales_and_picks_one_frame():
+    pipeline = ImagePipeline(max_side=50, frame=2)
+
+    with Image.open(pipeline.normalize(io.BytesIO(_image_bytes(frames=3, format="GIF")), ".gif")) as image:
+        assert image.format == "PNG"
+        assert max(image.size) == 50
+        assert image.getpixel((0, 0))[0] == 80
+
+
+def test_small_images_pass_through_and_gifs_are_cached():
+    pipeline = ImagePipeline(cache=ResultCache(max_entries=4))
+    png = io.BytesIO(_image_bytes())
+    gif = _image_bytes(format="GIF")
+
+    assert pipeline.normalize(png, ".png") is png
+    first = pipeline.normalize(io.BytesIO(gif), ".gif").getvalue()
+    second = pipeline.normalize(io.BytesIO(gif), ".gif").getvalue()
+
+    assert first == second
+    assert pipeline.cache.stats()["hits"] == 1
+
+
+def test_metadata_mode_skips_the_engine():
+    class Engine:
+        def convert_stream(self, *args, **kwargs):
+            raise AssertionError("metadata mode should not convert pixels")
+
+    pipeline = ImagePipeline(mode="metadata")
+
+    assert pipeline.to_markdown(io.BytesIO(_image_bytes()), ".png", Engine()) == "ImageSize: 120x60\n"
+    with pytest.raises(ImageOptionError):
+        ImagePipeline(mode="ocr")
+
+
+def test_full_mode_only_decodes_and_loads_the_engine_for_descriptions(monkeypatch):
+    class Engine:
+        def convert_stream(self, stream, stream_info=None, **kwargs):
+            return type("Result", (), {"text_content": "# Description:\nA harbour\n"})()
+
+    def unused(*args, **kwargs):
+        raise AssertionError("nothing beyond the header should be read without an LLM client")
+
+    gif = _image_bytes(format="GIF")
+    monkeypatch.setattr(converter, "LLM_CLIENT", None)
+    monkeypatch.setattr(converter, "get_engine", unused)
+    monkeypatch.setattr(converter.image_pipeline, "normalize", unused)
+
+    assert converter.convert_stream_to_markdown(io.BytesIO(gif), "photo.gif", image_mode="full") == "ImageSize: 120x60\n"
+
+    monkeypatch.setattr(converter, "LLM_CLIENT", "clients:openai")
+    monkeypatch.setattr(converter, "get_engine", Engine)
+    monkeypatch.delattr(converter.image_pipeline, "normalize")
+
+    described = converter.convert_stream_to_markdown(io.BytesIO(gif), "photo.gif", image_mode="full")
+    assert described.endswith("A harbour\n")
+
+
+def test_full_mode_keeps_exif_for_the_engine_and_skips_repeated_fields():
+    seen = {}
+
+    class Engine:
+        def convert_stream(self, stream, stream_info=None, **kwargs):
+            seen.update(kwargs, exif=Image.open(stream).getexif())
+            return type("Result", (), {"text_content": "ImageSize: 60x30\nArtist: Ada Lovelace\nCopyright: Ada\n"})()
+
+    exif = Image.Exif()
+    exif[0x013B] = "Ada Lovelace"
+    jpeg = io.BytesIO(_image_bytes(format="JPEG", exif=exif))
+    pipeline = ImagePipeline(max_side=60)
+
+    markdown = pipeline.to_markdown(jpeg, ".jpg", engine=Engine(), mode="full")
+
+    assert "exiftool_path" not in seen
+    assert seen["exif"][0x013B] == "Ada Lovelace"
+    assert markdown == "ImageSize: 120x60\nArtist: Ada Lovelace\nCopyright: Ada\n"
+
+
+class TestImageModeEndpoint:
+    def setup_method(self):
+        flask_app.testing = True
+        self.client = flask_app.test_client()
+
+    def _post(self, filename, data, **values):
+        values["file"] = (io.BytesIO(data), filename)
+        return self.client.post("/convert", data=values, content_type="multipart/form-data")
+
+    def test_image_mode_metadata(self):
+        response = self._post("frames.gif", _image_bytes(format="GIF", frames=2), image_mode="metadata")
+
+        assert response.status_code == 200
+        assert response.get_json()["markdown"] == "ImageSize: 120x60\nAnimated: yes\n"
+
+    def test_image_mode_rejected_for_other_formats_and_bad_values(self):
+        assert self._post("page.html", b"<html><body>Hi</body></html>", image_mode="metadata").status_code == 400
+        assert self._post("photo.png", _image_bytes(), image_mode="ocr").status_code == 400
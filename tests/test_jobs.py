@@ -0,0 +1,180 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from utils.jobs import DONE, FAILED, QUEUED, RUNNING, JobManager, QueueFullError, report_progress
+
+
+def _wait_for(job, timeout=10):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+
+def test_job_manager_runs_jobs_and_records_failures():
+    manager = JobManager(workers=2, max_queued=4)
+
+    ok = manager.submit("ok.html", lambda: "# Done")
+    bad = manager.submit("bad.pdf", lambda: 1 / 0)
+    _wait_for(ok)
+    _wait_for(bad)
+
+    assert ok.status == DONE
+    assert ok.result == "# Done"
+    assert ok.progress == 1.0
+    assert bad.status == FAILED
+    assert "division by zero" in bad.error
+    manager.shutdown()
+
+
+def test_running_jobs_report_converter_progress():
+    manager = JobManager(workers=2, max_queued=4)
+    started, reported, release = threading.Event(), threading.Event(), threading.Event()
+
+    def wait():
+        started.set()
+        release.wait()
+
+    def convert():
+        report_progress(1, 4)
+        reported.set()
+        release.wait()
+        return "# Done"
+
+    silent = manager.submit("silent.html", wait)
+    counted = manager.submit("pages.pdf", convert)
+    assert started.wait(5) and reported.wait(5)
+
+    assert counted.progress == 0.25
+    assert silent.status == RUNNING
+    assert silent.progress is None
+    release.set()
+    _wait_for(counted)
+    _wait_for(silent)
+    assert counted.progress == 1.0
+    manager.shutdown()
+
+
+def test_job_manager_rejects_submissions_when_full():
+    manager = JobManager(workers=1, max_queued=2)
+    release = threading.Event()
+
+    running = manager.submit("a.pdf", release.wait)
+    queued = manager.submit("b.pdf", release.wait)
+
+    with pytest.raises(QueueFullError):
+        manager.submit("c.pdf", release.wait)
+
+    assert queued.status == QUEUED
+    assert manager.queue_position(queued) == 0
+    release.set()
+    _wait_for(running)
+    _wait_for(queued)
+    manager.shutdown()
+
+
+def test_job_manager_expires_finished_results(monkeypatch):
+    manager = JobManager(workers=1, result_ttl=60)
+    job = manager.complete("done.html", "# Cached")
+    assert manager.get(job.id) is job
+
+    later = time.time() + 61
+    monkeypatch.setattr("utils.jobs.time.time", lambda: later)
+
+    assert manager.get(job.id) is None
+    manager.shutdown()
+
+
+def test_job_state_is_shared_between_managers(tmp_path):
+    submitting = JobManager(workers=1, state_dir=str(tmp_path))
+    polling = JobManager(workers=1, state_dir=str(tmp_path))
+
+    job = submitting.submit("shared.html", lambda: "# Shared")
+    _wait_for(job)
+    seen = polling.get(job.id)
+
+    assert seen is not job
+    assert seen.status == DONE
+    assert seen.result == "# Shared"
+    assert polling.get("../" + job.id) is None
+    assert polling.get("0" * 32) is None
+    submitting.shutdown()
+    polling.shutdown()
+
+
+def test_sweep_keeps_running_jobs_and_fresh_temp_files(tmp_path):
+    submitting = JobManager(workers=1, result_ttl=60, state_dir=str(tmp_path))
+    sweeping = JobManager(workers=1, result_ttl=60, state_dir=str(tmp_path))
+    release = threading.Event()
+    running = submitting.submit("long.pdf", release.wait)
+    finished = submitting.complete("old.html", "# Old")
+    finished.finished_at -= 120
+    submitting._persist(finished)
+    (tmp_path / "writing.tmp").write_text("{}")
+    stale = time.time() - 7200
+    for name in (running.id + ".json", "abandoned.tmp"):
+        (tmp_path / name).touch()
+        os.utime(tmp_path / name, (stale, stale))
+
+    sweeping._sweep(time.time() - 60)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [running.id + ".json", "writing.tmp"]
+    release.set()
+    _wait_for(running)
+    submitting.shutdown()
+    sweeping.shutdown()
+
+
+class TestJobEndpoints:
+    def setup_method(self):
+        app_module.app.testing = True
+        self.client = app_module.app.test_client()
+
+    def _submit(self, body, filename):
+        return self.client.post(
+            "/jobs",
+            data={"file": (io.BytesIO(body), filename)},
+            content_type="multipart/form-data",
+        )
+
+    def test_submit_poll_and_fetch_result(self):
+        response = self._submit(b"<html><body><h1>Queued job</h1></body></html>", "job.html")
+        assert response.status_code == 202
+        job_id = response.get_json()["job_id"]
+        assert response.headers["Location"] == f"/jobs/{job_id}"
+
+        deadline = time.time() + 10
+        status = {}
+        while time.time() < deadline:
+            status = self.client.get(f"/jobs/{job_id}").get_json()
+            if status["status"] in (DONE, FAILED):
+                break
+            time.sleep(0.02)
+
+        assert status["status"] == DONE
+        result = self.client.get(f"/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert "Queued job" in result.get_json()["markdown"]
+
+    def test_submit_returns_429_when_queue_is_full(self, monkeypatch):
+        manager = JobManager(workers=1, max_queued=0)
+        monkeypatch.setattr(app_module, "job_manager", manager)
+
+        response = self._submit(b"<html><body>Busy</body></html>", "busy-unique.html")
+
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+        manager.shutdown()
+
+    def test_unknown_job_returns_404(self):
+        assert self.client.get("/jobs/missing").status_code == 404
+        assert self.client.get("/jobs/missing/result").status_code == 404
+
+    def test_submit_rejects_unsupported_extension(self):
+        response = self._submit(b"binary", "sample.exe")
+        assert response.status_code == 400
@@ -0,0 +1,68 @@
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import app as app_module
+from utils.logs import JsonFormatter, RequestIdFilter, set_request_id
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_json_records_carry_request_id_extras_and_tracebacks():
+    set_request_id("abc123")
+    try:
+        record = logging.makeLogRecord({"name": "app", "levelname": "INFO", "msg": "took %d ms", "args": (12,), "stages_ms": {"convert": 9.5}})
+        RequestIdFilter().filter(record)
+    finally:
+        set_request_id(None)
+    try:
+        raise ValueError("broken")
+    except ValueError:
+        failed = logging.makeLogRecord({"msg": "failed", "exc_info": sys.exc_info()})
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "took 12 ms"
+    assert entry["request_id"] == "abc123"
+    assert entry["stages_ms"] == {"convert": 9.5}
+    assert "ValueError: broken" in json.loads(JsonFormatter().format(failed))["exception"]
+
+
+def test_configured_process_quiets_libraries_and_flushes_on_exit():
+    script = (
+        "import logging\n"
+        "from utils.logs import configure_logging\n"
+        "configure_logging()\n"
+        "logging.getLogger('pdfminer.psparser').debug('per-object noise')\n"
+        "logging.getLogger('pdfminer.pdfpage').warning('broken xref')\n"
+        "logging.getLogger('app').debug('converted', extra={'duration_ms': 3.0})\n"
+    )
+    env = dict(os.environ, FILE2MD_LOG_LEVEL="DEBUG", FILE2MD_LOG_FORMAT="json")
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=30)
+
+    entries = [json.loads(line) for line in result.stderr.splitlines()]
+
+    assert [entry["message"] for entry in entries] == ["broken xref", "converted"]
+    assert entries[1]["duration_ms"] == 3.0
+
+
+def test_requests_are_logged_with_their_id_and_stage_timings(caplog):
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+
+    with caplog.at_level(logging.INFO, logger="app"):
+        response = client.post(
+            "/convert",
+            data={"file": (io.BytesIO(b"<h1>Title</h1>"), "page.html")},
+            content_type="multipart/form-data",
+            headers={"X-Request-ID": "from-proxy"},
+        )
+
+    record = [record for record in caplog.records if getattr(record, "endpoint", None) == "convert"][-1]
+    assert response.headers["X-Request-ID"] == "from-proxy"
+    assert record.request_id == "from-proxy"
+    assert record.status == 200
+    assert "convert" in record.stages_ms or "sniff" in record.stages_ms
@@ -0,0 +1,126 @@
+import io
+import json
+
+import pytest
+
+from app import app as flask_app
+from utils import converter, markup
+from utils.markup import MarkupLimitError, MarkupLimits, iter_markup_markdown
+
+
+def _markdown(data, extension, limits=None):
+    return "".join(iter_markup_markdown(io.BytesIO(data), extension, limits))
+
+
+DOCUMENT = {
+    "name": "demo",
+    "owner": {"id": 1, "roles": [{"role": "admin", "scope": {"all": True}}]},
+    "tags": ["a", "b"],
+    "empty": [],
+}
+
+
+def test_json_becomes_an_outline_of_headings_and_lists():
+    assert _markdown(json.dumps(DOCUMENT).encode(), ".json") == (
+        "- **name**: demo\n\n"
+        "## owner\n\n"
+        "- **id**: 1\n\n"
+        "### roles\n\n"
+        "- Item 1:\n"
+        "  - **role**: admin\n"
+        "  - **scope**:\n"
+        "    - **all**: true\n\n"
+        "## tags\n\n"
+        "- a\n- b\n\n"
+        "## empty\n\n[]\n"
+    )
+
+
+@pytest.mark.parametrize("window", [None, 8])
+def test_json_values_after_a_section_stay_in_their_own_scope(monkeypatch, window):
+    if window:
+        monkeypatch.setattr(markup, "JSON_WINDOW", window)
+        monkeypatch.setattr(markup, "READ_BYTES", 3)
+
+    assert _markdown(b'{"a": {"x": 1}, "b": 2}', ".json") == "## a\n\n- **x**: 1\n\n## b\n\n2\n"
+    assert _markdown(b'{"a": [1, 2], "b": 2}', ".json") == "## a\n\n- 1\n- 2\n\n## b\n\n2\n"
+
+
+def test_json_larger_than_the_window_is_walked_in_pieces(monkeypatch):
+    data = json.dumps({"records": [{"id": number, "note": "x" * number} for number in range(40)]}).encode()
+    whole = _markdown(data, ".json")
+
+    monkeypatch.setattr(markup, "JSON_WINDOW", 32)
+    monkeypatch.setattr(markup, "READ_BYTES", 7)
+
+    assert _markdown(data, ".json") == whole
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        _markdown(data[:-3], ".json")
+
+
+def test_xml_keeps_nesting_attributes_and_text_without_entities():
+    data = (
+        b'<?xml version="1.0"?><!DOCTYPE r [<!ENTITY x "expanded">]>'
+        b'<r xmlns="urn:test"><item id="1">Hello <b>world</b> again &x;</item><!-- note --><item id="2"/></r>'
+    )
+
+    assert _markdown(data, ".xml") == (
+        "- **r**\n"
+        "  - **item** (id=1): Hello\n"
+        "    - **b**: world\n"
+        "    - again\n"
+        "  - **item** (id=2)\n"
+    )
+
+
+def test_html_drops_boilerplate_while_keeping_content():
+    data = (
+        b"<html><head><title>Page</title><script>track()</script></head><body>"
+        b'<nav><a href="/">Home</a></nav><div><h1>Title</h1>Intro <b>text</b>'
+        b'<p>See <a href="https://example.com">the site</a></p>'
+        b"<ul><li>one<ul><li>nested</li></ul></li><li>two</li></ul>"
+        b"<table><tr><th>a</th><th>b</th></tr><tr><td>1</td><td>2</td></tr></table>"
+        b"<style>p {}</style><pre>x = 1\n  y</pre></div></body></html>"
+    )
+
+    assert _markdown(data, ".html") == (
+        "# Title\n\n"
+        "Intro **text**\n\n"
+        "See [the site](https://example.com)\n\n"
+        "* one\n    * nested\n* two\n\n"
+        "| a | b |\n| --- | --- |\n| 1 | 2 |\n\n"
+        "```\nx = 1\n  y\n```\n"
+    )
+
+
+def test_limits_refuse_deep_documents_and_truncate_long_ones():
+    with pytest.raises(MarkupLimitError):
+        _markdown(b"<a>" * 10 + b"</a>" * 10, ".xml", MarkupLimits(max_depth=5))
+    with pytest.raises(MarkupLimitError):
+        _markdown(b"[" * 10 + b"]" * 10, ".json", MarkupLimits(max_depth=5))
+
+    markdown = _markdown(b"[1, 2, 3, 4, 5]", ".json", MarkupLimits(max_elements=3))
+
+    assert markdown == "- 1\n- 2\n\n*Output truncated after 3 elements.*\n"
+
+
+def test_large_uploads_take_the_incremental_path(monkeypatch):
+    monkeypatch.setattr(converter, "MARKUP_STREAM_MIN_BYTES", 64)
+    monkeypatch.setattr(converter, "markup_limits", MarkupLimits(max_depth=5))
+    flask_app.testing = True
+    client = flask_app.test_client()
+
+    response = client.post(
+        "/convert",
+        data={"file": (io.BytesIO(json.dumps(DOCUMENT).encode()), "data.json")},
+        content_type="multipart/form-data",
+    )
+    deep = client.post(
+        "/convert",
+        data={"file": (io.BytesIO(b"[" * 40 + b"]" * 40), "deep.json")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    assert "### roles" in response.get_json()["markdown"]
+    assert deep.status_code == 422
@@ -0,0 +1,91 @@
+import io
+import os
+
+from app import app as flask_app
+from utils.metrics import Registry, SlowRequestProfiler, conversions_total, finish_request, record_stage, start_request
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    counter = registry.counter("demo_total", "Demo counter.", ("kind",))
+    histogram = registry.histogram("demo_seconds", "Demo latency.", buckets=(0.1, 1))
+    registry.add_collector(lambda: {"demo_gauge": ("Demo gauge.", 3)})
+
+    counter.inc(kind='say "hi"')
+    counter.inc(2, kind='say "hi"')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{kind="say \\"hi\\""} 3' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_seconds_count 3" in text
+    assert "# TYPE demo_gauge gauge" in text
+    assert "demo_gauge 3" in text
+
+
+def test_stage_timings_are_merged_into_server_timing():
+    timings = start_request()
+    record_stage("convert", 0.010)
+    record_stage("convert", 0.005)
+    record_stage("cache", 0.001)
+
+    header = timings.server_timing()
+
+    assert finish_request() is timings
+    assert header.startswith("convert;dur=15.0, cache;dur=1.0, total;dur=")
+
+
+def test_convert_reports_server_timing_and_metrics():
+    flask_app.testing = True
+    client = flask_app.test_client()
+    before = conversions_total.value(format="html", outcome="success")
+
+    response = client.post(
+        "/convert",
+        data={"file": (io.BytesIO(b"<html><body><p>Metrics run</p></body></html>"), "metrics.html")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert {"upload", "hash", "cache", "serialize", "total"} <= set(stages)
+    assert conversions_total.value(format="html", outcome="success") == before + 1
+
+    metrics = client.get("/metrics")
+    body = metrics.get_data(as_text=True)
+    assert metrics.status_code == 200
+    assert metrics.mimetype == "text/plain"
+    assert 'file2md_request_seconds_count{endpoint="convert",method="POST",status="200"}' in body
+    assert 'file2md_stage_seconds_bucket{stage="convert",le="+Inf"}' in body
+    assert 'file2md_input_bytes_count{format="html"}' in body
+    assert "file2md_cache_hits " in body
+    assert "file2md_jobs_" in body
+
+
+def test_slow_request_profiler_dumps_only_over_threshold(tmp_path):
+    profiler = SlowRequestProfiler(str(tmp_path), threshold_ms=50)
+
+    fast = profiler.stop(profiler.start(), "GET /fast", 0.001)
+    slow = profiler.stop(profiler.start(), "POST /convert", 0.2)
+
+    assert fast is None
+    assert slow is not None and os.path.exists(slow)
+    assert "POST__convert" in os.path.basename(slow)
+    assert os.listdir(tmp_path) == [os.path.basename(slow)]
+
+
+def test_profiler_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.delenv("FILE2MD_PROFILE_DIR", raising=False)
+    assert SlowRequestProfiler.from_env() is None
+
+    monkeypatch.setenv("FILE2MD_PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("FILE2MD_PROFILE_SLOW_MS", "250")
+    profiler = SlowRequestProfiler.from_env()
+    assert profiler.threshold_ms == 250
+    assert os.path.isdir(tmp_path / "profiles")
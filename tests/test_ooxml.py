@@ -0,0 +1,151 @@
+import io
+
+import pytest
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+from app import app as flask_app
+from utils import converter, ooxml
+from utils.ooxml import iter_docx_markdown, iter_pptx_markdown
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), "red").save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def _docx():
+    document = Document()
+    document.add_heading("Overview", level=1)
+    paragraph = document.add_paragraph("Plain then ")
+    paragraph.add_run("bold").bold = True
+    paragraph.add_run(" and ")
+    paragraph.add_run("italic").italic = True
+    paragraph.add_run(", see ")
+    rel_id = paragraph.part.relate_to("https://example.com/", "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
+    link = OxmlElement("w:hyperlink")
+    link.set(qn("r:id"), rel_id)
+    run = OxmlElement("w:r")
+    text = OxmlElement("w:t")
+    text.text = "the site"
+    run.append(text)
+    link.append(run)
+    paragraph._p.append(link)
+    document.add_paragraph("first", style="List Bullet")
+    document.add_paragraph("second", style="List Bullet")
+    document.add_paragraph("step", style="List Number")
+    table = document.add_table(rows=2, cols=2)
+    for row, values in enumerate((("name", "value"), ("a|b", "2"))):
+        for column, value in enumerate(values):
+            table.cell(row, column).text = value
+    document.add_picture(_png())
+    document.add_heading("Details", level=2)
+    document.add_paragraph("Closing line")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _pptx():
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+    slide.shapes.title.text = "Quarterly review"
+    slide.placeholders[1].text = "Revenue up\nCosts down"
+    slide.shapes.add_textbox(Inches(1), Inches(6.5), Inches(2), Inches(0.5)).text = "Footer box"
+    table = slide.shapes.add_table(2, 2, Inches(5), Inches(3), Inches(3), Inches(1)).table
+    for row, values in enumerate((("q", "total"), ("Q1", "10"))):
+        for column, value in enumerate(values):
+            table.cell(row, column).text = value
+    slide.shapes.add_picture(_png(), Inches(0.2), Inches(0.2))
+    slide.notes_slide.notes_text_frame.text = "Mention the hiring plan"
+    presentation.slides.add_slide(presentation.slide_layouts[0]).shapes.title.text = "Thanks"
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_docx_keeps_structure_and_references_media_by_name():
+    markdown = "".join(iter_docx_markdown(_docx()))
+
+    assert markdown == (
+        "# Overview\n\n"
+        "Plain then **bold** and *italic*, see [the site](https://example.com/)\n\n"
+        "* first\n* second\n\n"
+        "1. step\n\n"
+        "| name | value |\n| --- | --- |\n| a\\|b | 2 |\n\n"
+        "![](image1.png)\n\n"
+        "## Details\n\n"
+        "Closing line\n"
+    )
+
+
+def test_docx_media_is_inlined_only_when_asked():
+    markdown = "".join(iter_docx_markdown(_docx(), include_media=True))
+
+    assert "![](data:image/png;base64,iVBORw0KGgo" in markdown
+
+
+def test_long_documents_come_out_in_pieces(monkeypatch):
+    monkeypatch.setattr(ooxml, "CHUNK_CHARS", 64)
+    document = Document()
+    for number in range(200):
+        document.add_paragraph(f"Paragraph {number}")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+
+    chunks = list(iter_docx_markdown(buffer))
+
+    assert len(chunks) > 20
+    assert "".join(chunks) == "\n\n".join(f"Paragraph {number}" for number in range(200)) + "\n"
+
+
+def test_pptx_slides_follow_shape_positions_and_keep_notes():
+    slides = list(iter_pptx_markdown(_pptx()))
+
+    assert slides == [
+        "<!-- Slide number: 1 -->\n"
+        "![image.png](Picture5.jpg)\n"
+        "# Quarterly review\n"
+        "Revenue up\nCosts down\n"
+        "| q | total |\n| --- | --- |\n| Q1 | 10 |\n"
+        "Footer box\n"
+        "### Notes:\nMention the hiring plan\n\n",
+        "<!-- Slide number: 2 -->\n# Thanks\n\n",
+    ]
+
+
+@pytest.mark.parametrize("mode", ["stream", "markitdown"])
+def test_converter_uses_the_configured_ooxml_path(monkeypatch, mode):
+    monkeypatch.setattr(converter, "OOXML_CONVERTER", mode)
+    calls = []
+    real = converter.iter_ooxml_markdown
+    monkeypatch.setattr(converter, "iter_ooxml_markdown", lambda *args: calls.append(args) or real(*args))
+
+    markdown = converter.convert_stream_to_markdown(_pptx(), "deck.pptx")
+
+    assert "Quarterly review" in markdown
+    assert bool(calls) == (mode == "stream")
+
+
+def test_word_documents_stream_over_sse():
+    flask_app.testing = True
+    response = flask_app.test_client().post(
+        "/convert?stream=sse",
+        data={"file": (_docx(), "report.docx")},
+        content_type="multipart/form-data",
+    )
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "event: chunk" in body
+    assert "# Overview" in body
+    assert body.rstrip().splitlines()[0] == "event: chunk"
@@ -0,0 +1,154 @@
+import io
+import threading
+
+import pytest
+
+import app as app_module
+from tests.sample_files import _write_pdf_pages
+from utils.cache import ResultCache
+from utils.converter import convert_stream_to_markdown, convert_to_markdown
+from utils.metrics import pdf_pages_total
+from utils.pdf_pages import PageRangeError, convert_pages, count_pages, extract_pages, parse_page_ranges
+
+
+def _pdf(tmp_path, count, name="pages.pdf"):
+    path = tmp_path / name
+    _write_pdf_pages(path, [f"Page text {number}" for number in range(1, count + 1)])
+    return path
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges("1-3, 7,2", 10) == [0, 1, 2, 6]
+    assert parse_page_ranges("9-", 10) == [8, 9]
+    assert parse_page_ranges("-2", 10) == [0, 1]
+    assert parse_page_ranges("8-20", 10) == [7, 8, 9]
+    for bad in ("0", "5-3", "a-b", "11", ","):
+        with pytest.raises(PageRangeError):
+            parse_page_ranges(bad, 10)
+
+
+def test_library_functions_convert_only_selected_pages(tmp_path):
+    path = _pdf(tmp_path, 5)
+
+    from_path = convert_to_markdown(str(path), pages="2,4")
+    from_stream = convert_stream_to_markdown(io.BytesIO(path.read_bytes()), "pages.pdf", pages="4-")
+
+    assert "<!-- Page number: 2 -->" in from_path
+    assert "Page text 4" in from_path
+    assert "Page text 1" not in from_path and "Page text 3" not in from_path
+    assert from_stream.index("Page text 4") < from_stream.index("Page text 5")
+    with pytest.raises(PageRangeError):
+        convert_stream_to_markdown(io.BytesIO(b"a,b\n"), "table.csv", pages="1")
+
+
+def test_convert_pages_runs_chunks_in_parallel_and_reuses_cached_pages(tmp_path):
+    path = _pdf(tmp_path, 7)
+    with open(path, "rb") as handle:
+        assert count_pages(handle) == 7
+    cache = ResultCache(max_entries=64)
+    calls = []
+    lock = threading.Lock()
+
+    def run(fn, source, chunk):
+        with lock:
+            calls.append(list(chunk))
+        return fn(source, chunk)
+
+    first, cached = convert_pages(str(path), [1, 2, 3], run=run, cache=cache, page_key=str, chunk_pages=2, workers=2)
+    assert cached == 0
+    assert sorted(calls) == [[1, 2], [3]]
+
+    calls.clear()
+    second, cached = convert_pages(str(path), list(range(7)), run=run, cache=cache, page_key=str, chunk_pages=2, workers=2)
+    assert cached == 3
+    assert sorted(calls) == [[0, 4], [5, 6]]
+    assert [second.index(f"Page text {number}") for number in range(1, 8)] == sorted(
+        second.index(f"Page text {number}") for number in range(1, 8)
+    )
+    assert first.startswith("<!-- Page number: 2 -->")
+
+
+def test_pages_missing_despite_the_declared_count_come_back_empty(tmp_path):
+    path = _pdf(tmp_path, 3)
+    # Same length as "/Count 3", so the xref offsets stay valid
+    overstated = path.read_bytes().replace(b"/Count 3", b"/Count 5")
+
+    with io.BytesIO(overstated) as handle:
+        assert count_pages(handle) == 5
+    markdown, _ = convert_pages(overstated, parse_page_ranges("1-", 5))
+
+    assert "Page text 3" in markdown
+    assert markdown.endswith("<!-- Page number: 4 -->\n\n\n<!-- Page number: 5 -->\n\n")
+
+
+def test_extract_pages_reads_bytes_or_paths(tmp_path):
+    path = _pdf(tmp_path, 3)
+
+    assert extract_pages(str(path), [2]) == extract_pages(path.read_bytes(), [2])
+    assert "Page text 3" in extract_pages(str(path), [2])[0]
+
+
+class TestPageEndpoints:
+    def setup_method(self):
+        app_module.app.testing = True
+        self.client = app_module.app.test_client()
+
+    def _post(self, path, **params):
+        with open(path, "rb") as handle:
+            return self.client.post(
+                "/convert",
+                data={"file": (handle, path.name), **params},
+                content_type="multipart/form-data",
+            )
+
+    def test_page_ranges_on_convert_reuse_cached_pages(self, tmp_path):
+        path = _pdf(tmp_path, 6, "ranged.pdf")
+        cached_before = pdf_pages_total.value(source="cache")
+
+        first = self._post(path, pages="2-3")
+        second = self._post(path, pages="1-4")
+
+        assert first.status_code == 200
+        markdown = second.get_json()["markdown"]
+        assert "Page text 1" in markdown and "Page text 4" in markdown
+        assert "Page text 5" not in markdown
+        assert second.headers["X-Cache"] == "MISS"
+        assert pdf_pages_total.value(source="cache") == cached_before + 2
+
+    def test_pages_are_cached_apart_from_results(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(app_module, "result_cache", ResultCache())
+        monkeypatch.setattr(app_module, "page_cache", ResultCache())
+
+        assert self._post(_pdf(tmp_path, 5, "apart.pdf"), pages="1-4").status_code == 200
+        assert app_module.result_cache.stats()["entries"] == 1
+        assert app_module.page_cache.stats()["entries"] == 4
+
+    def test_bad_page_requests_are_client_errors(self, tmp_path):
+        path = _pdf(tmp_path, 2, "short.pdf")
+
+        assert self._post(path, pages="5").status_code == 400
+        csv = self.client.post(
+            "/convert?pages=1",
+            data={"file": (io.BytesIO(b"a,b\n1,2\n"), "table.csv")},
+            content_type="multipart/form-data",
+        )
+        assert csv.status_code == 400
+
+    def test_large_pdfs_are_split_across_worker_processes(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(app_module, "PDF_PARALLEL_MIN_PAGES", 4)
+        monkeypatch.setattr(app_module, "PDF_CHUNK_PAGES", 2)
+        monkeypatch.setattr(app_module, "PDF_PAGE_PROCESSES", 2)
+        monkeypatch.setattr(app_module, "_page_pool", None)
+        path = _pdf(tmp_path, 5, "large.pdf")
+
+        try:
+            response = self._post(path)
+            stats = app_module._page_pool.stats()
+        finally:
+            app_module._page_pool.close()
+
+        markdown = response.get_json()["markdown"]
+        assert [markdown.index(f"Page text {number}") for number in range(1, 6)] == sorted(
+            markdown.index(f"Page text {number}") for number in range(1, 6)
+        )
+        assert stats["completed"] == 3
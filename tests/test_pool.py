@@ -0,0 +1,136 @@
+import io
+import os
+import time
+
+import pytest
+
+import app as app_module
+from utils.pool import ConversionTimeout, ProcessPool
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _pid():
+    return os.getpid()
+
+
+def _fail():
+    raise ValueError("broken document")
+
+
+def _too_deep():
+    from utils.markup import MarkupLimitError
+
+    raise MarkupLimitError("Document is nested too deeply")
+
+
+@pytest.fixture
+def pool():
+    pool = ProcessPool(processes=1, timeout=10, max_tasks_per_child=2, warm=False)
+    yield pool
+    pool.close()
+
+
+def test_process_pool_converts_in_a_worker(pool):
+    output = pool.convert_stream(io.BytesIO(b"<html><body><h1>From a worker</h1></body></html>"), "worker.html")
+
+    assert "From a worker" in output
+    assert pool.stats()["completed"] == 1
+
+
+def test_process_pool_converts_spilled_uploads_by_path(pool, tmp_path):
+    with open(tmp_path / "upload.bin", "w+b") as handle:
+        handle.write(b"<html><body><h1>Spilled upload</h1></body></html>")
+        handle.seek(0)
+
+        output = pool.convert_stream(handle, "spilled.html")
+
+    assert "Spilled upload" in output
+
+
+def test_process_pool_reports_conversion_errors(pool):
+    with pytest.raises(ValueError, match="broken document"):
+        pool.run(_fail)
+
+    assert pool.stats()["failed"] == 1
+    assert pool.run(_sleep, 0) == 0
+
+
+def test_process_pool_keeps_the_worker_exception_type(pool, monkeypatch):
+    from utils.markup import MarkupLimitError
+
+    with pytest.raises(MarkupLimitError):
+        pool.run(_too_deep)
+
+    # Spawned workers read their limits from the environment
+    monkeypatch.setenv("FILE2MD_MARKUP_STREAM_MIN_BYTES", "1")
+    monkeypatch.setenv("FILE2MD_MARKUP_MAX_DEPTH", "5")
+    deep_pool = ProcessPool(processes=1, timeout=10, warm=False)
+    monkeypatch.setattr(app_module, "process_pool", deep_pool)
+    app_module.app.testing = True
+    try:
+        response = app_module.app.test_client().post(
+            "/convert",
+            data={"file": (io.BytesIO(b"[" * 20 + b"]" * 20), "deep.json")},
+            content_type="multipart/form-data",
+        )
+    finally:
+        deep_pool.close()
+
+    assert response.status_code == 422
+
+
+def test_process_pool_kills_and_replaces_stuck_workers(pool):
+    pool.timeout = 0.5
+
+    with pytest.raises(ConversionTimeout):
+        pool.run(_sleep, 30)
+
+    pool.timeout = 10
+    assert pool.run(_sleep, 0) == 0
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["started"] == 2
+
+
+def test_process_pool_recycles_workers_after_max_tasks(pool):
+    pids = [pool.run(_pid) for _ in range(4)]
+
+    assert pids[0] == pids[1]
+    assert pids[2] == pids[3]
+    assert pids[0] != pids[2]
+    assert pool.stats()["recycled"] == 2
+
+
+def test_convert_endpoint_returns_504_on_timeout(monkeypatch):
+    class StuckPool:
+        def convert_stream(self, stream, filename, image_mode=None):
+            raise ConversionTimeout("Conversion timed out after 1 seconds")
+
+    monkeypatch.setattr(app_module, "process_pool", StuckPool())
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+
+    response = client.post(
+        "/convert",
+        data={"file": (io.BytesIO(b"<html><body>Never finishes</body></html>"), "stuck.html")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 504
+
+
+def test_process_pool_start_prespawns_workers():
+    pool = ProcessPool(processes=2, timeout=10, warm=False)
+    try:
+        pool.start()
+        stats = pool.stats()
+        assert stats["started"] == 2
+        assert stats["idle"] == 2
+        pool.run(_pid)
+        assert pool.stats()["started"] == 2
+    finally:
+        pool.close()
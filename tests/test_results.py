@@ -0,0 +1,105 @@
+import io
+import os
+import time
+
+import pytest
+
+import app as app_module
+from utils.results import ResultNotFound, ResultStore, ResultStoreError
+
+REPORT = (
+    "Preamble\n\n"
+    "# Overview\n\nFirst paragraph.\n\n"
+    "## Details\n\n```\n# not a heading\n\nstill code\n```\n\n"
+    "<!-- Page number: 2 -->\nSecond page é\n\n"
+    "# Appendix\nLast words\n"
+)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path), min_bytes=0)
+    monkeypatch.setattr(app_module, "result_store", store)
+    return store
+
+
+def test_index_covers_headings_and_pages_but_not_code(store):
+    result = store.get(store.save(REPORT))
+
+    sections = [(section["kind"], section["level"], section["title"]) for section in result.toc()["sections"]]
+    assert sections == [("heading", 1, "Overview"), ("heading", 2, "Details"), ("page", 0, "Page 2"), ("heading", 1, "Appendix")]
+    assert result.section(0) == REPORT[REPORT.index("# Overview"):REPORT.index("<!--")]
+    assert result.section(1).endswith("still code\n```\n\n")
+    assert result.section(2) == "<!-- Page number: 2 -->\nSecond page é\n\n# Appendix\nLast words\n"
+    with pytest.raises(ResultNotFound):
+        result.section(4)
+
+
+def test_chunks_tile_the_document_within_their_size_with_stable_ids(store):
+    markdown = "# Title\n\n" + "".join(f"Paragraph {number} " * 8 + "\n\n" for number in range(40)) + "é" * 600 + "\n"
+    result = store.get(store.save(markdown))
+
+    chunks = result.chunks(256, include_text=True)
+
+    assert "".join(chunk["markdown"] for chunk in chunks) == markdown
+    assert all(chunk["bytes"] <= 256 for chunk in chunks)
+    assert [chunk["id"] for chunk in result.chunks(256)] == [chunk["id"] for chunk in chunks]
+    assert len({chunk["id"] for chunk in chunks}) == len(chunks)
+    assert chunks[0]["section"] == 0
+    with pytest.raises(ResultStoreError):
+        result.chunks(10)
+
+
+def test_results_are_content_addressed_and_expire(tmp_path):
+    store = ResultStore(str(tmp_path), ttl=60, min_bytes=0)
+    result_id = store.save(REPORT)
+
+    assert store.save(REPORT) == result_id
+    assert len([name for name in os.listdir(tmp_path) if not name.startswith(".")]) == 1
+    stale = time.time() - 120
+    os.utime(os.path.join(tmp_path, result_id, "index.json"), (stale, stale))
+    with pytest.raises(ResultNotFound):
+        store.get(result_id)
+    with pytest.raises(ResultNotFound):
+        store.get("../" + result_id[3:])
+
+
+def test_small_results_are_not_stored_and_abandoned_writes_are_swept(tmp_path):
+    store = ResultStore(str(tmp_path), min_bytes=1024)
+    abandoned = tmp_path / ".tmp-crashed"
+    abandoned.mkdir()
+    (abandoned / "result.md").write_text("partial", encoding="utf-8")
+    stale = time.time() - 7200
+    os.utime(abandoned, (stale, stale))
+    (tmp_path / ".tmp-writing").mkdir()
+
+    assert store.save(REPORT) is None
+    assert store.save(REPORT * 20) is not None
+    assert sorted(os.listdir(tmp_path)) == [".tmp-writing", store.save(REPORT * 20)]
+
+
+def test_converted_results_are_served_by_section_range_and_chunk(store):
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+    page = b"<h1>Guide</h1><p>Intro text.</p><h2>Install</h2><p>Run the installer.</p><h2>Use</h2><p>Open it.</p>"
+
+    converted = client.post(
+        "/convert",
+        data={"file": (io.BytesIO(page), "guide.html")},
+        content_type="multipart/form-data",
+    )
+    result_id = converted.get_json()["result_id"]
+    markdown = converted.get_json()["markdown"]
+    toc = client.get(f"/results/{result_id}/toc").get_json()
+    install = [section for section in toc["sections"] if section["title"] == "Install"][0]
+    section = client.get(install["url"])
+    span = client.get(f"/results/{result_id}", headers={"Range": f"bytes={install['start']}-{install['end'] - 1}"})
+    chunks = client.get(f"/results/{result_id}/chunks?max_bytes=256&text=1").get_json()["chunks"]
+
+    assert converted.headers["X-Result-ID"] == result_id
+    assert section.get_data(as_text=True).startswith("## Install")
+    assert span.status_code == 206
+    assert span.get_data(as_text=True) == section.get_data(as_text=True)
+    assert "".join(chunk["markdown"] for chunk in chunks) == markdown
+    assert client.get(f"/results/{result_id}/chunks?max_bytes=big").status_code == 400
+    assert client.get(f"/results/{'0' * 64}/toc").status_code == 404
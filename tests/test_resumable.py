@@ -0,0 +1,117 @@
+import hashlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as app_module
+from utils.resumable import MIN_CHUNK_SIZE, UploadIncomplete, UploadNotFound, UploadSessionError, UploadSessions
+
+CHUNK = MIN_CHUNK_SIZE
+DOCUMENT = b"<html><body>" + b"".join(b"<p>Paragraph %d of a long report.</p>" % n for n in range(24000)) + b"</body></html>"
+
+
+def _chunks(data, size=CHUNK):
+    return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    sessions = UploadSessions(str(tmp_path), chunk_size=CHUNK)
+    monkeypatch.setattr(app_module, "upload_sessions", sessions)
+    return sessions
+
+
+def test_chunks_land_at_their_offsets_in_any_order(sessions):
+    session = sessions.create("report.html", len(DOCUMENT))
+    parts = _chunks(DOCUMENT)
+
+    for index in reversed(range(len(parts))):
+        sessions.write_chunk(session, index, io.BytesIO(parts[index]), len(parts[index]))
+
+    with sessions.open_data(session) as handle:
+        assert handle.read() == DOCUMENT
+    assert sessions.get(session.id).to_dict()["complete"] is True
+
+
+def test_short_bad_and_missing_chunks_are_not_acknowledged(sessions):
+    session = sessions.create("report.html", len(DOCUMENT))
+    first = _chunks(DOCUMENT)[0]
+
+    with pytest.raises(UploadSessionError):
+        sessions.write_chunk(session, 0, io.BytesIO(first[:100]), len(first))
+    with pytest.raises(UploadSessionError):
+        sessions.write_chunk(session, 0, io.BytesIO(first), len(first), checksum="00" * 32)
+    with pytest.raises(UploadSessionError):
+        sessions.write_chunk(session, 99, io.BytesIO(first), len(first))
+    with pytest.raises(UploadIncomplete) as missing:
+        sessions.open_data(session)
+
+    assert missing.value.missing == list(range(session.chunk_count))
+    assert session.to_dict()["next_chunk"] == 0
+
+
+def test_expired_and_unknown_sessions_are_not_found(tmp_path):
+    sessions = UploadSessions(str(tmp_path), chunk_size=CHUNK, ttl=60)
+    session = sessions.create("report.html", 10)
+    session.created_at -= 120
+    sessions._write_meta(session)
+
+    with pytest.raises(UploadNotFound):
+        sessions.get(session.id)
+    with pytest.raises(UploadNotFound):
+        sessions.get("../../etc")
+    assert not (tmp_path / session.id).exists()
+
+
+class TestUploadEndpoints:
+    def setup_method(self):
+        app_module.app.testing = True
+        self.client = app_module.app.test_client()
+
+    def _put(self, upload_id, index, data):
+        return self.client.put(
+            f"/uploads/{upload_id}/chunks/{index}",
+            data=data,
+            headers={"X-Chunk-SHA256": hashlib.sha256(data).hexdigest()},
+        )
+
+    def test_parallel_upload_resumes_and_converts(self, sessions):
+        created = self.client.post("/uploads", json={"filename": "report.html", "size": len(DOCUMENT)})
+        upload = created.get_json()
+        parts = _chunks(DOCUMENT, upload["chunk_size"])
+        assert created.status_code == 201
+        assert upload["chunks"] == len(parts)
+
+        # The first half arrives, then the client drops and asks where to resume
+        half = len(parts) // 2
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            statuses = list(executor.map(lambda index: self._put(upload["upload_id"], index, parts[index]).status_code, range(half)))
+        assert statuses == [200] * half
+        status = self.client.get(upload["status_url"]).get_json()
+        assert status["next_chunk"] == half
+        assert self.client.post(upload["complete_url"]).status_code == 409
+
+        for index in range(status["next_chunk"], len(parts)):
+            assert self._put(upload["upload_id"], index, parts[index]).status_code == 200
+        job = self.client.post(upload["complete_url"]).get_json()
+
+        deadline = time.time() + 10
+        while self.client.get(job["status_url"]).get_json()["status"] != "done" and time.time() < deadline:
+            time.sleep(0.02)
+        result = self.client.get(job["result_url"] + "?format=markdown").get_data(as_text=True)
+        assert result.startswith("Paragraph 0 of a long report.")
+        assert "Paragraph 23999" in result
+        assert self.client.get(upload["status_url"]).status_code == 404
+
+    def test_sessions_are_validated_up_front(self, sessions, monkeypatch):
+        monkeypatch.setattr(app_module, "chunked_upload_limits", app_module.UploadLimits(1024 * 1024, {}))
+
+        assert self.client.post("/uploads", json={"filename": "notes.exe", "size": 10}).status_code == 400
+        assert self.client.post("/uploads", json={"filename": "notes.html"}).status_code == 400
+        assert self.client.post("/uploads", json={"filename": "big.pdf", "size": 2 * 1024 * 1024}).status_code == 413
+        upload = self.client.post("/uploads", json={"filename": "notes.html", "size": 10}).get_json()
+        assert self._put(upload["upload_id"], 0, b"too short").status_code == 400
+        assert self.client.delete(upload["status_url"]).status_code == 204
+        assert self.client.get(upload["status_url"]).status_code == 404
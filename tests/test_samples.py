@@ -1,18 +1,22 @@
 import os
-import markitdown.converters._audio_converter as audio_converter
 import pytest
 
 from tests.remote_samples import download_remote_samples
 from tests.sample_files import create_sample_files
+from utils import converter
+from utils.audio import TranscriptionBackend
 from utils.converter import convert_to_markdown
 
 
+class FakeBackend(TranscriptionBackend):
+    name = "fake"
+
+    def transcribe(self, wav_bytes):
+        return "Test transcript"
+
+
 def test_convert_all_sample_files(tmp_path, monkeypatch):
-    monkeypatch.setattr(
-        audio_converter,
-        "transcribe_audio",
-        lambda *args, **kwargs: "Test transcript",
-    )
+    monkeypatch.setattr(converter.transcriber, "backend", FakeBackend())
 
     sample_files = create_sample_files(tmp_path)
 
@@ -43,11 +47,7 @@ def test_convert_remote_samples(tmp_path, monkeypatch):
     if os.getenv("FILE2MD_REMOTE_SAMPLES") != "1":
         pytest.skip("Remote samples not enabled")
 
-    monkeypatch.setattr(
-        audio_converter,
-        "transcribe_audio",
-        lambda *args, **kwargs: "Test transcript",
-    )
+    monkeypatch.setattr(converter.transcriber, "backend", FakeBackend())
 
     remote_dir = tmp_path / "remote"
     remote_samples = download_remote_samples(remote_dir)
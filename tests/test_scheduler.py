@@ -0,0 +1,166 @@
+import io
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from utils.scheduler import FAST, STANDARD, Scheduler, SchedulerFull, estimate_cost
+
+MB = 1024 * 1024
+
+
+def _waiting(scheduler, count):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        stats = scheduler.stats()
+        if stats["waiting_fast"] + stats["waiting_standard"] >= count:
+            return
+        time.sleep(0.005)
+    raise AssertionError("tickets never queued")
+
+
+def _run_in_order(scheduler, requests):
+    """
+    Queue ``(client, extension, size, priority)`` requests one after another
+    while the only slot is busy, then free it and return the admission order.
+    """
+    order = []
+    threads = []
+    with scheduler.slot("blocker", ".pdf", 10 * MB):
+        for number, (client, extension, size, priority) in enumerate(requests):
+            def run(number=number, client=client, extension=extension, size=size, priority=priority):
+                with scheduler.slot(client, extension, size, priority):
+                    order.append(number)
+
+            thread = threading.Thread(target=run)
+            thread.start()
+            threads.append(thread)
+            _waiting(scheduler, number + 1)
+    for thread in threads:
+        thread.join(5)
+    return order
+
+
+def test_cost_follows_format_and_size():
+    assert estimate_cost(".html", 50 * 1024) < 1 < estimate_cost(".pdf", 5 * MB)
+    assert estimate_cost(".mp3", MB) > estimate_cost(".json", 10 * MB)
+
+
+def test_small_files_use_the_fast_lane_while_large_ones_fill_the_rest():
+    scheduler = Scheduler(workers=1, fast_workers=1)
+
+    with scheduler.slot("a", ".pdf", 20 * MB) as large:
+        with scheduler.slot("b", ".html", 10 * 1024) as small:
+            assert (large.slot, small.slot) == (STANDARD, FAST)
+    with scheduler.slot("b", ".html", 10 * 1024) as borrowed:
+        with scheduler.slot("b", ".csv", 1024) as second:
+            assert {borrowed.slot, second.slot} == {FAST, STANDARD}
+
+
+def test_a_client_sending_large_files_cannot_starve_another():
+    scheduler = Scheduler(workers=1, fast_workers=0, client_concurrency=0)
+
+    order = _run_in_order(scheduler, [("a", ".pdf", 10 * MB, 0)] * 3 + [("b", ".pdf", 10 * MB, 0)])
+
+    assert order == [0, 3, 1, 2]
+
+
+def test_priority_reorders_only_the_clients_own_conversions():
+    def scheduler():
+        return Scheduler(workers=1, fast_workers=0, client_concurrency=0)
+
+    own = _run_in_order(scheduler(), [("a", ".csv", 1024, 0), ("a", ".csv", 1024, -1), ("a", ".csv", 1024, 1)])
+    others = _run_in_order(scheduler(), [("a", ".csv", 1024, 0), ("a", ".csv", 1024, 0), ("b", ".csv", 1024, 1)])
+
+    assert own == [2, 0, 1]
+    assert others == [0, 2, 1]
+
+
+def test_client_quotas_limit_running_and_queued_conversions():
+    scheduler = Scheduler(workers=4, fast_workers=0, client_concurrency=1, client_queue=1)
+    admitted = threading.Event()
+
+    def second():
+        with scheduler.slot("a", ".csv", 1024):
+            admitted.set()
+
+    with scheduler.slot("a", ".csv", 1024):
+        thread = threading.Thread(target=second)
+        thread.start()
+        _waiting(scheduler, 1)
+        with scheduler.slot("b", ".csv", 1024):
+            assert not admitted.is_set()
+        with pytest.raises(SchedulerFull):
+            with scheduler.slot("a", ".csv", 1024):
+                pass
+    thread.join(5)
+    assert admitted.is_set()
+
+
+def test_convert_reports_queue_time_and_refuses_after_the_wait_limit(monkeypatch):
+    scheduler = Scheduler(workers=1, fast_workers=0, max_wait=0.05)
+    monkeypatch.setattr(app_module, "scheduler", scheduler)
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+
+    def post(body):
+        return client.post(
+            "/convert",
+            data={"file": (io.BytesIO(body), "page.html")},
+            content_type="multipart/form-data",
+            headers={"X-Priority": "high"},
+        )
+
+    converted = post(b"<h1>Queued</h1>")
+    with scheduler.slot("ip:elsewhere", ".pdf", 10 * MB):
+        refused = post(b"<h1>Refused</h1>")
+
+    assert converted.status_code == 200
+    assert "queue;dur=" in converted.headers["Server-Timing"]
+    assert refused.status_code == 429
+    assert refused.headers["Retry-After"] == "5"
+    assert client.post("/convert?priority=urgent", data={"file": (io.BytesIO(b"x"), "a.html")}).status_code == 400
+
+
+def test_clients_behind_a_trusted_proxy_are_told_apart(monkeypatch):
+    scheduler = Scheduler(workers=2, fast_workers=0, client_concurrency=1, max_wait=0.05)
+    monkeypatch.setattr(app_module, "scheduler", scheduler)
+    monkeypatch.setattr(app_module.app, "wsgi_app", app_module._behind_proxies(app_module.app.wsgi_app, 1))
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+
+    def post(address):
+        return client.post(
+            "/convert",
+            data={"file": (io.BytesIO(f"<p>{address}</p>".encode()), "address.html")},
+            content_type="multipart/form-data",
+            headers={"X-Forwarded-For": address},
+        )
+
+    with scheduler.slot("ip:10.0.0.1", ".pdf", 10 * MB):
+        assert post("10.0.0.1").status_code == 429
+        assert post("10.0.0.2").status_code == 200
+
+
+def test_streams_are_held_to_the_client_quota_and_free_their_slot(monkeypatch):
+    scheduler = Scheduler(workers=1, fast_workers=0, max_wait=0.05)
+    monkeypatch.setattr(app_module, "scheduler", scheduler)
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+
+    def stream(body):
+        return client.post(
+            "/convert?stream=1",
+            data={"file": (io.BytesIO(body), "page.html")},
+            content_type="multipart/form-data",
+        )
+
+    with scheduler.slot("ip:elsewhere", ".pdf", 10 * MB):
+        refused = stream(b"<h1>Refused</h1>")
+    streamed = stream(b"<h1>Streamed</h1>")
+
+    assert refused.status_code == 429
+    assert "Streamed" in streamed.get_data(as_text=True)
+    streamed.close()
+    assert scheduler.stats()["running_standard"] == 0
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from app import app as flask_app
+from tests.sample_files import create_sample_files
+from utils.metrics import content_sniffs_total
+from utils.sniffing import ContentMismatch, check_upload, sniff
+
+
+def test_every_sample_matches_its_extension(tmp_path):
+    for extension, path in create_sample_files(tmp_path).items():
+        stream = io.BytesIO(path.read_bytes())
+
+        check_upload(stream, path.name)
+
+        assert stream.tell() == 0, extension
+
+
+@pytest.mark.parametrize(
+    "head, kind",
+    [
+        (b"ID3\x04\x00" + b"\x00" * 20, "mp3"),
+        (b"\xff\xfb\x90\x64" + b"\x00" * 20, "mp3"),
+        (b"RIFF\x24\x00\x00\x00WAVEfmt ", "wav"),
+        (b"\xef\xbb\xbf{\"caf\xc3\xa9\": 1}", "text"),
+        (b"\xef\xbb\xbf\n%PDF-1.7\n", "pdf"),
+        (b"name,note\nfoo,see %PDF-1.4 header spec\n", "text"),
+        (bytes(range(256)), None),
+    ],
+)
+def test_sniff_recognises_headers(head, kind):
+    assert sniff(io.BytesIO(head)) == kind
+
+
+def test_text_mentioning_a_pdf_header_is_not_a_pdf():
+    note = b"name,note\nfoo,see %PDF-1.4 header spec\n"
+
+    assert check_upload(io.BytesIO(note), "x.csv") == "text"
+    assert check_upload(io.BytesIO(b"junk before header\n%PDF-1.7\n"), "scan.pdf") == "pdf"
+
+
+def test_zip_that_is_not_office_is_not_a_docx():
+    import zipfile
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("readme.txt", "hello")
+    buffer.seek(0)
+
+    assert sniff(buffer) == "zip"
+    with pytest.raises(ContentMismatch):
+        check_upload(buffer, "letter.docx")
+
+
+def test_log_mode_counts_mismatches_without_refusing():
+    before = content_sniffs_total.value(declared="png", detected="pdf", outcome="mismatch")
+
+    assert check_upload(io.BytesIO(b"%PDF-1.4\n"), "photo.png", mode="log") == "pdf"
+    assert check_upload(io.BytesIO(b"%PDF-1.4\n"), "photo.png", mode="off") is None
+
+    assert content_sniffs_total.value(declared="png", detected="pdf", outcome="mismatch") == before + 1
+
+
+def test_mislabeled_upload_is_refused_before_conversion(monkeypatch):
+    import app as app_module
+
+    def fail(*args, **kwargs):
+        raise AssertionError("conversion should not run")
+
+    monkeypatch.setattr(app_module, "convert_stream_to_markdown", fail)
+    flask_app.testing = True
+    client = flask_app.test_client()
+
+    response = client.post(
+        "/convert",
+        data={"file": (io.BytesIO(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64), "report.pdf")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 415
+    assert response.get_json()["error"] == "report.pdf has a .pdf extension but contains png content"
@@ -0,0 +1,101 @@
+import io
+import json
+
+from app import app as flask_app
+from tests.sample_files import _write_pdf_pages, create_sample_files
+from utils.ooxml import markdown_table
+from utils.streaming import iter_markdown
+
+
+def _sse_events(body):
+    events = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_iter_markdown_yields_one_chunk_per_pdf_page(tmp_path):
+    pdf_path = tmp_path / "pages.pdf"
+    _write_pdf_pages(pdf_path, ["Page one", "Page two", "Page three"])
+
+    with pdf_path.open("rb") as handle:
+        chunks = list(iter_markdown(handle, "pages.pdf"))
+
+    assert len(chunks) == 3
+    assert "Page one" in chunks[0]
+    assert "Page three" in chunks[2]
+
+
+def test_iter_markdown_streams_slides_and_sheets(tmp_path):
+    sample_files = create_sample_files(tmp_path)
+
+    with sample_files[".pptx"].open("rb") as handle:
+        slides = list(iter_markdown(handle, "deck.pptx"))
+    with sample_files[".xlsx"].open("rb") as handle:
+        sheets = list(iter_markdown(handle, "book.xlsx"))
+
+    assert len(slides) == 1
+    assert "# Hello PPTX" in slides[0]
+    assert len(sheets) == 1
+    assert sheets[0].startswith("## Sheet")
+    assert "Hello XLSX" in sheets[0]
+
+
+def test_iter_markdown_falls_back_to_single_chunk():
+    chunks = list(iter_markdown(io.BytesIO(b"<html><body><h1>Whole</h1></body></html>"), "page.html"))
+
+    assert len(chunks) == 1
+    assert "Whole" in chunks[0]
+
+
+def test_markdown_table_escapes_cells():
+    table = markdown_table([["name", "value"], ["a|b", None]])
+
+    assert table.splitlines() == ["| name | value |", "| --- | --- |", "| a\\|b |  |"]
+
+
+class TestStreamingEndpoint:
+    def setup_method(self):
+        flask_app.testing = True
+        self.client = flask_app.test_client()
+
+    def _pdf_upload(self, tmp_path, texts):
+        pdf_path = tmp_path / "stream.pdf"
+        _write_pdf_pages(pdf_path, texts)
+        return {"file": (io.BytesIO(pdf_path.read_bytes()), "stream.pdf")}
+
+    def test_convert_streams_server_sent_events(self, tmp_path):
+        data = self._pdf_upload(tmp_path, ["Streamed one", "Streamed two"])
+
+        response = self.client.post("/convert?stream=sse", data=data, content_type="multipart/form-data")
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        events = _sse_events(response.data)
+        assert [name for name, _ in events] == ["chunk", "chunk", "done"]
+        assert "Streamed one" in events[0][1]["markdown"]
+        assert events[-1][1]["chunks"] == 2
+
+    def test_convert_streams_chunked_markdown(self, tmp_path):
+        data = self._pdf_upload(tmp_path, ["Chunked one", "Chunked two"])
+
+        response = self.client.post("/convert?stream=1", data=data, content_type="multipart/form-data")
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/markdown"
+        body = response.data.decode("utf-8")
+        assert body.index("Chunked one") < body.index("Chunked two")
+
+    def test_convert_reports_streaming_errors_as_events(self):
+        data = {"file": (io.BytesIO(b"%PDF-1.4\nnot a real document"), "broken.pdf")}
+
+        response = self.client.post(
+            "/convert",
+            data=data,
+            content_type="multipart/form-data",
+            headers={"Accept": "text/event-stream"},
+        )
+
+        events = _sse_events(response.data)
+        assert events[-1][0] == "error"
@@ -0,0 +1,134 @@
+import io
+
+import openpyxl
+import pytest
+
+from app import app as flask_app
+from utils.tables import (
+    TableOptionError,
+    TableOptions,
+    iter_csv_markdown,
+    iter_table_rows,
+    iter_xlsx_markdown,
+    write_table_markdown,
+)
+
+
+def _workbook(**sheets):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_iter_table_rows_caps_rows_and_pads_short_ones():
+    text = "".join(iter_table_rows([["a", "b"], ["1"], [], ["2", "x|y"], ["3", "z"]], max_rows=2))
+
+    assert text.splitlines() == [
+        "| a | b |",
+        "| --- | --- |",
+        "| 1 |  |",
+        "| 2 | x\\|y |",
+        "",
+        "*Only the first 2 rows are shown.*",
+    ]
+
+
+def test_iter_table_rows_selects_columns_by_name_or_number():
+    rows = [["id", "name", "city"], [1, "Ada", "London"]]
+
+    by_name = "".join(iter_table_rows(rows, columns=["city", "id"]))
+    by_number = "".join(iter_table_rows(rows, columns=["2"]))
+
+    assert by_name.splitlines()[2] == "| London | 1 |"
+    assert by_number.splitlines()[2] == "| Ada |"
+    with pytest.raises(TableOptionError):
+        list(iter_table_rows(rows, columns=["missing"]))
+
+
+def test_table_options_parse_rejects_bad_row_counts():
+    options = TableOptions.parse("10", "Data, 2", "")
+
+    assert options.max_rows == 10
+    assert options.sheets == ["Data", "2"]
+    assert options.columns is None
+    assert options.selective
+    assert not TableOptions.parse().selective
+    with pytest.raises(TableOptionError):
+        TableOptions.parse("-1")
+
+
+def test_csv_rows_come_in_batches_and_detect_encoding():
+    data = "name,city\n" + "".join(f"Zoë {n},Köln\n" for n in range(1200))
+
+    chunks = list(iter_csv_markdown(io.BytesIO(data.encode("latin-1"))))
+
+    assert len(chunks) == 3
+    assert "| Zoë 0 | Köln |" in chunks[0]
+
+
+def test_xlsx_selects_sheets_and_keeps_one_section_each():
+    stream = _workbook(First=[["a"], [1]], Second=[["b"], [2]])
+
+    chunks = list(iter_xlsx_markdown(stream, TableOptions(sheets=["2"])))
+
+    assert chunks == ["## Second\n| b |\n| --- |\n| 2 |\n\n"]
+    with pytest.raises(TableOptionError):
+        list(iter_xlsx_markdown(_workbook(First=[["a"]]), TableOptions(sheets=["Missing"])))
+
+
+def test_write_table_markdown_writes_to_disk(tmp_path):
+    source = tmp_path / "data.csv"
+    source.write_text("a,b\n1,2\n", encoding="utf-8")
+
+    written = write_table_markdown(str(source), str(tmp_path / "data.md"))
+
+    assert (tmp_path / "data.md").read_text(encoding="utf-8") == "| a | b |\n| --- | --- |\n| 1 | 2 |\n"
+    assert written == len("| a | b |\n| --- | --- |\n| 1 | 2 |\n")
+
+
+class TestTableOptionsEndpoint:
+    def setup_method(self):
+        flask_app.testing = True
+        self.client = flask_app.test_client()
+
+    def _post(self, filename, data, **values):
+        values["file"] = (io.BytesIO(data), filename)
+        return self.client.post("/convert", data=values, content_type="multipart/form-data")
+
+    def test_max_rows_and_columns_shape_the_result(self):
+        data = b"id,name\n" + b"".join(b"%d,Name %d\n" % (n, n) for n in range(20))
+
+        response = self._post("people.csv", data, max_rows="3", columns="name")
+
+        markdown = response.get_json()["markdown"]
+        assert response.status_code == 200
+        assert "| Name 2 |" in markdown
+        assert "Name 3" not in markdown
+        assert "*Only the first 3 rows are shown.*" in markdown
+
+    def test_options_are_part_of_the_cache_key(self):
+        data = b"id\n" + b"".join(b"%d\n" % n for n in range(10))
+
+        first = self._post("cache-key.csv", data, max_rows="1").get_json()["markdown"]
+        second = self._post("cache-key.csv", data, max_rows="2").get_json()["markdown"]
+
+        assert first != second
+
+    def test_table_options_rejected_for_other_formats(self):
+        response = self._post("page.html", b"<html><body>Hi</body></html>", max_rows="1")
+
+        assert response.status_code == 400
+        assert "CSV and XLSX" in response.get_json()["error"]
+
+    def test_unknown_sheet_is_a_bad_request(self):
+        response = self._post("book.xlsx", _workbook(Data=[["a"], [1]]).getvalue(), sheets="Other")
+
+        assert response.status_code == 400
+        assert "Unknown sheet" in response.get_json()["error"]
@@ -0,0 +1,126 @@
+import io
+import json
+
+import pytest
+
+import app as app_module
+from utils.uploads import ByteBudget, UploadLimits, UploadTooLarge, parse_size
+
+
+def test_parse_size_accepts_units():
+    assert parse_size("1024") == 1024
+    assert parse_size("512KB") == 512 * 1024
+    assert parse_size("20mb") == 20 * 1024 * 1024
+    with pytest.raises(ValueError):
+        parse_size("ten megabytes")
+
+
+def test_upload_limits_apply_format_caps_under_the_request_cap(monkeypatch):
+    monkeypatch.setenv("FILE2MD_MAX_UPLOAD_BYTES", "50MB")
+    monkeypatch.setenv("FILE2MD_FORMAT_LIMITS", "pdf=80MB, .csv=1MB")
+    limits = UploadLimits.from_env()
+
+    assert limits.limit_for("report.PDF") == 50 * 1024 * 1024
+    assert limits.limit_for("table.csv") == 1024 * 1024
+    assert limits.limit_for("page.html") == 25 * 1024 * 1024
+    assert limits.limit_for("slides.pptx") == 50 * 1024 * 1024
+    limits.check("table.csv", 1024)
+    with pytest.raises(UploadTooLarge):
+        limits.check("table.csv", 2 * 1024 * 1024)
+
+
+def test_byte_budget_admits_until_full_but_never_starves_a_lone_request():
+    budget = ByteBudget(max_bytes=100)
+
+    lone = budget.try_reserve(500)
+    assert lone is not None
+    assert budget.try_reserve(1) is None
+    lone.release()
+    lone.release()
+
+    first = budget.try_reserve(60)
+    second = budget.try_reserve(40)
+    assert second is not None
+    assert budget.try_reserve(1) is None
+    first.release()
+    second.release()
+    assert budget.stats() == {"in_flight_bytes": 0, "in_flight_requests": 0, "max_bytes": 100, "rejected": 2}
+
+
+class TestUploadEndpoints:
+    def setup_method(self):
+        app_module.app.testing = True
+        self.client = app_module.app.test_client()
+
+    def test_oversized_format_is_rejected_before_it_is_buffered(self, monkeypatch):
+        monkeypatch.setitem(app_module.upload_limits.format_limits, "html", 1024)
+        spooled = []
+        original = app_module.UploadRequest._get_file_stream
+
+        def tracking(self, *args, **kwargs):
+            stream = original(self, *args, **kwargs)
+            spooled.append(stream)
+            return stream
+
+        monkeypatch.setattr(app_module.UploadRequest, "_get_file_stream", tracking)
+        response = self.client.post(
+            "/convert",
+            data={"file": (io.BytesIO(b"<p>too big</p>" * 200), "large.html")},
+            content_type="multipart/form-data",
+        )
+
+        assert response.status_code == 413
+        assert "limit for this file type" in response.get_json()["error"]
+        assert spooled == []
+
+    def test_request_over_the_global_cap_gets_json_413(self, monkeypatch):
+        monkeypatch.setitem(app_module.app.config, "MAX_CONTENT_LENGTH", 512)
+        response = self.client.post(
+            "/convert",
+            data={"file": (io.BytesIO(b"%PDF-1.4" * 200), "large.pdf")},
+            content_type="multipart/form-data",
+        )
+
+        assert response.status_code == 413
+        assert "limit" in response.get_json()["error"]
+
+    def test_uploads_are_refused_while_the_budget_is_full(self, monkeypatch):
+        budget = ByteBudget(max_bytes=1024)
+        monkeypatch.setattr(app_module, "upload_budget", budget)
+        held = budget.try_reserve(1000)
+
+        busy = self.client.post(
+            "/convert",
+            data={"file": (io.BytesIO(b"<p>hello</p>"), "busy.html")},
+            content_type="multipart/form-data",
+        )
+        assert busy.status_code == 503
+        assert busy.headers["Retry-After"] == "1"
+
+        held.release()
+        ok = self.client.post(
+            "/convert",
+            data={"file": (io.BytesIO(b"<p>hello</p>"), "ok.html")},
+            content_type="multipart/form-data",
+        )
+        assert ok.status_code == 200
+        ok.close()
+        assert budget.stats()["in_flight_bytes"] == 0
+
+    def test_batch_reports_oversized_files_per_item(self, monkeypatch):
+        monkeypatch.setitem(app_module.upload_limits.format_limits, "csv", 16)
+        response = self.client.post(
+            "/batch",
+            data={
+                "files": [
+                    (io.BytesIO(b"a,b\n" * 100), "big.csv"),
+                    (io.BytesIO(b"<p>fine</p>"), "fine.html"),
+                ]
+            },
+            content_type="multipart/form-data",
+        )
+
+        records = {record["filename"]: record for record in map(json.loads, response.get_data(as_text=True).splitlines())}
+        assert records["fine.html"]["success"] is True
+        assert records["big.csv"]["success"] is False
+        assert "limit" in records["big.csv"]["error"]
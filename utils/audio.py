@@ -0,0 +1,250 @@
+import importlib
+import io
+import math
+import logging
+import os
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import ResultCache, make_key
+from utils.jobs import report_progress
+from utils.metrics import record_audio_chunks
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3"}
+
+DEFAULT_BACKEND = "google"
+DEFAULT_CHUNK_SECONDS = 30
+DEFAULT_WORKERS = 4
+DEFAULT_CACHE_ENTRIES = 1024
+DEFAULT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+TRANSCRIPT_HEADING = "### Audio Transcript:\n"
+NO_SPEECH = "[No speech detected]"
+
+
+class TranscriptionUnavailable(Exception):
+    """
+    Raised by a backend whose optional dependencies are not installed.
+    """
+
+
+class TranscriptionBackend:
+    """
+    Turns one chunk of audio into text.
+
+    ``transcribe`` receives a complete WAV file as bytes and returns the
+    transcript, or ``""`` when the chunk holds no speech. ``name`` is part of
+    the cache key, so two backends never share transcripts.
+    """
+
+    name = "base"
+
+    def transcribe(self, wav_bytes):
+        raise NotImplementedError
+
+
+class SpeechRecognitionBackend(TranscriptionBackend):
+    """
+    A ``speech_recognition`` recogniser, e.g. ``google`` (remote, the
+    MarkItDown default) or ``sphinx``/``vosk``/``whisper`` (local).
+    """
+
+    def __init__(self, method=DEFAULT_BACKEND, **options):
+        self.name = method
+        self.method = method
+        self.options = options
+
+    def transcribe(self, wav_bytes):
+        try:
+            import speech_recognition as sr
+        except ImportError as e:
+            raise TranscriptionUnavailable(f"speech_recognition is not installed: {e}")
+
+        recognizer = sr.Recognizer()
+        with sr.AudioFile(io.BytesIO(wav_bytes)) as source:
+            audio = recognizer.record(source)
+        try:
+            result = getattr(recognizer, "recognize_" + self.method)(audio, **self.options)
+        except sr.UnknownValueError:
+            return ""
+        except (ImportError, sr.SetupError) as e:
+            raise TranscriptionUnavailable(f"The {self.method} recogniser is not available: {e}")
+        return (result if isinstance(result, str) else str(result)).strip()
+
+
+def load_backend(name):
+    """
+    Return the backend called ``name``: a ``speech_recognition`` method, ``none``
+    to skip transcription, or ``package.module:attribute`` for a backend class
+    or factory defined elsewhere.
+    """
+    if not name or name == "none":
+        return None
+    if ":" in name:
+        module_name, _, attribute = name.partition(":")
+        return getattr(importlib.import_module(module_name), attribute)()
+    return SpeechRecognitionBackend(name)
+
+
+def _timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def _wav_bytes(frames, channels, sample_width, frame_rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(sample_width)
+        writer.setframerate(frame_rate)
+        writer.writeframes(frames)
+    return buffer.getvalue()
+
+
+def _wav_chunks(stream, chunk_seconds):
+    """
+    Return the audio's format details and a generator of WAV chunks, reading
+    one chunk of frames at a time.
+    """
+    reader = wave.open(stream, "rb")
+    channels, sample_width, frame_rate, frame_count = (
+        reader.getnchannels(), reader.getsampwidth(), reader.getframerate(), reader.getnframes()
+    )
+    details = {"channels": channels, "sample_rate": frame_rate, "seconds": frame_count / frame_rate}
+
+    def chunks():
+        try:
+            while True:
+                frames = reader.readframes(int(frame_rate * chunk_seconds))
+                if not frames:
+                    return
+                yield _wav_bytes(frames, channels, sample_width, frame_rate)
+        finally:
+            reader.close()
+
+    return details, chunks()
+
+
+def _mp3_chunks(stream, chunk_seconds):
+    # MP3 frames have to be decoded by ffmpeg; pydub holds the decoded audio
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(stream, format="mp3")
+    details = {"channels": segment.channels, "sample_rate": segment.frame_rate, "seconds": segment.duration_seconds}
+    step = int(chunk_seconds * 1000)
+
+    def chunks():
+        for start in range(0, len(segment), step):
+            buffer = io.BytesIO()
+            segment[start:start + step].export(buffer, format="wav")
+            yield buffer.getvalue()
+
+    return details, chunks()
+
+
+class Transcriber:
+    """
+    Chunked, parallel audio transcription with a pluggable backend.
+
+    Audio is cut into ``chunk_seconds`` pieces that are transcribed by up to
+    ``workers`` threads at once. Only a window of chunks twice that size is
+    decoded ahead, so long recordings are not held in memory as WAV. Results
+    come back in order as soon as each chunk and every chunk before it is
+    done. Chunk transcripts are cached by the hash of the chunk's audio and
+    the backend name.
+    """
+
+    def __init__(self, backend=None, chunk_seconds=DEFAULT_CHUNK_SECONDS, workers=DEFAULT_WORKERS, cache=None):
+        self.backend = backend
+        self.chunk_seconds = chunk_seconds
+        self.workers = max(1, workers)
+        self.cache = cache if cache is not None else ResultCache(max_entries=0)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Read FILE2MD_TRANSCRIBER, FILE2MD_AUDIO_CHUNK_SECONDS, FILE2MD_AUDIO_WORKERS
+        and FILE2MD_TRANSCRIPT_CACHE_ENTRIES / FILE2MD_TRANSCRIPT_CACHE_MAX_BYTES.
+        """
+        return cls(
+            backend=load_backend(os.getenv("FILE2MD_TRANSCRIBER", DEFAULT_BACKEND)),
+            chunk_seconds=float(os.getenv("FILE2MD_AUDIO_CHUNK_SECONDS", DEFAULT_CHUNK_SECONDS)),
+            workers=int(os.getenv("FILE2MD_AUDIO_WORKERS", DEFAULT_WORKERS)),
+            cache=ResultCache(
+                max_entries=int(os.getenv("FILE2MD_TRANSCRIPT_CACHE_ENTRIES", DEFAULT_CACHE_ENTRIES)),
+                max_bytes=int(os.getenv("FILE2MD_TRANSCRIPT_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)),
+            ),
+        )
+
+    def iter_markdown(self, stream, extension):
+        """
+        Yield markdown for an audio stream: a metadata block, then one
+        ``[mm:ss] text`` line per chunk that holds speech.
+        """
+        if extension == ".mp3":
+            details, chunks = _mp3_chunks(stream, self.chunk_seconds)
+        else:
+            details, chunks = _wav_chunks(stream, self.chunk_seconds)
+        yield (
+            f"Duration: {_timestamp(details['seconds'])}\n"
+            f"NumChannels: {details['channels']}\n"
+            f"SampleRate: {details['sample_rate']}\n"
+        )
+        if self.backend is None:
+            chunks.close()
+            return
+
+        spoken = False
+        total = math.ceil(details["seconds"] / self.chunk_seconds)
+        try:
+            for index, text in self._transcribe_chunks(chunks):
+                report_progress(index + 1, total)
+                if not text:
+                    continue
+                prefix = "" if spoken else "\n" + TRANSCRIPT_HEADING
+                spoken = True
+                yield f"{prefix}[{_timestamp(index * self.chunk_seconds)}] {text}\n"
+        except TranscriptionUnavailable as e:
+            logger.warning("Skipping audio transcription: %s", e)
+            return
+        if not spoken:
+            yield "\n" + TRANSCRIPT_HEADING + NO_SPEECH + "\n"
+
+    def to_markdown(self, stream, extension):
+        return "".join(self.iter_markdown(stream, extension))
+
+    def _transcribe_chunks(self, chunks):
+        counts = {True: 0, False: 0}
+
+        def transcribe(wav_bytes):
+            key = make_key(wav_bytes, ".wav", backend=self.backend.name)
+            text = self.cache.get(key)
+            if text is not None:
+                return text, True
+            text = self.backend.transcribe(wav_bytes)
+            self.cache.set(key, text)
+            return text, False
+
+        def drain(keep):
+            while len(window) > keep:
+                index, future = window.popleft()
+                text, cached = future.result()
+                counts[cached] += 1
+                yield index, text
+
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                for index, wav_bytes in enumerate(chunks):
+                    window.append((index, executor.submit(transcribe, wav_bytes)))
+                    yield from drain(self.workers * 2 - 1)
+                yield from drain(0)
+            finally:
+                for _, future in window:
+                    future.cancel()
+                chunks.close()
+                record_audio_chunks(counts[True], counts[False])
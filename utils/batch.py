@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_FILES = 500
+DEFAULT_MAX_UNCOMPRESSED = 1024 * 1024 * 1024
+
+
+class BatchError(Exception):
+    """
+    Raised when a batch as a whole is rejected (for example a ZIP bomb).
+    """
+
+
+class BatchItem:
+    """
+    One document in a batch: its name and a callable returning a binary stream.
+
+    ``error`` is set for entries rejected before conversion, which are
+    reported in the results without being converted.
+    """
+
+    def __init__(self, name, open_stream=None, error=None):
+        self.name = name
+        self.open_stream = open_stream
+        self.error = error
+
+
+def safe_entry_name(name):
+    """
+    Normalise an archive member name so it cannot escape the output root.
+    """
+    parts = [
+        part
+        for part in posixpath.normpath(name.replace("\\", "/")).split("/")
+        if part not in ("", ".", "..")
+    ]
+    return "/".join(parts)
+
+
+def zip_items(
+    archive,
+    allowed,
+    max_files=DEFAULT_MAX_FILES,
+    max_uncompressed=DEFAULT_MAX_UNCOMPRESSED,
+    member_limit=None,
+):
+    """
+    Build batch items for every file in an open ``zipfile.ZipFile``.
+
+    Members whose names fail ``allowed``, or that expand past
+    ``member_limit(name)`` bytes, are reported as errors. The archive is
+    rejected up front when it holds too many files or would expand past
+    ``max_uncompressed`` bytes.
+    """
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) > max_files:
+        raise BatchError(f"Archive contains more than {max_files} files")
+    if sum(info.file_size for info in members) > max_uncompressed:
+        raise BatchError("Archive expands beyond the allowed size")
+
+    items = []
+    for info in members:
+        name = safe_entry_name(info.filename)
+        if not name or not allowed(name):
+            items.append(BatchItem(name or info.filename, error="File type not supported"))
+            continue
+        limit = member_limit(name) if member_limit else None
+        if limit and info.file_size > limit:
+            items.append(BatchItem(name, error="File is larger than the size limit for this file type"))
+            continue
+        # Members are decompressed into memory because ZipExtFile seeks by re-inflating
+        items.append(BatchItem(name, lambda info=info: io.BytesIO(archive.read(info))))
+    return items
+
+
+def iter_results(items, convert, workers=DEFAULT_WORKERS):
+    """
+    Convert ``items`` concurrently, yielding ``(name, markdown, error)`` as
+    each one finishes. A failing item never stops the rest of the batch.
+    """
+    for item in items:
+        if item.error:
+            yield item.name, None, item.error
+
+    pending = [item for item in items if not item.error]
+    if not pending:
+        return
+
+    def run(item):
+        with item.open_stream() as stream:
+            return convert(stream, item.name)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+        futures = {executor.submit(run, item): item for item in pending}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item.name, future.result(), None
+            except Exception as e:
+                yield item.name, None, str(e)
+
+
+def ndjson_lines(results):
+    """
+    Render batch results as newline-delimited JSON, one object per file.
+    """
+    for name, markdown, error in results:
+        if error is None:
+            record = {"filename": name, "success": True, "markdown": markdown}
+        else:
+            record = {"filename": name, "success": False, "error": error}
+        yield json.dumps(record) + "\n"
+
+
+class _ChunkWriter:
+    """
+    Write-only, non-seekable file object that hands written bytes back out.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def zip_chunks(results):
+    """
+    Stream batch results as a ZIP archive of ``.md`` files.
+
+    Each entry is emitted as soon as it is converted. Failures are collected
+    into an ``errors.json`` member written at the end.
+    """
+    writer = _ChunkWriter()
+    errors = []
+    used = set()
+    with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, markdown, error in results:
+            if error is not None:
+                errors.append({"filename": name, "error": error})
+                continue
+            archive.writestr(_output_name(name, used), markdown)
+            yield writer.drain()
+        if errors:
+            archive.writestr("errors.json", json.dumps(errors, indent=2))
+    yield writer.drain()
+
+
+def _output_name(name, used):
+    base = os.path.splitext(safe_entry_name(name))[0] or "converted"
+    candidate = base + ".md"
+    counter = 2
+    while candidate in used:
+        candidate = f"{base}-{counter}.md"
+        counter += 1
+    used.add(candidate)
+    return candidate
@@ -0,0 +1,269 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 3600
+DEFAULT_DISK_MAX_BYTES = 1024 * 1024 * 1024
+
+_TEXT_SUFFIX = ".md"
+_BINARY_SUFFIX = ".bin"
+
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def make_key(source, extension, **options):
+    """
+    Build a content-addressed cache key from the uploaded content, the file
+    extension and any converter options that influence the output.
+
+    ``source`` may be bytes or a seekable binary stream; streams are hashed
+    in chunks and rewound to where they started.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        position = source.tell()
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        source.seek(position)
+    digest.update(b"\0")
+    digest.update(extension.lower().encode("utf-8"))
+    for name in sorted(options):
+        digest.update(b"\0")
+        digest.update(f"{name}={options[name]!r}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _size_of(value):
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(value)
+
+
+class ResultCache:
+    """
+    Two-tier cache for conversion results.
+
+    The memory tier is a per-process LRU bounded by entry count and total
+    size. The optional disk tier lives in a directory shared by every worker,
+    is bounded by total size and uses file modification times for both TTL
+    expiry and least-recently-used eviction.
+    """
+
+    def __init__(
+        self,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_bytes=DEFAULT_MAX_BYTES,
+        ttl=DEFAULT_TTL,
+        disk_dir=None,
+        disk_max_bytes=DEFAULT_DISK_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "expirations": 0,
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a cache configured from FILE2MD_CACHE_* environment variables.
+        """
+        return cls(
+            max_entries=int(os.getenv("FILE2MD_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            max_bytes=int(os.getenv("FILE2MD_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            ttl=float(os.getenv("FILE2MD_CACHE_TTL", DEFAULT_TTL)),
+            disk_dir=os.getenv("FILE2MD_CACHE_DIR") or None,
+            disk_max_bytes=int(
+                os.getenv("FILE2MD_CACHE_DISK_MAX_BYTES", DEFAULT_DISK_MAX_BYTES)
+            ),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or bool(self.disk_dir)
+
+    def get(self, key):
+        """
+        Return the cached value for ``key`` or ``None`` on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl and now - stored_at > self.ttl:
+                    self._drop(key)
+                    self._stats["expirations"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return value
+
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+            self._memory_set(key, value, now)
+        return value
+
+    def set(self, key, value):
+        """
+        Store ``value`` (str or bytes) under ``key`` in every enabled tier.
+        """
+        now = time.time()
+        with self._lock:
+            self._memory_set(key, value, now)
+        self._disk_set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            for path, _, _ in self._disk_files():
+                _remove_quietly(path)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        if self.disk_dir:
+            files = self._disk_files()
+            stats["disk_entries"] = len(files)
+            stats["disk_bytes"] = sum(size for _, size, _ in files)
+        return stats
+
+    def _memory_set(self, key, value, now):
+        if self.max_entries <= 0:
+            return
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, now)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def _drop(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= _size_of(value)
+
+    def _disk_path(self, key, value):
+        suffix = _TEXT_SUFFIX if isinstance(value, str) else _BINARY_SUFFIX
+        return os.path.join(self.disk_dir, key + suffix)
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        for suffix in (_TEXT_SUFFIX, _BINARY_SUFFIX):
+            path = os.path.join(self.disk_dir, key + suffix)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if self.ttl and now - mtime > self.ttl:
+                _remove_quietly(path)
+                with self._lock:
+                    self._stats["expirations"] += 1
+                continue
+            try:
+                with open(path, "rb") as handle:
+                    data = handle.read()
+            except OSError:
+                continue
+            # Touch the file so eviction treats it as recently used
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            return data.decode("utf-8") if suffix == _TEXT_SUFFIX else data
+        return None
+
+    def _disk_set(self, key, value):
+        if not self.disk_dir:
+            return
+        size = _size_of(value)
+        if size > self.disk_max_bytes:
+            return
+        data = value.encode("utf-8") if isinstance(value, str) else value
+        try:
+            # Write to a temp file first so other workers never read a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(temp_path, self._disk_path(key, value))
+        except OSError as e:
+            logger.warning("Could not write cache entry %s: %s", key, e)
+            return
+        self._disk_evict()
+
+    def _disk_files(self):
+        files = []
+        try:
+            names = os.listdir(self.disk_dir)
+        except OSError:
+            return files
+        for name in names:
+            if not name.endswith((_TEXT_SUFFIX, _BINARY_SUFFIX)):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _disk_evict(self):
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        if total <= self.disk_max_bytes:
+            return
+        for path, size, _ in sorted(files, key=lambda item: item[2]):
+            if total <= self.disk_max_bytes:
+                break
+            _remove_quietly(path)
+            total -= size
+            with self._lock:
+                self._stats["disk_evictions"] += 1
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,67 @@
+import gzip
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_BYTES = 1024
+
+# Preferred first when a client accepts several encodings equally
+PREFERENCE = ("zstd", "br", "gzip")
+
+# Levels that trade a little ratio for speed, since bodies are compressed once and cached
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+_available = None
+
+
+def available_encodings():
+    """
+    Return the content codings this process can produce, in preference order.
+
+    gzip is always available. br and zstd are used when the optional
+    ``brotli`` and ``zstandard`` packages are installed.
+    """
+    global _available
+    if _available is None:
+        encodings = []
+        for encoding, module in (("zstd", "zstandard"), ("br", "brotli")):
+            try:
+                __import__(module)
+            except ImportError:
+                logger.debug("%s responses disabled: %s is not installed", encoding, module)
+                continue
+            encodings.append(encoding)
+        encodings.append("gzip")
+        _available = tuple(encodings)
+    return _available
+
+
+def compress(data, encoding):
+    """
+    Compress ``data`` (bytes) with a content coding from ``available_encodings``.
+    """
+    if encoding == "gzip":
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unsupported content coding: {encoding!r}")
+
+
+def negotiate_encoding(accept_encodings, size, min_bytes=DEFAULT_MIN_BYTES):
+    """
+    Pick the content coding for a body of ``size`` bytes from a parsed
+    ``Accept-Encoding`` header (Werkzeug's ``request.accept_encodings``), or
+    ``None`` to send it uncompressed. Small bodies are never compressed.
+    """
+    if size < min_bytes:
+        return None
+    return accept_encodings.best_match(available_encodings())
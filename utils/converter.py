@@ -1,35 +1,311 @@
+import importlib
+import io
 import os
 import logging
-import tempfile
-from markitdown import MarkItDown
+import mimetypes
+import threading
+import time
+from utils.audio import AUDIO_EXTENSIONS, Transcriber
+from utils.images import IMAGE_EXTENSIONS, ImageOptionError, ImagePipeline
+from utils.markup import MARKUP_EXTENSIONS, MarkupLimitError, MarkupLimits, iter_markup_markdown
+from utils.metrics import record_stage
+from utils.ooxml import OOXML_EXTENSIONS, iter_docx_markdown, iter_pptx_markdown
+from utils.pdf_pages import PageRangeError, convert_pages, count_pages, parse_page_ranges
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def convert_to_markdown(file_path):
+# File extensions accepted for conversion
+ALLOWED_EXTENSIONS = {
+    "pdf", "docx", "pptx", "xlsx",
+    "png", "jpg", "jpeg", "gif",
+    "mp3", "wav", "html", "csv",
+    "json", "xml",
+}
+
+# Libraries imported on first use of their format; warm_up() loads them ahead of time
+WARM_MODULES = (
+    "PIL.Image",
+    "pdfminer.pdfpage",
+    "pdfminer.converter",
+    "pdfminer.pdfinterp",
+    "pptx",
+    "openpyxl",
+)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+image_pipeline = ImagePipeline.from_env()
+# Image descriptions need an OpenAI-compatible client, built by a ``module:factory`` callable
+LLM_CLIENT = os.getenv("FILE2MD_LLM_CLIENT")
+LLM_MODEL = os.getenv("FILE2MD_LLM_MODEL")
+transcriber = Transcriber.from_env()
+
+# "stream" converts DOCX and PPTX straight from their XML parts; "markitdown" builds the full object model
+OOXML_CONVERTER = os.getenv("FILE2MD_OOXML_CONVERTER", "stream")
+# Embedded images in DOCX and PPTX are referenced by name, or base64-inlined with "inline"
+OOXML_MEDIA = os.getenv("FILE2MD_OOXML_MEDIA", "skip")
+
+# JSON, XML and HTML uploads from this size are parsed incrementally instead of read whole by MarkItDown
+MARKUP_STREAM_MIN_BYTES = int(os.getenv("FILE2MD_MARKUP_STREAM_MIN_BYTES", 8 * 1024 * 1024))
+markup_limits = MarkupLimits.from_env()
+
+
+def allowed_file(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def get_engine():
+    """
+    Return the process-wide MarkItDown engine, creating it on first use.
+
+    Building a MarkItDown instance loads the magika model and registers every
+    converter, so it is done once per process. Conversions do not mutate the
+    engine, which makes it safe to share between request threads.
+
+    markitdown itself is imported here rather than at module level: importing
+    it pulls in every converter's dependencies (pandas, pptx, pdfminer, azure
+    clients) and accounts for most of the process start-up time.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                started = time.perf_counter()
+                from markitdown import MarkItDown
+
+                imported = time.perf_counter()
+                _engine = MarkItDown(**_llm_options())
+                logger.debug(
+                    "MarkItDown imported in %.1f ms, initialized in %.1f ms",
+                    (imported - started) * 1000,
+                    (time.perf_counter() - imported) * 1000,
+                )
+    return _engine
+
+
+def engine_loaded():
+    return _engine is not None
+
+
+def _llm_options():
+    if not LLM_CLIENT:
+        return {}
+    module_name, _, attribute = LLM_CLIENT.partition(":")
+    return {"llm_client": getattr(importlib.import_module(module_name), attribute)(), "llm_model": LLM_MODEL}
+
+
+def describes_images():
+    """
+    Whether full-mode image conversion adds anything to the header metadata.
+
+    MarkItDown only describes an image through an LLM client; without one
+    its exiftool fields add little beyond the header metadata.
+    """
+    return bool(LLM_CLIENT)
+
+
+def warm_up():
+    """
+    Load everything a conversion needs ahead of the first request.
+
+    Builds the shared engine, imports the format libraries used outside
+    MarkItDown and runs one tiny conversion so lazily initialised state (the
+    magika model session, charset detection) is ready too. Run in a master
+    process before forking, the loaded pages are shared copy-on-write.
+    """
+    started = time.perf_counter()
+    engine = get_engine()
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.debug("Skipping warm-up import of %s: %s", name, e)
+    engine.convert_stream(
+        io.BytesIO(b"<html><body><p>warm up</p></body></html>"), stream_info=_stream_info_for(".html")
+    )
+    logger.info("Converter warm-up finished in %.1f ms", (time.perf_counter() - started) * 1000)
+    return engine
+
+
+def reset_engine():
+    """
+    Drop the shared engine so the next conversion builds a fresh one.
+    """
+    global _engine
+    with _engine_lock:
+        _engine = None
+
+
+def _stream_info_for(extension, filename=None):
+    from markitdown import StreamInfo
+
+    mimetype, _ = mimetypes.guess_type("file" + extension)
+    return StreamInfo(extension=extension, filename=filename, mimetype=mimetype)
+
+
+def _check_pages(extension, pages):
+    if pages and extension != ".pdf":
+        raise PageRangeError("Page ranges are only supported for PDF files")
+
+
+def _convert_pdf_pages(fp, pages, source=None):
+    started = time.perf_counter()
+    indexes = parse_page_ranges(pages, count_pages(fp))
+    markdown, _ = convert_pages(source if source is not None else fp.read(), indexes)
+    record_stage("convert", time.perf_counter() - started)
+    return markdown
+
+
+def _convert_image(stream, extension, image_mode):
+    started = time.perf_counter()
+    # Header-only metadata needs no engine, so it stays fast on a cold worker
+    describe = (image_mode or image_pipeline.mode) != "metadata" and describes_images()
+    markitdown = get_engine() if describe else None
+    engine_ready = time.perf_counter()
+    markdown = image_pipeline.to_markdown(stream, extension, markitdown, image_mode)
+    record_stage("engine", engine_ready - started)
+    record_stage("convert", time.perf_counter() - engine_ready)
+    return markdown
+
+
+def iter_ooxml_markdown(stream, extension):
+    """
+    Yield markdown for a DOCX or PPTX stream from the incremental OOXML reader.
+    """
+    if extension == ".docx":
+        return iter_docx_markdown(stream, include_media=OOXML_MEDIA == "inline")
+    return iter_pptx_markdown(stream, include_media=OOXML_MEDIA == "inline")
+
+
+def _convert_ooxml(stream, extension):
+    started = time.perf_counter()
+    markdown = "".join(iter_ooxml_markdown(stream, extension))
+    record_stage("convert", time.perf_counter() - started)
+    return markdown
+
+
+def _large_markup(extension, size):
+    return extension in MARKUP_EXTENSIONS and MARKUP_STREAM_MIN_BYTES and size >= MARKUP_STREAM_MIN_BYTES
+
+
+def _convert_markup(stream, extension):
+    started = time.perf_counter()
+    markdown = "".join(iter_markup_markdown(stream, extension, markup_limits))
+    record_stage("convert", time.perf_counter() - started)
+    return markdown
+
+
+def _convert_audio(stream, extension):
+    started = time.perf_counter()
+    markdown = transcriber.to_markdown(stream, extension)
+    record_stage("convert", time.perf_counter() - started)
+    return markdown
+
+
+def convert_to_markdown(file_path, pages=None, image_mode=None):
     """
     Convert various file formats to markdown using markitdown library
+
+    ``pages`` selects PDF pages by 1-based range (``"1-3,7,10-"``); the
+    selected pages are extracted one by one and marked with page comments.
+    ``image_mode`` overrides ``FILE2MD_IMAGE_MODE`` for images: ``"metadata"``
+    reads only the image header.
     """
     try:
-        logger.debug(f"Converting file: {file_path}")
-        markitdown = MarkItDown()  # Initialize for each conversion
-        logger.debug("MarkItDown initialized successfully")
+        logger.debug("Converting file: %s", file_path)
         _, extension = os.path.splitext(file_path)
         extension = extension.lower()
+        _check_pages(extension, pages)
+        if pages:
+            with open(file_path, "rb") as handle:
+                return _convert_pdf_pages(handle, pages, file_path)
+        if extension in IMAGE_EXTENSIONS:
+            with open(file_path, "rb") as handle:
+                return _convert_image(handle, extension, image_mode)
+        if extension in AUDIO_EXTENSIONS:
+            with open(file_path, "rb") as handle:
+                return _convert_audio(handle, extension)
+        if extension in OOXML_EXTENSIONS and OOXML_CONVERTER == "stream":
+            with open(file_path, "rb") as handle:
+                return _convert_ooxml(handle, extension)
+        if _large_markup(extension, os.path.getsize(file_path)):
+            with open(file_path, "rb") as handle:
+                return _convert_markup(handle, extension)
+
+        started = time.perf_counter()
+        markitdown = get_engine()
+        engine_ready = time.perf_counter()
+
+        result = markitdown.convert(file_path)
+        finished = time.perf_counter()
+        record_stage("engine", engine_ready - started)
+        record_stage("convert", finished - engine_ready)
+        logger.debug(
+            "Conversion successful, content length: %d (engine %.1f ms, convert %.1f ms)",
+            len(result.text_content),
+            (engine_ready - started) * 1000,
+            (finished - engine_ready) * 1000,
+        )
+        return result.text_content
+    except (PageRangeError, ImageOptionError, MarkupLimitError):
+        raise
+    except Exception as e:
+        logger.error("Error converting file: %s", e)
+        raise Exception(f"Failed to convert file: {str(e)}")
+
+
+def convert_stream_to_markdown(stream, filename, pages=None, image_mode=None):
+    """
+    Convert an open binary stream to markdown without writing it to disk.
+
+    The extension of ``filename`` is passed to MarkItDown as a hint so the
+    matching converter is tried first. Streams that are not buffered binary
+    files (for example ``SpooledTemporaryFile``) are copied into memory first
+    because MarkItDown's format detection rejects them. ``pages`` and
+    ``image_mode`` work as in ``convert_to_markdown``.
+    """
+    try:
+        logger.debug("Converting stream: %s", filename)
+        _, extension = os.path.splitext(filename)
+        extension = extension.lower()
+        _check_pages(extension, pages)
+        if not isinstance(stream, io.BufferedIOBase):
+            stream = io.BytesIO(stream.read())
+        if pages:
+            return _convert_pdf_pages(stream, pages)
+        if extension in IMAGE_EXTENSIONS:
+            return _convert_image(stream, extension, image_mode)
+        if extension in AUDIO_EXTENSIONS:
+            return _convert_audio(stream, extension)
+        if extension in OOXML_EXTENSIONS and OOXML_CONVERTER == "stream":
+            return _convert_ooxml(stream, extension)
+        if extension in MARKUP_EXTENSIONS:
+            position = stream.tell()
+            size = stream.seek(0, io.SEEK_END) - position
+            stream.seek(position)
+            if _large_markup(extension, size):
+                return _convert_markup(stream, extension)
+
+        started = time.perf_counter()
+        markitdown = get_engine()
+        engine_ready = time.perf_counter()
 
-        if extension == ".gif":
-            from PIL import Image
-
-            with tempfile.TemporaryDirectory() as temp_dir:
-                png_path = os.path.join(temp_dir, "converted.png")
-                with Image.open(file_path) as image:
-                    image.save(png_path, format="PNG")
-                result = markitdown.convert(png_path)
-        else:
-            result = markitdown.convert(file_path)
-        logger.debug(f"Conversion successful, content length: {len(result.text_content)}")
+        result = markitdown.convert_stream(
+            stream, stream_info=_stream_info_for(extension, filename)
+        )
+        finished = time.perf_counter()
+        record_stage("engine", engine_ready - started)
+        record_stage("convert", finished - engine_ready)
+        logger.debug(
+            "Conversion successful, content length: %d (engine %.1f ms, convert %.1f ms)",
+            len(result.text_content),
+            (engine_ready - started) * 1000,
+            (finished - engine_ready) * 1000,
+        )
         return result.text_content
+    except (PageRangeError, ImageOptionError, MarkupLimitError):
+        raise
     except Exception as e:
-        logger.error(f"Error converting file: {str(e)}")
+        logger.error("Error converting file: %s", e)
         raise Exception(f"Failed to convert file: {str(e)}")
@@ -0,0 +1,227 @@
+import io
+import logging
+import mimetypes
+import os
+
+from utils.cache import ResultCache, make_key
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif"}
+
+# "metadata" reads only the image header; "full" also decodes a normalised frame for MarkItDown
+IMAGE_MODES = ("full", "metadata")
+
+DEFAULT_MAX_SIDE = 2048
+DEFAULT_CACHE_ENTRIES = 32
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Base IFD tags, reported under the field names MarkItDown uses for exiftool output
+_EXIF_FIELDS = (
+    (0x9C9B, "Title"),
+    (0x010E, "Description"),
+    (0x9C9E, "Keywords"),
+    (0x013B, "Artist"),
+    (0x9C9D, "Author"),
+    (0x8298, "Copyright"),
+    (0x010F, "Make"),
+    (0x0110, "Model"),
+)
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_DATE_TIME_ORIGINAL = 0x9003
+_CREATE_DATE = 0x9004
+
+# Text chunks (PNG tEXt/iTXt, GIF comments) mapped onto the same field names
+_INFO_FIELDS = (("Title", "Title"), ("Description", "Description"), ("Author", "Author"), ("comment", "Caption"))
+
+
+class ImageOptionError(ValueError):
+    """
+    Raised for an unknown image mode or one requested for a non-image file.
+    """
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        # Windows XP* tags are UTF-16LE, comments are usually ASCII or UTF-8
+        encoding = "utf-16-le" if len(value) % 2 == 0 and b"\x00" in value else "utf-8"
+        value = value.decode(encoding, errors="replace")
+    return str(value).strip().strip("\x00").strip()
+
+
+def _gps_position(gps):
+    def degrees(values, reference):
+        degrees, minutes, seconds = (float(value) for value in values)
+        signed = degrees + minutes / 60 + seconds / 3600
+        return -signed if reference in ("S", "W") else signed
+
+    try:
+        latitude = degrees(gps[2], gps.get(1))
+        longitude = degrees(gps[4], gps.get(3))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    return f"{latitude:.6f}, {longitude:.6f}"
+
+
+def image_metadata(stream):
+    """
+    Return an ordered dict of metadata fields read from an image's header.
+
+    No pixel data is decoded: size, EXIF tags and text chunks all come from
+    the header. Animated images are flagged without counting their frames,
+    which for a GIF would mean walking every frame block. The stream
+    position is restored.
+    """
+    from PIL import Image
+
+    position = stream.tell()
+    try:
+        with Image.open(stream) as image:
+            fields = {"ImageSize": f"{image.width}x{image.height}"}
+            if getattr(image, "is_animated", False):
+                fields["Animated"] = "yes"
+            exif = image.getexif()
+            for tag, name in _EXIF_FIELDS:
+                if tag in exif and _text(exif[tag]):
+                    fields.setdefault(name, _text(exif[tag]))
+            details = exif.get_ifd(_EXIF_IFD)
+            for tag, name in ((_DATE_TIME_ORIGINAL, "DateTimeOriginal"), (_CREATE_DATE, "CreateDate")):
+                if tag in details:
+                    fields[name] = _text(details[tag])
+            position_text = _gps_position(exif.get_ifd(_GPS_IFD))
+            if position_text:
+                fields["GPSPosition"] = position_text
+            for key, name in _INFO_FIELDS:
+                if key in image.info and _text(image.info[key]):
+                    fields.setdefault(name, _text(image.info[key]))
+    finally:
+        stream.seek(position)
+    return fields
+
+
+def metadata_markdown(fields):
+    return "".join(f"{name}: {value}\n" for name, value in fields.items())
+
+
+class ImagePipeline:
+    """
+    In-memory image normalisation ahead of MarkItDown's image converter.
+
+    Only the frame that is needed is decoded (``frame``, the first by
+    default, so an animated GIF is not decoded in full). Images larger than
+    ``max_side`` pixels on either side are downscaled while decoding; JPEGs
+    are decoded at a reduced scale directly. Re-encoded PNGs are cached by
+    content hash, so repeated uploads skip decoding altogether.
+    """
+
+    def __init__(self, max_side=DEFAULT_MAX_SIDE, frame=0, mode="full", cache=None):
+        if mode not in IMAGE_MODES:
+            raise ImageOptionError(f"Invalid image mode: {mode!r}")
+        self.max_side = max_side
+        self.frame = frame
+        self.mode = mode
+        self.cache = cache if cache is not None else ResultCache(max_entries=0)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Read FILE2MD_IMAGE_MAX_SIDE, FILE2MD_IMAGE_FRAME, FILE2MD_IMAGE_MODE and
+        FILE2MD_IMAGE_CACHE_ENTRIES / FILE2MD_IMAGE_CACHE_MAX_BYTES.
+        """
+        return cls(
+            max_side=int(os.getenv("FILE2MD_IMAGE_MAX_SIDE", DEFAULT_MAX_SIDE)),
+            frame=int(os.getenv("FILE2MD_IMAGE_FRAME", 0)),
+            mode=os.getenv("FILE2MD_IMAGE_MODE", "full"),
+            cache=ResultCache(
+                max_entries=int(os.getenv("FILE2MD_IMAGE_CACHE_ENTRIES", DEFAULT_CACHE_ENTRIES)),
+                max_bytes=int(os.getenv("FILE2MD_IMAGE_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)),
+                ttl=0,
+            ),
+        )
+
+    def normalize(self, stream, extension):
+        """
+        Return a stream MarkItDown can read for the selected frame, downscaled
+        to ``max_side``.
+
+        PNGs and JPEGs that are already small enough are returned as they
+        are; everything else is decoded once and re-encoded as PNG.
+        """
+        if not self._needs_encoding(stream, extension):
+            return stream
+        key = make_key(stream, extension, max_side=self.max_side, frame=self.frame)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._encode(stream)
+            self.cache.set(key, data)
+        return io.BytesIO(data)
+
+    def _needs_encoding(self, stream, extension):
+        from PIL import Image
+
+        if extension == ".gif" or self.frame:
+            return True
+        position = stream.tell()
+        try:
+            with Image.open(stream) as image:
+                return bool(self.max_side) and max(image.size) > self.max_side
+        finally:
+            stream.seek(position)
+
+    def _encode(self, stream):
+        from PIL import Image
+
+        position = stream.tell()
+        try:
+            with Image.open(stream) as image:
+                # Carried over so exiftool still finds the original tags in the re-encoded frame
+                exif = image.getexif()
+                if self.frame:
+                    image.seek(min(self.frame, getattr(image, "n_frames", 1) - 1))
+                if self.max_side and max(image.size) > self.max_side:
+                    if image.mode == "P":
+                        # Palette images resize with nearest-neighbour only
+                        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+                    # thumbnail() lets JPEG decode straight at a reduced scale
+                    image.thumbnail((self.max_side, self.max_side))
+                if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+                    image = image.convert("RGB")
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG", compress_level=1, exif=exif)
+        finally:
+            stream.seek(position)
+        return buffer.getvalue()
+
+    def to_markdown(self, stream, extension, engine=None, mode=None):
+        """
+        Convert an image stream to markdown.
+
+        Metadata comes from the original image header. In ``full`` mode the
+        normalised frame is also passed to ``engine``, which runs exiftool when
+        it finds one and adds a description when an LLM client is configured.
+        Fields the header already gave are not repeated.
+        """
+        mode = mode or self.mode
+        if mode not in IMAGE_MODES:
+            raise ImageOptionError(f"Invalid image mode: {mode!r}")
+        fields = image_metadata(stream)
+        markdown = metadata_markdown(fields)
+        if mode == "metadata" or engine is None:
+            return markdown
+        from markitdown import StreamInfo
+
+        normalized = self.normalize(stream, extension)
+        if normalized is stream:
+            info = StreamInfo(extension=extension, mimetype=mimetypes.guess_type("file" + extension)[0])
+        else:
+            info = StreamInfo(extension=".png", mimetype="image/png")
+        result = engine.convert_stream(normalized, stream_info=info)
+        return markdown + _without_fields(result.text_content, fields)
+
+
+def _without_fields(text, fields):
+    # exiftool lines come first, ahead of any "# Description:" section
+    head, marker, description = text.partition("\n# Description:")
+    lines = [line for line in head.splitlines(keepends=True) if line.split(": ", 1)[0] not in fields]
+    return "".join(lines) + marker + description
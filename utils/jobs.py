@@ -0,0 +1,352 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logs import get_request_id, set_request_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_QUEUED = 32
+DEFAULT_RESULT_TTL = 600
+SWEEP_INTERVAL = 60
+# Temp files are renamed as soon as they are written; one this old was abandoned
+STALE_TEMP_SECONDS = 3600
+# Progress updates are written to the shared state directory at most this often
+PROGRESS_PERSIST_INTERVAL = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+# The progress callback of the job running on this thread, if any
+_current = threading.local()
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity.
+    """
+
+
+def report_progress(done, total):
+    """
+    Report that ``done`` of ``total`` units (pages, chunks, bytes) of the
+    job running on this thread are converted. Does nothing outside a job.
+    """
+    callback = getattr(_current, "progress", None)
+    if callback is not None and total:
+        callback(min(done / total, 1.0))
+
+
+class Job:
+    """
+    A submitted conversion. ``progress`` is the fraction done, or ``None``
+    while a running job's converter has not reported any.
+    """
+
+    def __init__(self, job_id, filename):
+        self.id = job_id
+        self.filename = filename
+        self.status = QUEUED
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, record):
+        job = cls(record["job_id"], record["filename"])
+        job.status = record["status"]
+        job.progress = record["progress"]
+        job.result = record.get("result")
+        job.error = record["error"]
+        job.created_at = record["created_at"]
+        job.started_at = record["started_at"]
+        job.finished_at = record["finished_at"]
+        return job
+
+
+class JobManager:
+    """
+    Runs conversions on a bounded background thread pool.
+
+    At most ``max_queued`` jobs may be queued or running at once; further
+    submissions raise ``QueueFullError`` so callers can apply backpressure.
+    Finished jobs are kept for ``result_ttl`` seconds and then discarded.
+
+    When ``state_dir`` is set, every job is also written there as JSON so
+    that other server processes sharing the directory can answer status and
+    result requests for it. Multi-worker servers need this because a client's
+    polls may land on any worker.
+    """
+
+    def __init__(
+        self,
+        workers=DEFAULT_WORKERS,
+        max_queued=DEFAULT_MAX_QUEUED,
+        result_ttl=DEFAULT_RESULT_TTL,
+        state_dir=None,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.state_dir = state_dir
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._last_sweep = 0.0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="file2md-job"
+        )
+        self._jobs = {}
+        self._order = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a job manager configured from FILE2MD_JOB_* environment variables.
+        """
+        return cls(
+            workers=int(os.getenv("FILE2MD_JOB_WORKERS", DEFAULT_WORKERS)),
+            max_queued=int(os.getenv("FILE2MD_JOB_MAX_QUEUED", DEFAULT_MAX_QUEUED)),
+            result_ttl=float(os.getenv("FILE2MD_JOB_RESULT_TTL", DEFAULT_RESULT_TTL)),
+            state_dir=os.getenv("FILE2MD_JOB_DIR") or None,
+        )
+
+    def submit(self, filename, fn, *args, **kwargs):
+        """
+        Queue ``fn(*args, **kwargs)`` and return the new ``Job``.
+        """
+        with self._lock:
+            self._expire()
+            if self._pending_count() >= self.max_queued:
+                raise QueueFullError("Conversion queue is full, try again later")
+            job = Job(uuid.uuid4().hex, filename)
+            self._jobs[job.id] = job
+            self._order.append(job.id)
+            self._persist(job)
+        # The job's log records carry the id of the request that submitted it
+        self._executor.submit(self._run, job, fn, args, kwargs, get_request_id())
+        return job
+
+    def complete(self, filename, result):
+        """
+        Record an already available result (for example a cache hit) as a job.
+        """
+        with self._lock:
+            self._expire()
+            job = Job(uuid.uuid4().hex, filename)
+            job.status = DONE
+            job.progress = 1.0
+            job.result = result
+            job.started_at = job.finished_at = job.created_at
+            self._jobs[job.id] = job
+            self._persist(job)
+        return job
+
+    def get(self, job_id):
+        """
+        Return the job with ``job_id``, looking in the shared state directory
+        for jobs submitted to another process. Returns ``None`` when unknown.
+        """
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None:
+            job = self._load(job_id)
+        return job
+
+    def queue_position(self, job):
+        """
+        Return how many queued jobs are ahead of ``job`` (0 when it is next).
+        """
+        with self._lock:
+            if job.status != QUEUED:
+                return None
+            position = 0
+            for job_id in self._order:
+                if job_id == job.id:
+                    return position
+                other = self._jobs.get(job_id)
+                if other is not None and other.status == QUEUED:
+                    position += 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts["workers"] = self.workers
+        counts["max_queued"] = self.max_queued
+        return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _pending_count(self):
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _expire(self):
+        if not self.result_ttl:
+            return
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._remove_state(job_id)
+        if expired:
+            self._order = [job_id for job_id in self._order if job_id in self._jobs]
+        if self.state_dir and time.time() - self._last_sweep > SWEEP_INTERVAL:
+            self._sweep(cutoff)
+
+    def _state_path(self, job_id):
+        # Job ids are uuid4 hex strings; anything else must not become a path
+        if len(job_id) != 32 or any(char not in "0123456789abcdef" for char in job_id):
+            return None
+        return os.path.join(self.state_dir, job_id + ".json")
+
+    def _persist(self, job):
+        if not self.state_dir:
+            return
+        record = job.to_dict()
+        record["result"] = job.result
+        fd, temp_path = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(record, handle)
+            os.replace(temp_path, self._state_path(job.id))
+        except OSError as e:
+            logger.warning("Could not persist job %s: %s", job.id, e)
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def _load(self, job_id):
+        if not self.state_dir:
+            return None
+        path = self._state_path(job_id)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as handle:
+                job = Job.from_dict(json.load(handle))
+        except (OSError, ValueError, KeyError):
+            return None
+        if self.result_ttl and job.finished and job.finished_at < time.time() - self.result_ttl:
+            self._remove_state(job_id)
+            return None
+        return job
+
+    def _remove_state(self, job_id):
+        if not self.state_dir:
+            return
+        try:
+            os.unlink(self._state_path(job_id))
+        except OSError:
+            pass
+
+    def _sweep(self, cutoff):
+        """
+        Delete records of finished jobs left behind by processes that exited
+        before expiring them.
+
+        Other workers share the directory, so queued and running jobs are
+        kept however old their file is, and only temp files a crashed writer
+        abandoned long ago are removed.
+        """
+        self._last_sweep = time.time()
+        try:
+            names = os.listdir(self.state_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.state_dir, name)
+            try:
+                if name.endswith(".tmp"):
+                    if os.path.getmtime(path) < time.time() - STALE_TEMP_SECONDS:
+                        os.unlink(path)
+                    continue
+                job_id, extension = os.path.splitext(name)
+                if extension != ".json" or self._state_path(job_id) is None:
+                    continue
+                with open(path, encoding="utf-8") as handle:
+                    record = json.load(handle)
+                if record["status"] in (DONE, FAILED) and record["finished_at"] < cutoff:
+                    os.unlink(path)
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+    def _run(self, job, fn, args, kwargs, request_id=None):
+        set_request_id(request_id)
+        try:
+            self._execute(job, fn, args, kwargs)
+        finally:
+            set_request_id(None)
+
+    def _execute(self, job, fn, args, kwargs):
+        with self._lock:
+            job.status = RUNNING
+            job.progress = None
+            job.started_at = time.time()
+            self._order = [job_id for job_id in self._order if job_id != job.id]
+            self._persist(job)
+        persisted = [time.monotonic()]
+
+        def progress(fraction):
+            with self._lock:
+                job.progress = fraction
+                if time.monotonic() - persisted[0] >= PROGRESS_PERSIST_INTERVAL:
+                    persisted[0] = time.monotonic()
+                    self._persist(job)
+
+        _current.progress = progress
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.id, e)
+            with self._lock:
+                job.status = FAILED
+                job.error = str(e)
+                job.finished_at = time.time()
+                self._persist(job)
+            return
+        finally:
+            _current.progress = None
+        with self._lock:
+            job.status = DONE
+            job.progress = 1.0
+            job.result = result
+            job.finished_at = time.time()
+            self._persist(job)
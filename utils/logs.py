@@ -0,0 +1,154 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+DEFAULT_LEVEL = "INFO"
+DEFAULT_LIBRARY_LEVEL = "WARNING"
+DEFAULT_FORMAT = "json"
+
+# Parsers that log per object or per page at DEBUG/INFO; they stay at the library level
+LIBRARY_LOGGERS = (
+    "pdfminer",
+    "pdfplumber",
+    "markitdown",
+    "PIL",
+    "pydub",
+    "charset_normalizer",
+    "urllib3",
+    "openpyxl",
+    "mammoth",
+)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_context = threading.local()
+_lock = threading.Lock()
+_handler = None
+_listener = None
+_target = None
+
+
+def set_request_id(request_id):
+    """
+    Tag log records from this thread with ``request_id`` (``None`` clears it).
+    """
+    _context.request_id = request_id
+
+
+def get_request_id():
+    return getattr(_context, "request_id", None)
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Copy the current thread's request id onto each record, before it leaves the thread.
+    """
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = get_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, the request id
+    and any fields passed through ``extra``.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve the message and traceback in the calling thread, but leave the
+        # rest of the formatting (and all of the I/O) to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_listener():
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, _target, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork, so a forked worker starts its own
+    if _handler is not None:
+        _start_listener()
+
+
+def stop_logging():
+    """
+    Flush queued records and stop the writer thread.
+    """
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def configure_logging(level=None, library_level=None, log_format=None, stream=None):
+    """
+    Set up logging for the process once; later calls are no-ops.
+
+    Records are put on a queue by the logging thread and written by a
+    background thread, so a slow stderr or log shipper never blocks a
+    conversion. Reads FILE2MD_LOG_LEVEL (default ``INFO``),
+    FILE2MD_LIBRARY_LOG_LEVEL for the noisy parser libraries (default
+    ``WARNING``) and FILE2MD_LOG_FORMAT (``json`` or ``text``).
+    """
+    global _handler, _target
+    with _lock:
+        if _handler is not None:
+            return
+        level = (level or os.getenv("FILE2MD_LOG_LEVEL", DEFAULT_LEVEL)).upper()
+        library_level = (library_level or os.getenv("FILE2MD_LIBRARY_LOG_LEVEL", DEFAULT_LIBRARY_LEVEL)).upper()
+        log_format = log_format or os.getenv("FILE2MD_LOG_FORMAT", DEFAULT_FORMAT)
+
+        _target = logging.StreamHandler(stream or sys.stderr)
+        if log_format == "json":
+            _target.setFormatter(JsonFormatter())
+        else:
+            _target.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+        _handler = _QueueHandler(None)
+        _handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(_handler)
+        for name in LIBRARY_LOGGERS:
+            logging.getLogger(name).setLevel(library_level)
+
+        _start_listener()
+        os.register_at_fork(after_in_child=_restart_after_fork)
+        atexit.register(stop_logging)
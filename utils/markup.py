@@ -0,0 +1,744 @@
+import codecs
+import io
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+from lxml import etree
+
+from utils.ooxml import join_blocks, markdown_table
+from utils.tables import detect_encoding
+
+MARKUP_EXTENSIONS = {".json", ".xml", ".html"}
+
+DEFAULT_MAX_DEPTH = 64
+DEFAULT_MAX_ELEMENTS = 2_000_000
+
+# Bytes fed to the parsers per read
+READ_BYTES = 64 * 1024
+# JSON values up to this many characters are decoded in one go; larger
+# containers are walked member by member
+JSON_WINDOW = 1024 * 1024
+
+# Dropped with everything inside them while the page is parsed
+BOILERPLATE_TAGS = {"script", "style", "nav", "noscript", "template", "head"}
+
+_WHITESPACE = re.compile(r"\s+")
+_JSON_SPACE = re.compile(r"[ \t\n\r]*")
+
+
+class MarkupLimitError(ValueError):
+    """
+    Raised for a document nested deeper than ``MarkupLimits.max_depth``.
+    """
+
+
+class _ElementLimit(Exception):
+    pass
+
+
+class MarkupLimits:
+    """
+    Caps for incremental JSON, XML and HTML conversion.
+
+    A document nested deeper than ``max_depth`` is refused with
+    ``MarkupLimitError``. After ``max_elements`` elements (JSON values, XML or
+    HTML elements) the output stops with a note that it was cut short. ``0``
+    disables either cap.
+    """
+
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, max_elements=DEFAULT_MAX_ELEMENTS):
+        self.max_depth = max_depth
+        self.max_elements = max_elements
+        self._count = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Read FILE2MD_MARKUP_MAX_DEPTH and FILE2MD_MARKUP_MAX_ELEMENTS.
+        """
+        return cls(
+            max_depth=int(os.getenv("FILE2MD_MARKUP_MAX_DEPTH", DEFAULT_MAX_DEPTH)),
+            max_elements=int(os.getenv("FILE2MD_MARKUP_MAX_ELEMENTS", DEFAULT_MAX_ELEMENTS)),
+        )
+
+    def counter(self):
+        """
+        Return a fresh per-document copy, so one conversion's count never leaks into another.
+        """
+        return MarkupLimits(self.max_depth, self.max_elements)
+
+    def enter(self, depth):
+        if self.max_depth and depth > self.max_depth:
+            raise MarkupLimitError(f"Document is nested deeper than the {self.max_depth} level limit")
+        self._count += 1
+        if self.max_elements and self._count > self.max_elements:
+            raise _ElementLimit()
+
+
+def _limited(blocks, limits):
+    try:
+        yield from blocks
+    except _ElementLimit:
+        yield "note", f"*Output truncated after {limits.max_elements} elements.*"
+
+
+def iter_markup_markdown(stream, extension, limits=None):
+    """
+    Yield markdown for a ``.json``, ``.xml`` or ``.html`` stream, parsing it
+    incrementally with memory bounded by the largest single block.
+    """
+    limits = (limits or MarkupLimits()).counter()
+    if extension == ".json":
+        blocks = _JsonReader(stream, limits).blocks()
+    elif extension == ".xml":
+        blocks = _xml_blocks(stream, limits)
+    else:
+        blocks = _html_blocks(stream, limits)
+    return join_blocks(_limited(blocks, limits))
+
+
+# JSON
+
+
+def _scalar(value):
+    if isinstance(value, str) and value:
+        return value.replace("\r\n", " ").replace("\n", " ")
+    return json.dumps(value)
+
+
+class _JsonReader:
+    """
+    Render JSON as headings and nested lists without loading it whole.
+
+    Values that fit in ``JSON_WINDOW`` characters are decoded by the C
+    decoder in one call; objects and arrays larger than that are walked one
+    member at a time, so memory stays bounded by the window.
+
+    Containers in the top two levels become ``##``/``###`` headings (array
+    items as ``Item n``), deeper ones nested ``-`` lists with ``**key**:``
+    labels. Once a member has opened a heading, later scalar members get
+    headings of their own, so they do not read as part of that section.
+    """
+
+    def __init__(self, stream, limits):
+        self.stream = stream
+        self.text = None
+        self.limits = limits
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def blocks(self):
+        self.text = io.TextIOWrapper(self.stream, encoding="utf-8-sig", errors="replace")
+        try:
+            if self._peek() == "":
+                return
+            yield from self._node(None, 0, 2, 0)
+            if self._peek() != "":
+                raise ValueError("Invalid JSON: extra data after the document")
+        finally:
+            # Leave the underlying upload open for the caller
+            self.text.detach()
+
+    def _fill(self):
+        wanted = max(READ_BYTES, len(self.buffer) - self.position)
+        chunk = self.text.read(wanted)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        if not chunk:
+            self.eof = True
+
+    def _peek(self):
+        while True:
+            self.position = _JSON_SPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self._fill()
+
+    def _expect(self, characters):
+        char = self._peek()
+        if char not in characters or not char:
+            raise ValueError(f"Invalid JSON: expected one of {characters!r} at character {self.position}")
+        self.position += 1
+        return char
+
+    def _decode(self, container):
+        """
+        Decode the value at the current position, or return ``(False, None)``
+        for a container too large to hold.
+        """
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"Invalid JSON: {e}")
+                if container and len(self.buffer) - self.position >= JSON_WINDOW:
+                    return False, None
+                self._fill()
+                continue
+            except RecursionError:
+                raise MarkupLimitError(f"Document is nested deeper than the {self.limits.max_depth} level limit")
+            # A number or literal at the very end of the buffer may continue in the next read
+            if end == len(self.buffer) and not self.eof and not container:
+                self._fill()
+                continue
+            self.position = end
+            return True, value
+
+    def _node(self, label, depth, heading, indent, sectioned=False):
+        char = self._peek()
+        container = char in ("{", "[")
+        decoded, value = self._decode(container)
+        if decoded:
+            yield from _json_value(value, label, depth, heading, indent, self.limits, sectioned)
+            return
+
+        # Too large to decode in one piece: walk its members
+        self.limits.enter(depth)
+        title, heading, indent = _json_title(label, heading, indent)
+        if title:
+            yield title
+        self._expect(char)
+        closing = "}" if char == "{" else "]"
+        if self._peek() == closing:
+            self.position += 1
+            return
+        number = 0
+        sectioned = False
+        while True:
+            number += 1
+            if char == "{":
+                label = self._key()
+                self._expect(":")
+                self._peek()
+            else:
+                label = number
+            for block in self._node(label, depth + 1, heading, indent, sectioned):
+                sectioned = sectioned or block[0] == "heading"
+                yield block
+            if self._expect("," + closing) == closing:
+                return
+
+    def _key(self):
+        if self._peek() != '"':
+            raise ValueError(f"Invalid JSON: expected a key at character {self.position}")
+        while True:
+            try:
+                key, self.position = json.decoder.scanstring(self.buffer, self.position + 1)
+                return key
+            except json.JSONDecodeError as e:
+                # The key runs past the end of the buffer
+                if self.eof:
+                    raise ValueError(f"Invalid JSON: {e}")
+                self._fill()
+
+
+def _json_title(label, heading, indent):
+    """
+    Return the line that introduces a container and the heading level and
+    list indent its members continue at.
+    """
+    if label is None:
+        return None, heading, indent
+    name = f"Item {label}" if isinstance(label, int) else label
+    if heading <= 3 and not indent:
+        return ("heading", "#" * heading + " " + name), heading + 1, 0
+    text = name if isinstance(label, int) else f"**{name}**"
+    return ("item:json", "  " * indent + f"- {text}:"), 4, indent + 1
+
+
+def _json_value(value, label, depth, heading, indent, limits, sectioned=False):
+    limits.enter(depth)
+    if isinstance(value, (dict, list)):
+        if not value:
+            yield from _json_leaf(label, "{}" if isinstance(value, dict) else "[]", heading, indent, sectioned)
+            return
+        title, heading, indent = _json_title(label, heading, indent)
+        if title:
+            yield title
+        members = value.items() if isinstance(value, dict) else enumerate(value, start=1)
+        sectioned = False
+        for key, member in members:
+            for block in _json_value(member, key, depth + 1, heading, indent, limits, sectioned):
+                sectioned = sectioned or block[0] == "heading"
+                yield block
+        return
+    yield from _json_leaf(label, _scalar(value), heading, indent, sectioned)
+
+
+def _json_leaf(label, text, heading, indent, sectioned):
+    """
+    Yield the blocks of a scalar or empty container.
+
+    ``sectioned`` means an earlier sibling opened a heading. A list item
+    would then read as part of that sibling's section, so the value gets a
+    heading at the sibling's level instead.
+    """
+    if label is None:
+        yield "paragraph", text
+    elif sectioned:
+        name = f"Item {label}" if isinstance(label, int) else label
+        yield "heading", "#" * heading + " " + name
+        yield "paragraph", text
+    else:
+        yield _json_line(label, text, indent)
+
+
+def _json_line(label, text, indent):
+    prefix = "  " * indent + "- "
+    if isinstance(label, int):
+        return "item:json", prefix + text
+    return "item:json", f"{prefix}**{label}**: {text}"
+
+
+# XML
+
+
+def _local(tag):
+    return etree.QName(tag).localname if isinstance(tag, str) else None
+
+
+def _pull(parser, stream):
+    """
+    Feed ``stream`` to a pull parser and yield its events as they come.
+    """
+    while True:
+        chunk = stream.read(READ_BYTES)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def _free(element):
+    """
+    Drop an element's content and the already rendered siblings before it.
+    """
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _xml_blocks(stream, limits):
+    """
+    Render XML as a nested list: one ``- **tag** (attributes): text`` line per
+    element, indented by depth. Each line is written as soon as the element's
+    leading text is known, and finished elements are dropped from the tree.
+    """
+    parser = etree.XMLPullParser(
+        events=("start", "end"), resolve_entities=False, no_network=True, remove_comments=True, remove_pis=True
+    )
+    depth = 0
+    # Elements whose line has not been written yet, waiting for their text
+    pending = []
+
+    def line(element, level):
+        attributes = ", ".join(f"{_local(name)}={value}" for name, value in element.attrib.items())
+        text = _WHITESPACE.sub(" ", element.text or "").strip()
+        head = f"**{_local(element.tag)}**" + (f" ({attributes})" if attributes else "")
+        element.text = None
+        return "item:xml", "  " * level + "- " + head + (f": {text}" if text else "")
+
+    def tail(element, level):
+        text = _WHITESPACE.sub(" ", element.tail or "").strip()
+        element.tail = None
+        return ("item:xml", "  " * level + "- " + text) if text else None
+
+    for event, element in _pull(parser, stream):
+        if event == "start":
+            depth += 1
+            limits.enter(depth)
+            # The parent's text before this child is parsed by now
+            for waiting, level in pending:
+                yield line(waiting, level)
+            pending = [(element, depth - 1)]
+            for previous in reversed(list(element.itersiblings(preceding=True))):
+                block = tail(previous, depth - 1)
+                if block:
+                    yield block
+        else:
+            for waiting, level in pending:
+                yield line(waiting, level)
+            pending = []
+            # Only the last child element and unresolved entity references after it are left
+            for child in element:
+                block = tail(child, depth)
+                if block:
+                    yield block
+            depth -= 1
+            _free(element)
+
+
+# HTML
+
+_HEADINGS = {f"h{level}": level for level in range(1, 7)}
+BLOCK_TAGS = {
+    "p", "ul", "ol", "dl", "table", "pre", "blockquote", "figure", "hr", "address", "details", "li", "dt", "dd",
+} | set(_HEADINGS)
+# Elements that only group others; their children are rendered one by one as they finish
+CONTAINER_TAGS = {"html", "body", "div", "section", "article", "main", "header", "footer", "aside", "center", "form", "fieldset"}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+}
+HEAD_TAGS = {"title", "meta", "link", "style", "script", "base", "noscript", "template"}
+# An opening tag closes these open elements first, unless one of the scope elements comes before them
+_IMPLIED_END = {
+    "li": ({"li"}, {"ul", "ol"}),
+    "dt": ({"dt", "dd"}, {"dl"}),
+    "dd": ({"dt", "dd"}, {"dl"}),
+    "tr": ({"tr", "td", "th"}, {"table"}),
+    "td": ({"td", "th"}, {"tr", "table"}),
+    "th": ({"td", "th"}, {"tr", "table"}),
+    "option": ({"option"}, {"select"}),
+}
+_PARAGRAPH_SCOPE = {"table", "td", "th", "button"}
+# A <meta charset> or http-equiv declaration in the head of a page
+_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+# Characters lxml refuses in text
+_NOT_XML = re.compile("[^\u0009\u000a\u000d\u0020-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]")
+
+
+class _HtmlTree(HTMLParser):
+    """
+    Build an lxml tree from the standard library's HTML tokenizer, queuing
+    the same ``(event, element)`` pairs as a pull parser.
+
+    libxml2's HTML push parser keeps every byte it was fed until the end,
+    while this tokenizer drops input once it is parsed, so a page never
+    has to fit in memory. Unclosed paragraphs, list items, table cells and
+    the like are closed the way browsers close them.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = etree.Element("html")
+        self.stack = [self.root]
+        self.events = [("start", self.root)]
+
+    def drain(self):
+        events, self.events = self.events, []
+        return events
+
+    def _find(self, tags, scope):
+        for index in range(len(self.stack) - 1, 0, -1):
+            tag = self.stack[index].tag
+            if tag in tags:
+                return index
+            if tag in scope:
+                return None
+        return None
+
+    def _close(self, index):
+        while len(self.stack) > index:
+            self.events.append(("end", self.stack.pop()))
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "html":
+            return
+        implied = [self._find({"head"}, ()) if tag not in HEAD_TAGS else None]
+        if tag in _IMPLIED_END:
+            implied.append(self._find(*_IMPLIED_END[tag]))
+        if tag in BLOCK_TAGS or tag in CONTAINER_TAGS:
+            implied.append(self._find({"p"}, _PARAGRAPH_SCOPE))
+        implied = [index for index in implied if index]
+        if implied:
+            self._close(min(implied))
+
+        try:
+            element = etree.SubElement(self.stack[-1], tag)
+        except ValueError:
+            element = etree.SubElement(self.stack[-1], "span")
+        for name, value in attrs:
+            try:
+                element.set(name, _NOT_XML.sub("", value or ""))
+            except ValueError:
+                pass
+        self.events.append(("start", element))
+        if tag in VOID_TAGS:
+            self.events.append(("end", element))
+        else:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        index = self._find({tag}, ())
+        if index:
+            self._close(index)
+
+    def handle_data(self, data):
+        data = _NOT_XML.sub("", data)
+        parent = self.stack[-1]
+        if len(parent):
+            last = parent[-1]
+            last.tail = (last.tail or "") + data
+        else:
+            parent.text = (parent.text or "") + data
+
+    def close(self):
+        super().close()
+        self._close(0)
+
+
+def _html_encoding(stream):
+    """
+    Return the charset a page declares in its first 1 KB, or a guess from its bytes.
+    """
+    position = stream.tell()
+    head = stream.read(1024)
+    stream.seek(position)
+    if not head.startswith(codecs.BOM_UTF8):
+        declared = _CHARSET.search(head)
+        if declared:
+            try:
+                return codecs.lookup(declared.group(1).decode("ascii")).name
+            except LookupError:
+                pass
+    return detect_encoding(stream)
+
+
+def _html_events(stream):
+    tree = _HtmlTree()
+    decoder = codecs.getincrementaldecoder(_html_encoding(stream))(errors="replace")
+    while True:
+        chunk = stream.read(READ_BYTES)
+        if not chunk:
+            break
+        tree.feed(decoder.decode(chunk))
+        yield from tree.drain()
+    tree.feed(decoder.decode(b"", final=True))
+    tree.close()
+    yield from tree.drain()
+
+
+def _html_blocks(stream, limits):
+    """
+    Render HTML block by block as the page is parsed.
+
+    Every outermost element that is not a mere container (``div``,
+    ``section``, ...) is rendered when it ends and then dropped, together
+    with anything before it. Inline runs between blocks are gathered into
+    paragraphs. Boilerplate (``script``, ``style``, ``nav`` and similar) is
+    discarded as soon as it is parsed.
+    """
+    depth = 0
+    captured = None
+    skipped = None
+    inline = []
+
+    def paragraph():
+        text = _WHITESPACE.sub(" ", "".join(inline)).strip()
+        inline.clear()
+        return ("paragraph", text) if text else None
+
+    def loose(element):
+        # Text between blocks: a container's leading text or the tail of the previous sibling
+        previous = element.getprevious()
+        source, attribute = (previous, "tail") if previous is not None else (element.getparent(), "text")
+        if source is not None and getattr(source, attribute):
+            inline.append(getattr(source, attribute))
+            setattr(source, attribute, None)
+
+    for event, element in _html_events(stream):
+        tag = element.tag
+        if event == "start":
+            depth += 1
+            limits.enter(depth)
+            if captured is not None or skipped is not None:
+                continue
+            loose(element)
+            if tag in BOILERPLATE_TAGS:
+                skipped = element
+            elif tag in CONTAINER_TAGS or tag in BLOCK_TAGS:
+                block = paragraph()
+                if block:
+                    yield block
+                if tag not in CONTAINER_TAGS:
+                    captured = element
+            else:
+                captured = element
+            continue
+
+        depth -= 1
+        if element is skipped:
+            skipped = None
+            _free(element)
+        elif skipped is not None:
+            continue
+        elif captured is not None and element is not captured:
+            if tag in BOILERPLATE_TAGS:
+                _drop(element)
+        elif element is captured:
+            captured = None
+            if tag in BLOCK_TAGS:
+                block = paragraph()
+                if block:
+                    yield block
+                for block in _render_block(element):
+                    yield block
+            else:
+                inline.append(_inline(element))
+            _free(element)
+        else:
+            # A container is finished: flush the text after its last child
+            children = len(element)
+            if children:
+                last = element[children - 1]
+                if last.tail:
+                    inline.append(last.tail)
+                    last.tail = None
+            elif element.text:
+                inline.append(element.text)
+                element.text = None
+            block = paragraph()
+            if block:
+                yield block
+            _free(element)
+    block = paragraph()
+    if block:
+        yield block
+
+
+def _drop(element):
+    """
+    Remove an element from its parent, keeping the text that follows it.
+    """
+    parent = element.getparent()
+    if parent is None:
+        return
+    if element.tail:
+        previous = element.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or "") + element.tail
+        else:
+            parent.text = (parent.text or "") + element.tail
+    parent.remove(element)
+
+
+def _text(value):
+    return _WHITESPACE.sub(" ", value) if value else ""
+
+
+def _inline(element):
+    """
+    Markdown for an element's inline content (without its tail).
+    """
+    tag = element.tag
+    if tag == "br":
+        return "\n"
+    if tag == "img":
+        source = element.get("src", "")
+        if source.startswith("data:"):
+            source = source.split(",", 1)[0] + "..."
+        return f"![{element.get('alt', '')}]({source})"
+    if tag in BOILERPLATE_TAGS:
+        return ""
+
+    content = _text(element.text)
+    for child in element:
+        content += _inline(child) + _text(child.tail)
+    core = content.strip()
+    if not core:
+        return content
+    leading = " " if content[0].isspace() else ""
+    trailing = " " if content[-1].isspace() else ""
+    if tag in ("b", "strong"):
+        core = f"**{core}**"
+    elif tag in ("i", "em"):
+        core = f"*{core}*"
+    elif tag == "code":
+        core = f"`{core}`"
+    elif tag == "a" and element.get("href"):
+        core = f"[{core}]({element.get('href')})"
+    else:
+        return content
+    return leading + core + trailing
+
+
+def _flow(element):
+    """
+    Render mixed content: inline runs become paragraphs and block children are rendered in place.
+    """
+    blocks = []
+    inline = [_text(element.text)]
+
+    def flush():
+        text = "".join(inline).strip()
+        inline.clear()
+        if text:
+            blocks.append(("paragraph", text))
+
+    for child in element:
+        tag = child.tag
+        if tag in BLOCK_TAGS or tag in CONTAINER_TAGS:
+            flush()
+            blocks.extend(_render_block(child))
+        else:
+            inline.append(_inline(child))
+        inline.append(_text(child.tail))
+    flush()
+    return blocks
+
+
+def _render_block(element):
+    tag = element.tag
+    if tag in _HEADINGS:
+        text = _inline(element).strip()
+        return [("heading", "#" * _HEADINGS[tag] + " " + text)] if text else []
+    if tag in ("ul", "ol"):
+        lines = _list_lines(element, 0)
+        return [("list", "\n".join(lines))] if lines else []
+    if tag == "table":
+        rows = [
+            [_inline(cell).strip() for cell in row if cell.tag in ("td", "th")]
+            for row in element.iter("tr")
+        ]
+        rows = [row for row in rows if row]
+        return [("table", markdown_table(rows))] if rows else []
+    if tag == "pre":
+        return [("code", "```\n" + "".join(element.itertext()).strip("\n") + "\n```")]
+    if tag == "blockquote":
+        quoted = "\n\n".join(text for _, text in _flow(element))
+        return [("quote", "\n".join("> " + line if line else ">" for line in quoted.splitlines()))] if quoted else []
+    if tag == "hr":
+        return [("rule", "---")]
+    if tag == "dt":
+        text = _inline(element).strip()
+        return [("paragraph", f"**{text}**")] if text else []
+    if tag in ("p", "li", "dd", "address"):
+        text = _inline(element).strip()
+        return [("paragraph", text)] if text else []
+    return _flow(element)
+
+
+def _list_lines(element, level):
+    lines = []
+    ordered = element.tag == "ol"
+    number = 0
+    for item in element:
+        if item.tag != "li":
+            continue
+        number += 1
+        marker = f"{number}." if ordered else "*"
+        text = _text(item.text)
+        nested = []
+        for child in item:
+            if child.tag in ("ul", "ol"):
+                nested.extend(_list_lines(child, level + 1))
+            else:
+                text += _inline(child)
+            text += _text(child.tail)
+        lines.append("    " * level + f"{marker} {text.strip()}")
+        lines.extend(nested)
+    return lines
@@ -0,0 +1,322 @@
+import bisect
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labels, key, ("le", _number(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+
+    Gauges are not stored; ``add_collector`` registers a callable returning
+    ``{name: (help, value)}`` that is sampled at render time instead.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                gauges = collector()
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+                continue
+            for name, (help_text, value) in sorted(gauges.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "file2md_stage_seconds", "Time spent in each conversion stage.", ("stage",)
+)
+request_seconds = registry.histogram(
+    "file2md_request_seconds", "Request latency by endpoint and status.", ("endpoint", "method", "status")
+)
+conversions_total = registry.counter(
+    "file2md_conversions_total", "Conversions by input format and outcome.", ("format", "outcome")
+)
+input_bytes = registry.histogram(
+    "file2md_input_bytes", "Size of converted inputs.", ("format",), SIZE_BUCKETS
+)
+output_bytes = registry.histogram(
+    "file2md_output_bytes", "Size of produced markdown.", ("format",), SIZE_BUCKETS
+)
+pdf_pages_total = registry.counter(
+    "file2md_pdf_pages_total", "PDF pages converted page by page, by whether they came from cache.", ("source",)
+)
+audio_chunks_total = registry.counter(
+    "file2md_audio_chunks_total", "Audio chunks transcribed, by whether they came from cache.", ("source",)
+)
+content_sniffs_total = registry.counter(
+    "file2md_content_sniffs_total",
+    "Uploads by declared extension, sniffed content and whether they agree.",
+    ("declared", "detected", "outcome"),
+)
+
+_current = threading.local()
+
+
+class RequestTimings:
+    """
+    Per-request stage durations, rendered as a ``Server-Timing`` header.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+
+    def add(self, stage, seconds):
+        self.stages.append((stage, seconds))
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def merged(self):
+        """
+        Return the total seconds per stage, in the order stages first ran.
+        """
+        merged = {}
+        for stage, seconds in self.stages:
+            merged[stage] = merged.get(stage, 0.0) + seconds
+        return merged
+
+    def server_timing(self):
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.merged().items()]
+        parts.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_request():
+    """
+    Begin collecting stage timings for the request handled by this thread.
+    """
+    _current.timings = RequestTimings()
+    return _current.timings
+
+
+def finish_request():
+    timings = getattr(_current, "timings", None)
+    _current.timings = None
+    return timings
+
+
+def record_stage(stage, seconds):
+    """
+    Record a stage duration in the histogram and in the current request, if any.
+    """
+    stage_seconds.observe(seconds, stage=stage)
+    timings = getattr(_current, "timings", None)
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_conversion(extension, outcome, size=None, output_size=None):
+    conversions_total.inc(format=extension, outcome=outcome)
+    if size is not None:
+        input_bytes.observe(size, format=extension)
+    if output_size is not None:
+        output_bytes.observe(output_size, format=extension)
+
+
+def record_pdf_pages(cached, converted):
+    if cached:
+        pdf_pages_total.inc(cached, source="cache")
+    if converted:
+        pdf_pages_total.inc(converted, source="converted")
+
+
+def record_audio_chunks(cached, transcribed):
+    if cached:
+        audio_chunks_total.inc(cached, source="cache")
+    if transcribed:
+        audio_chunks_total.inc(transcribed, source="transcribed")
+
+
+def record_sniff(declared, detected, outcome):
+    content_sniffs_total.inc(declared=declared, detected=detected or "unknown", outcome=outcome)
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in cProfile hook that keeps profiles only for slow requests.
+
+    A sampled fraction of requests runs under cProfile; when one takes at
+    least ``threshold_ms`` its stats are dumped to ``directory`` for
+    inspection with ``pstats`` or snakeviz.
+    """
+
+    def __init__(self, directory, threshold_ms, sample_rate=1.0):
+        self.directory = directory
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Return a profiler when FILE2MD_PROFILE_DIR is set, otherwise ``None``.
+        """
+        directory = os.getenv("FILE2MD_PROFILE_DIR")
+        if not directory:
+            return None
+        return cls(
+            directory,
+            float(os.getenv("FILE2MD_PROFILE_SLOW_MS", 1000)),
+            float(os.getenv("FILE2MD_PROFILE_SAMPLE_RATE", 1.0)),
+        )
+
+    def start(self):
+        if random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on newer Pythons
+            return None
+        return profile
+
+    def stop(self, profile, label, duration):
+        if profile is None:
+            return None
+        profile.disable()
+        duration_ms = duration * 1000
+        if duration_ms < self.threshold_ms:
+            return None
+        safe_label = "".join(char if char.isalnum() else "_" for char in label).strip("_") or "request"
+        path = os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{safe_label}-{int(duration_ms)}ms-{os.getpid()}.prof",
+        )
+        profile.dump_stats(path)
+        logger.warning("Slow request %s took %.0f ms, profile written to %s", label, duration_ms, path)
+        return path
@@ -0,0 +1,506 @@
+import base64
+import logging
+import mimetypes
+import posixpath
+import zipfile
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+OOXML_EXTENSIONS = {".docx", ".pptx"}
+
+# Markdown is handed out in pieces of about this many characters
+CHUNK_CHARS = 16 * 1024
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_WP = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}"
+_MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+_PKG_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_NOTES_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+_SLIDE_LAYOUT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+_SLIDE_MASTER = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideMaster"
+
+# Never resolve entities or fetch DTDs from a document
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+
+
+def markdown_table(rows):
+    """
+    Render a list of rows as a markdown table, using the first row as header.
+    """
+    rows = [[_cell(value) for value in row] for row in rows]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "| " + " | ".join(["---"] * width) + " |"]
+    lines.extend("| " + " | ".join(row) + " |" for row in rows[1:])
+    return "\n".join(lines)
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    return str(value).replace("|", "\\|").replace("\r\n", " ").replace("\n", " ")
+
+
+def _flag(properties, tag):
+    element = properties.find(tag) if properties is not None else None
+    return element is not None and element.get(_W + "val") not in ("0", "false", "off")
+
+
+class _Package:
+    """
+    Read access to the parts of an OOXML zip package.
+    """
+
+    def __init__(self, stream, include_media):
+        self.zip = zipfile.ZipFile(stream)
+        self.include_media = include_media
+
+    def exists(self, name):
+        try:
+            self.zip.getinfo(name)
+        except KeyError:
+            return False
+        return True
+
+    def parse(self, name):
+        with self.zip.open(name) as handle:
+            return etree.parse(handle, _PARSER).getroot()
+
+    def relationships(self, part):
+        """
+        Return ``{id: (type, target part name)}`` for the relationships of ``part``.
+        """
+        directory, filename = posixpath.split(part)
+        rels_name = posixpath.join(directory, "_rels", filename + ".rels")
+        if not self.exists(rels_name):
+            return {}
+        relationships = {}
+        for rel in self.parse(rels_name).iter(_PKG_RELS + "Relationship"):
+            target = rel.get("Target", "")
+            if rel.get("TargetMode") != "External":
+                target = posixpath.normpath(posixpath.join(directory, target)).lstrip("/")
+            relationships[rel.get("Id")] = (rel.get("Type", ""), target)
+        return relationships
+
+    def image(self, alt, target, fallback_name):
+        """
+        Markdown for an embedded image. The image bytes are only read when media is inlined.
+        """
+        if self.include_media and target and self.exists(target):
+            mimetype = mimetypes.guess_type(target)[0] or "application/octet-stream"
+            data = base64.b64encode(self.zip.read(target)).decode("ascii")
+            return f"![{alt}](data:{mimetype};base64,{data})"
+        return f"![{alt}]({fallback_name})"
+
+
+def join_blocks(blocks, separator="\n\n"):
+    """
+    Join ``(kind, markdown)`` blocks and yield them about ``CHUNK_CHARS`` at a time.
+
+    Blocks are separated by a blank line, except consecutive blocks of the
+    same ``item:...`` kind (lines of one list), which go on consecutive lines.
+    """
+    pending = []
+    size = 0
+    previous = None
+    for kind, text in blocks:
+        if previous is not None:
+            # Items of one list stay on consecutive lines
+            pending.append("\n" if kind == previous and kind.startswith("item") else separator)
+        pending.append(text)
+        size += len(text)
+        previous = kind
+        if size >= CHUNK_CHARS:
+            yield "".join(pending)
+            pending = []
+            size = 0
+    if pending or previous is not None:
+        yield "".join(pending) + "\n"
+
+
+def iter_docx_markdown(stream, include_media=False):
+    """
+    Yield markdown for a Word document, reading ``word/document.xml`` incrementally.
+
+    Body paragraphs and tables are rendered one at a time and dropped from the
+    parse tree once written, so memory stays flat however long the document
+    is. Headings, list items, bold and italic runs, hyperlinks and tables are
+    kept. Images become ``![alt](name)`` references unless ``include_media``
+    asks for them to be inlined as data URIs.
+    """
+    package = _Package(stream, include_media)
+    return join_blocks(_DocxReader(package).blocks())
+
+
+class _DocxReader:
+    def __init__(self, package):
+        self.package = package
+        self.rels = package.relationships("word/document.xml")
+        self.styles = self._read_styles()
+        self.formats = self._read_numbering()
+        self.counters = {}
+
+    def _read_styles(self):
+        """
+        Map paragraph style ids to ``(heading level, numbering id, list level)``.
+        """
+        styles = {}
+        if not self.package.exists("word/styles.xml"):
+            return styles
+        for style in self.package.parse("word/styles.xml").iter(_W + "style"):
+            name = style.find(_W + "name")
+            name = (name.get(_W + "val") if name is not None else "").lower()
+            level = None
+            if name.startswith("heading ") and name[8:].isdigit():
+                level = min(6, int(name[8:]))
+            num_id, ilvl = self._numbering_of(style.find(_W + "pPr"))
+            styles[style.get(_W + "styleId")] = (level, num_id, ilvl)
+        return styles
+
+    def _read_numbering(self):
+        """
+        Map ``(numbering id, list level)`` to ``True`` for ordered and ``False`` for bulleted lists.
+        """
+        formats = {}
+        if not self.package.exists("word/numbering.xml"):
+            return formats
+        numbering = self.package.parse("word/numbering.xml")
+        abstract = {}
+        for definition in numbering.iter(_W + "abstractNum"):
+            levels = {}
+            for level in definition.iter(_W + "lvl"):
+                number_format = level.find(_W + "numFmt")
+                value = number_format.get(_W + "val") if number_format is not None else "bullet"
+                levels[level.get(_W + "ilvl", "0")] = value not in ("bullet", "none")
+            abstract[definition.get(_W + "abstractNumId")] = levels
+        for num in numbering.iter(_W + "num"):
+            reference = num.find(_W + "abstractNumId")
+            if reference is None:
+                continue
+            for ilvl, ordered in abstract.get(reference.get(_W + "val"), {}).items():
+                formats[(num.get(_W + "numId"), ilvl)] = ordered
+        return formats
+
+    @staticmethod
+    def _numbering_of(properties):
+        numbering = properties.find(_W + "numPr") if properties is not None else None
+        if numbering is None:
+            return None, None
+        num_id = numbering.find(_W + "numId")
+        ilvl = numbering.find(_W + "ilvl")
+        return (
+            num_id.get(_W + "val") if num_id is not None else None,
+            ilvl.get(_W + "val") if ilvl is not None else None,
+        )
+
+    def blocks(self):
+        """
+        Yield ``(kind, markdown)`` for each body paragraph and table, in order.
+        """
+        depth = 0
+        with self.package.zip.open("word/document.xml") as handle:
+            events = etree.iterparse(
+                handle, events=("start", "end"), tag=(_W + "p", _W + "tbl"),
+                resolve_entities=False, no_network=True, huge_tree=True,
+            )
+            for event, element in events:
+                if element.tag == _W + "tbl":
+                    depth += 1 if event == "start" else -1
+                    if event == "start" or depth:
+                        continue
+                    block = ("table", self._table(element))
+                elif event == "start" or depth:
+                    # Table cells are rendered with their table
+                    continue
+                else:
+                    block = self._paragraph(element)
+                # Written out, so drop the element and everything parsed before it
+                element.clear(keep_tail=True)
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+                if block is not None and block[1]:
+                    yield block
+
+    def _paragraph(self, paragraph):
+        text = self._inline(paragraph).strip()
+        if not text:
+            return None
+        properties = paragraph.find(_W + "pPr")
+        style = properties.find(_W + "pStyle") if properties is not None else None
+        level, num_id, ilvl = self.styles.get(style.get(_W + "val") if style is not None else None, (None, None, None))
+        own_num_id, own_ilvl = self._numbering_of(properties)
+        num_id = own_num_id or num_id
+        ilvl = own_ilvl or ilvl or "0"
+
+        if level:
+            return "heading", "#" * level + " " + text
+        if num_id and num_id != "0":
+            ordered = self.formats.get((num_id, ilvl), False)
+            depth = int(ilvl) if ilvl.isdigit() else 0
+            # Restart numbering of deeper levels when a shallower item appears
+            for key in [key for key in self.counters if key[0] == num_id and key[1] > depth]:
+                del self.counters[key]
+            count = self.counters.get((num_id, depth), 0) + 1
+            self.counters[(num_id, depth)] = count
+            marker = f"{count}." if ordered else "*"
+            return f"item:{num_id}", "    " * depth + f"{marker} {text}"
+        return "paragraph", text
+
+    def _table(self, table):
+        rows = []
+        for row in table.iter(_W + "tr"):
+            cells = []
+            for cell in row.findall(_W + "tc"):
+                texts = (self._inline(paragraph).strip() for paragraph in cell.iter(_W + "p"))
+                cells.append(" ".join(text for text in texts if text))
+            rows.append(cells)
+        return markdown_table(rows)
+
+    def _inline(self, paragraph):
+        """
+        Render a paragraph's runs, merging neighbouring runs with the same formatting.
+        """
+        spans = []
+        self._collect(paragraph, spans, None)
+        parts = []
+        for bold, italic, link, text in _merge_spans(spans):
+            parts.append(_decorate(text, bold, italic, link))
+        return "".join(parts)
+
+    def _collect(self, element, spans, link):
+        for child in element:
+            tag = child.tag
+            if tag == _W + "r":
+                self._run(child, spans, link)
+            elif tag == _W + "hyperlink":
+                rel = self.rels.get(child.get(_R + "id"))
+                self._collect(child, spans, rel[1] if rel else link)
+            elif tag in (_W + "ins", _W + "smartTag", _W + "sdt", _W + "sdtContent", _W + "fldSimple", _W + "customXml"):
+                self._collect(child, spans, link)
+            elif tag == _MC + "AlternateContent":
+                choice = child.find(_MC + "Choice")
+                if choice is not None:
+                    self._collect(choice, spans, link)
+
+    def _run(self, run, spans, link):
+        properties = run.find(_W + "rPr")
+        bold = _flag(properties, _W + "b")
+        italic = _flag(properties, _W + "i")
+        for child in run:
+            tag = child.tag
+            if tag == _W + "t":
+                spans.append((bold, italic, link, child.text or ""))
+            elif tag == _W + "tab":
+                spans.append((bold, italic, link, "\t"))
+            elif tag in (_W + "br", _W + "cr"):
+                spans.append((False, False, None, "\n"))
+            elif tag == _W + "drawing":
+                spans.append((False, False, None, self._drawing(child)))
+
+    def _drawing(self, drawing):
+        blip = next(drawing.iter(_A + "blip"), None)
+        if blip is None:
+            return ""
+        properties = next(drawing.iter(_WP + "docPr"), None)
+        alt = properties.get("descr", "") if properties is not None else ""
+        rel = self.rels.get(blip.get(_R + "embed"))
+        target = rel[1] if rel else None
+        return self.package.image(alt, target, posixpath.basename(target) if target else "image")
+
+
+def _merge_spans(spans):
+    merged = []
+    for bold, italic, link, text in spans:
+        if merged and merged[-1][:3] == (bold, italic, link):
+            merged[-1] = (bold, italic, link, merged[-1][3] + text)
+        else:
+            merged.append((bold, italic, link, text))
+    return merged
+
+
+def _decorate(text, bold, italic, link):
+    core = text.strip()
+    if not core:
+        return text
+    # Emphasis markers must hug the text, so surrounding spaces go outside them
+    leading = text[:len(text) - len(text.lstrip())]
+    trailing = text[len(text.rstrip()):]
+    if italic:
+        core = f"*{core}*"
+    if bold:
+        core = f"**{core}**"
+    if link:
+        core = f"[{core}]({link})"
+    return leading + core + trailing
+
+
+def iter_pptx_markdown(stream, include_media=False):
+    """
+    Yield markdown for a presentation, one slide at a time.
+
+    Only the XML of the slide being converted (and its layout and notes) is
+    parsed, so decks with thousands of slides never sit in memory as a
+    whole. Shapes are read in position order. The title placeholder becomes a
+    heading; tables become markdown tables. Pictures are referenced by name
+    unless ``include_media`` asks for them to be inlined.
+    """
+    package = _Package(stream, include_media)
+    reader = _PptxReader(package)
+    for number, part in enumerate(reader.slide_parts(), start=1):
+        yield reader.slide(number, part)
+
+
+class _PptxReader:
+    def __init__(self, package):
+        self.package = package
+        self._layouts = {}
+
+    def slide_parts(self):
+        presentation = "ppt/presentation.xml"
+        rels = self.package.relationships(presentation)
+        slide_ids = self.package.parse(presentation).find(_P + "sldIdLst")
+        if slide_ids is None:
+            return []
+        return [rels[slide.get(_R + "id")][1] for slide in slide_ids if slide.get(_R + "id") in rels]
+
+    def slide(self, number, part):
+        rels = self.package.relationships(part)
+        root = self.package.parse(part)
+        layout = next((target for kind, target in rels.values() if kind == _SLIDE_LAYOUT), None)
+        positions = self._layout_positions(layout) if layout else {}
+
+        parts = [f"<!-- Slide number: {number} -->"]
+        tree = root.find(f"{_P}cSld/{_P}spTree")
+        if tree is not None:
+            for shape in self._sorted(tree, positions):
+                parts.extend(self._shape(shape, rels, positions))
+
+        notes = next((target for kind, target in rels.values() if kind == _NOTES_SLIDE), None)
+        if notes and self.package.exists(notes):
+            text = self._notes_text(self.package.parse(notes))
+            if text.strip():
+                parts.append("### Notes:\n" + text)
+        return "\n".join(part for part in parts if part) + "\n\n"
+
+    def _layout_positions(self, layout):
+        """
+        Offsets of the layout's placeholders, which slides inherit when a
+        placeholder has no position of its own. Layout placeholders without a
+        position inherit in turn from the slide master.
+        """
+        if layout not in self._layouts:
+            positions = {}
+            if self.package.exists(layout):
+                parts = [layout]
+                master = next(
+                    (target for kind, target in self.package.relationships(layout).values() if kind == _SLIDE_MASTER),
+                    None,
+                )
+                if master and self.package.exists(master):
+                    parts.append(master)
+                for part in parts:
+                    for shape in self.package.parse(part).iter(_P + "sp"):
+                        placeholder = _placeholder(shape)
+                        offset = _offset(shape)
+                        if placeholder is None or offset is None:
+                            continue
+                        if part == layout:
+                            positions.setdefault(("idx", placeholder.get("idx", "0")), offset)
+                        positions.setdefault(("type", placeholder.get("type", "body")), offset)
+            self._layouts[layout] = positions
+        return self._layouts[layout]
+
+    def _position(self, shape, positions):
+        offset = _offset(shape)
+        if offset is None:
+            placeholder = _placeholder(shape)
+            if placeholder is not None:
+                kind = placeholder.get("type", "body")
+                offset = (
+                    positions.get(("idx", placeholder.get("idx", "0")))
+                    or positions.get(("type", kind))
+                    or positions.get(("type", "title" if kind == "ctrTitle" else "body"))
+                )
+        if offset is None:
+            return (float("-inf"), float("-inf"))
+        return (offset[1], offset[0])
+
+    def _sorted(self, tree, positions):
+        shapes = [child for child in tree if child.tag in (_P + "sp", _P + "pic", _P + "graphicFrame", _P + "grpSp")]
+        return sorted(shapes, key=lambda shape: self._position(shape, positions))
+
+    def _shape(self, shape, rels, positions):
+        if shape.tag == _P + "grpSp":
+            parts = []
+            for child in self._sorted(shape, positions):
+                parts.extend(self._shape(child, rels, positions))
+            return parts
+        if shape.tag == _P + "graphicFrame":
+            table = next(shape.iter(_A + "tbl"), None)
+            if table is None:
+                return []
+            rows = [[_text_body(cell) for cell in row.findall(_A + "tc")] for row in table.iter(_A + "tr")]
+            return [markdown_table(rows)]
+        if shape.tag == _P + "pic":
+            properties = next(shape.iter(_P + "cNvPr"), None)
+            name = properties.get("name", "") if properties is not None else ""
+            alt = properties.get("descr", "") if properties is not None else ""
+            blip = next(shape.iter(_A + "blip"), None)
+            rel = rels.get(blip.get(_R + "embed")) if blip is not None else None
+            return [self.package.image(alt, rel[1] if rel else None, name.replace(" ", "") + ".jpg")]
+        body = shape.find(_P + "txBody")
+        if body is None:
+            return []
+        text = _text_body(body)
+        placeholder = _placeholder(shape)
+        if placeholder is not None and placeholder.get("type") in ("title", "ctrTitle"):
+            return ["# " + text.lstrip()] if text.strip() else []
+        return [text]
+
+    @staticmethod
+    def _notes_text(notes):
+        for shape in notes.iter(_P + "sp"):
+            placeholder = _placeholder(shape)
+            body = shape.find(_P + "txBody")
+            if placeholder is not None and placeholder.get("type") == "body" and body is not None:
+                return _text_body(body)
+        return ""
+
+
+def _placeholder(shape):
+    return next(shape.iter(_P + "ph"), None)
+
+
+def _offset(shape):
+    for transform in (f"{_P}spPr/{_A}xfrm", f"{_P}xfrm", f"{_P}grpSpPr/{_A}xfrm"):
+        offset = shape.find(f"{transform}/{_A}off")
+        if offset is not None:
+            return (int(offset.get("x", 0)), int(offset.get("y", 0)))
+    return None
+
+
+def _text_body(body):
+    """
+    The text of a DrawingML text body: paragraphs on separate lines.
+    """
+    paragraphs = []
+    for paragraph in body.iter(_A + "p"):
+        pieces = []
+        for child in paragraph:
+            if child.tag in (_A + "r", _A + "fld"):
+                text = child.find(_A + "t")
+                pieces.append((text.text or "") if text is not None else "")
+            elif child.tag == _A + "br":
+                pieces.append("\n")
+        paragraphs.append("".join(pieces))
+    return "\n".join(paragraphs)
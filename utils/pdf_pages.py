@@ -0,0 +1,190 @@
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.jobs import report_progress
+from utils.metrics import record_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_PAGES = 8
+
+_RANGE = re.compile(r"^(\d*)\s*-\s*(\d*)$")
+
+
+class PageRangeError(ValueError):
+    """
+    Raised for a malformed page range or one outside the document.
+    """
+
+
+def parse_page_ranges(spec, page_count):
+    """
+    Turn a 1-based page range string such as ``"1-3,7,10-"`` into sorted,
+    de-duplicated 0-based page indexes. Open ranges run to the first or last
+    page.
+    """
+    indexes = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = _RANGE.match(part)
+        if match:
+            first = int(match.group(1)) if match.group(1) else 1
+            last = int(match.group(2)) if match.group(2) else page_count
+        elif part.isdigit():
+            first = last = int(part)
+        else:
+            raise PageRangeError(f"Invalid page range: {part!r}")
+        if first < 1 or first > last:
+            raise PageRangeError(f"Invalid page range: {part!r}")
+        if first > page_count:
+            raise PageRangeError(f"Page {first} is beyond the last page ({page_count})")
+        indexes.update(range(first - 1, min(last, page_count)))
+    if not indexes:
+        raise PageRangeError("No pages selected")
+    return sorted(indexes)
+
+
+def count_pages(fp):
+    """
+    Return the number of pages in an open binary PDF file, reading only the
+    document catalogue when the page tree declares its size.
+    """
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+
+    position = fp.tell()
+    try:
+        document = PDFDocument(PDFParser(fp))
+        try:
+            count = resolve1(resolve1(document.catalog["Pages"])["Count"])
+            if isinstance(count, int) and count >= 0:
+                return count
+        except (KeyError, TypeError):
+            pass
+        return sum(1 for _ in PDFPage.create_pages(document))
+    finally:
+        fp.seek(position)
+
+
+def iter_page_texts(fp, indexes=None):
+    """
+    Yield ``(index, text)`` for each page of an open PDF, or only for the
+    0-based ``indexes`` given. Unselected pages are skipped without layout
+    analysis, and selected pages the document does not have (its declared
+    page count can overstate them) are not yielded.
+    """
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    wanted = set(indexes) if indexes is not None else None
+    last = max(wanted, default=-1) if wanted is not None else None
+    resources = PDFResourceManager()
+    for index, page in enumerate(PDFPage.create_pages(PDFDocument(PDFParser(fp)))):
+        if wanted is not None:
+            if index > last:
+                break
+            if index not in wanted:
+                continue
+        output = io.StringIO()
+        device = TextConverter(resources, output, laparams=LAParams())
+        try:
+            PDFPageInterpreter(resources, device).process_page(page)
+        finally:
+            device.close()
+        # pdfminer ends every page with a form feed; page boundaries are marked separately
+        yield index, output.getvalue().replace("\x0c", "")
+
+
+def extract_pages(source, indexes):
+    """
+    Return the text of the given pages, in order, from a PDF path or bytes.
+    Pages missing from the document come back empty.
+
+    Module-level so it can run in a worker process.
+    """
+    handle = open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+    with handle:
+        texts = dict(iter_page_texts(handle, indexes))
+    if len(texts) < len(indexes):
+        logger.warning("PDF has %d of %d selected pages", len(texts), len(indexes))
+    return [texts.get(index, "") for index in indexes]
+
+
+def page_markdown(index, text):
+    return f"<!-- Page number: {index + 1} -->\n{text.strip()}\n"
+
+
+def convert_pages(source, indexes, run=None, cache=None, page_key=None, chunk_pages=DEFAULT_CHUNK_PAGES, workers=1):
+    """
+    Convert the selected PDF pages and stitch them back in page order.
+
+    Pages already in ``cache`` (looked up by ``page_key(index)``) are reused.
+    The rest are split into chunks of ``chunk_pages``, and up to ``workers``
+    chunks run at once through ``run(extract_pages, source, chunk)``, for
+    example ``ProcessPool.run``. Without ``run`` they are converted in this
+    thread. Returns the markdown and the number of pages served from cache.
+    """
+    texts = {}
+    if cache is not None and page_key is not None:
+        for index in indexes:
+            cached = cache.get(page_key(index))
+            if cached is not None:
+                texts[index] = cached
+    cached_count = len(texts)
+    missing = [index for index in indexes if index not in texts]
+    chunks = [missing[start:start + chunk_pages] for start in range(0, len(missing), chunk_pages)]
+
+    def convert_chunk(chunk):
+        if run is None:
+            return chunk, extract_pages(source, chunk)
+        return chunk, run(extract_pages, source, chunk)
+
+    def store(results):
+        # Results arrive in chunk order on this thread, so progress goes to the job running here
+        for chunk, chunk_texts in results:
+            for index, text in zip(chunk, chunk_texts):
+                texts[index] = text
+                if cache is not None and page_key is not None:
+                    cache.set(page_key(index), text)
+            report_progress(len(texts), len(indexes))
+
+    if len(chunks) > 1 and run is not None and workers > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            store(executor.map(convert_chunk, chunks))
+    else:
+        store(convert_chunk(chunk) for chunk in chunks)
+
+    record_pdf_pages(cached_count, len(missing))
+    logger.debug(
+        "Converted %d PDF pages in %d chunks, %d from cache", len(missing), len(chunks), cached_count
+    )
+    return "\n".join(page_markdown(index, texts[index]) for index in indexes), cached_count
+
+
+def source_for(stream):
+    """
+    Return ``(source, cleanup)`` for a PDF upload: its bytes when in memory,
+    otherwise the path of a named copy that worker processes can open.
+    """
+    if isinstance(stream, io.BytesIO):
+        return stream.getvalue(), lambda: None
+    position = stream.tell()
+    stream.seek(0)
+    handle = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    with handle:
+        shutil.copyfileobj(stream, handle)
+    stream.seek(position)
+    return handle.name, lambda: os.unlink(handle.name)
@@ -0,0 +1,291 @@
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+from utils.logs import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+DEFAULT_TIMEOUT = 120
+DEFAULT_MAX_TASKS_PER_CHILD = 100
+DEFAULT_START_METHOD = "spawn"
+
+
+class ConversionTimeout(Exception):
+    """
+    Raised when a conversion exceeds the pool's wall-clock timeout.
+    """
+
+
+class WorkerCrashed(Exception):
+    """
+    Raised when a worker process exits in the middle of a conversion.
+    """
+
+
+def _worker_main(conn, warm):
+    """
+    Worker process loop: run ``(fn, args)`` tasks until told to stop.
+    """
+    # Spawned workers start without the parent's logging set-up
+    configure_logging()
+    if warm:
+        from utils.converter import warm_up
+
+        warm_up()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        try:
+            conn.send(("ok", fn(*args)))
+        except Exception as e:
+            conn.send(("error", _portable(e)))
+    conn.close()
+
+
+def _portable(error):
+    """
+    Return ``error`` if it survives pickling, so the parent can re-raise the
+    same type, or a plain ``Exception`` with its message otherwise.
+    """
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return Exception(str(error))
+
+
+def _convert_bytes(data, filename, image_mode=None):
+    from utils.converter import convert_stream_to_markdown
+
+    return convert_stream_to_markdown(io.BytesIO(data), filename, image_mode=image_mode)
+
+
+def _convert_path(path, image_mode=None):
+    from utils.converter import convert_to_markdown
+
+    return convert_to_markdown(path, image_mode=image_mode)
+
+
+class _Worker:
+    def __init__(self, context, warm):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, warm), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ProcessPool:
+    """
+    Pool of pre-warmed conversion processes.
+
+    Each call is dispatched to an idle worker and waited on for at most
+    ``timeout`` seconds. A worker that times out is killed and replaced, and
+    workers are recycled after ``max_tasks_per_child`` conversions to contain
+    memory growth in the parsing libraries. Workers are started by
+    ``start()`` or on demand, up to ``processes`` at a time.
+    """
+
+    def __init__(
+        self,
+        processes=DEFAULT_PROCESSES,
+        timeout=DEFAULT_TIMEOUT,
+        max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD,
+        start_method=DEFAULT_START_METHOD,
+        warm=True,
+    ):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.warm = warm
+        self._context = multiprocessing.get_context(start_method)
+        self._slots = threading.BoundedSemaphore(processes)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "started": 0,
+            "recycled": 0,
+            "timeouts": 0,
+            "crashes": 0,
+            "completed": 0,
+            "failed": 0,
+            "busy": 0,
+            "busy_seconds": 0.0,
+        }
+        self._created_at = time.monotonic()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a pool configured from FILE2MD_POOL_* environment variables.
+        """
+        return cls(
+            processes=int(os.getenv("FILE2MD_POOL_PROCESSES", DEFAULT_PROCESSES)),
+            timeout=float(os.getenv("FILE2MD_POOL_TIMEOUT", DEFAULT_TIMEOUT)),
+            max_tasks_per_child=int(
+                os.getenv("FILE2MD_POOL_MAX_TASKS_PER_CHILD", DEFAULT_MAX_TASKS_PER_CHILD)
+            ),
+            start_method=os.getenv("FILE2MD_POOL_START_METHOD", DEFAULT_START_METHOD),
+        )
+
+    def start(self):
+        """
+        Spawn and warm every worker ahead of the first conversion.
+        """
+        with self._lock:
+            missing = self.processes - len(self._idle) - self._stats["busy"]
+            self._stats["started"] += max(missing, 0)
+        workers = [_Worker(self._context, self.warm) for _ in range(max(missing, 0))]
+        with self._lock:
+            self._idle.extend(workers)
+
+    def run(self, fn, *args):
+        """
+        Run ``fn(*args)`` in a worker process and return its result.
+
+        ``fn`` must be a picklable, module-level function.
+        """
+        self._slots.acquire()
+        worker = None
+        try:
+            worker = self._acquire_worker()
+            started = time.monotonic()
+            with self._lock:
+                self._stats["busy"] += 1
+            try:
+                status, value = self._dispatch(worker, fn, args)
+            except Exception:
+                if worker.process.is_alive():
+                    worker.stop()
+                worker = None
+                raise
+            finally:
+                with self._lock:
+                    self._stats["busy"] -= 1
+                    self._stats["busy_seconds"] += time.monotonic() - started
+            worker.tasks += 1
+            with self._lock:
+                self._stats["completed" if status == "ok" else "failed"] += 1
+            if status != "ok":
+                # The worker's exception, so callers handle it as they would in-process
+                raise value
+            return value
+        finally:
+            self._release_worker(worker)
+            self._slots.release()
+
+    def convert_stream(self, stream, filename, image_mode=None):
+        """
+        Convert an upload stream in a worker process.
+
+        In-memory streams are sent to the worker as bytes; anything else is
+        copied to a named temp file that the worker opens by path.
+        """
+        if isinstance(stream, io.BytesIO):
+            return self.run(_convert_bytes, stream.getvalue(), filename, image_mode)
+        _, extension = os.path.splitext(filename)
+        with tempfile.NamedTemporaryFile(suffix=extension.lower()) as handle:
+            shutil.copyfileobj(stream, handle)
+            handle.flush()
+            return self.convert_path(handle.name, image_mode)
+
+    def convert_path(self, path, image_mode=None):
+        """
+        Convert a file on disk in a worker process.
+        """
+        return self.run(_convert_path, path, image_mode)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        stats["processes"] = self.processes
+        stats["utilisation"] = stats["busy"] / self.processes if self.processes else 0.0
+        uptime = (time.monotonic() - self._created_at) * self.processes
+        stats["busy_ratio"] = stats["busy_seconds"] / uptime if uptime else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.stop()
+
+    def _acquire_worker(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Process pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            self._stats["started"] += 1
+        return _Worker(self._context, self.warm)
+
+    def _release_worker(self, worker):
+        if worker is None:
+            return
+        if worker.tasks >= self.max_tasks_per_child:
+            with self._lock:
+                self._stats["recycled"] += 1
+            worker.stop()
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def _dispatch(self, worker, fn, args):
+        try:
+            worker.conn.send((fn, args))
+            if not worker.conn.poll(self.timeout or None):
+                logger.error(
+                    "Conversion timed out after %s s, killing worker %s",
+                    self.timeout,
+                    worker.process.pid,
+                )
+                worker.kill()
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise ConversionTimeout(
+                    f"Conversion timed out after {self.timeout:g} seconds"
+                )
+            return worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker.kill()
+            with self._lock:
+                self._stats["crashes"] += 1
+            raise WorkerCrashed(f"Conversion worker exited unexpectedly: {str(e)}")
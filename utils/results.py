@@ -0,0 +1,363 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from utils.uploads import parse_size
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MIN_BYTES = 64 * 1024
+DEFAULT_CHUNK_BYTES = 8 * 1024
+MIN_CHUNK_BYTES = 256
+MAX_CHUNK_BYTES = 1024 * 1024
+SWEEP_INTERVAL = 60
+# A temp directory this old was left by a writer that died before renaming it
+STALE_TEMP_SECONDS = 3600
+_TEMP_PREFIX = ".tmp-"
+
+_HEADING = re.compile(rb"(#{1,6})[ \t]+(.*?)[ \t]*#*[ \t]*$")
+_MARKER = re.compile(rb"<!-- (Page|Slide) number: (\d+) -->\s*$")
+_FENCE = re.compile(rb"[ \t]{0,3}(```|~~~)")
+
+
+class ResultStoreError(Exception):
+    """
+    Raised for a section or chunking request that does not fit the stored result.
+    """
+
+
+class ResultNotFound(ResultStoreError):
+    """
+    Raised for an unknown or expired result id.
+    """
+
+
+def _lines(handle):
+    """
+    Yield ``(offset, line, fenced, section)`` for each line of a markdown file.
+
+    ``fenced`` is true inside code fences, where nothing counts as a heading.
+    ``section`` is ``(kind, level, title)`` for a heading or a page or slide
+    marker, with markers ranked above every heading.
+    """
+    offset = 0
+    fence = None
+    for line in handle:
+        fenced = fence is not None
+        opening = _FENCE.match(line)
+        if opening and (fence is None or opening.group(1) == fence):
+            fence = None if fenced else opening.group(1)
+            fenced = True
+        section = None
+        if not fenced:
+            marker = _MARKER.match(line)
+            heading = _HEADING.match(line.rstrip(b"\r\n"))
+            if marker:
+                kind = marker.group(1).decode("ascii").lower()
+                section = kind, 0, f"{marker.group(1).decode('ascii')} {int(marker.group(2))}"
+            elif heading:
+                section = "heading", len(heading.group(1)), heading.group(2).decode("utf-8", "replace")
+        yield offset, line, fenced, section
+        offset += len(line)
+
+
+def build_index(handle):
+    """
+    Return the sections of a markdown file as dicts with their byte range.
+
+    A heading's section runs until the next heading of the same or a higher
+    level; page and slide markers open sections that end at the next marker.
+    """
+    sections = []
+    open_sections = []
+    size = 0
+    for offset, line, _, section in _lines(handle):
+        size = offset + len(line)
+        if section is None:
+            continue
+        kind, level, title = section
+        while open_sections and open_sections[-1]["level"] >= level:
+            open_sections.pop()["end"] = offset
+        entry = {"id": len(sections), "kind": kind, "level": level, "title": title, "start": offset, "end": None}
+        sections.append(entry)
+        open_sections.append(entry)
+    for entry in open_sections:
+        entry["end"] = size
+    return sections
+
+
+class StoredResult:
+    def __init__(self, result_id, path, size, sections):
+        self.id = result_id
+        self.path = path
+        self.size = size
+        self.sections = sections
+
+    @property
+    def data_path(self):
+        return os.path.join(self.path, "result.md")
+
+    def toc(self):
+        return {
+            "result_id": self.id,
+            "bytes": self.size,
+            "sections": [dict(section, bytes=section["end"] - section["start"]) for section in self.sections],
+        }
+
+    def read(self, start, end):
+        with open(self.data_path, "rb") as handle:
+            handle.seek(start)
+            return handle.read(end - start)
+
+    def section(self, section_id):
+        """
+        Return the markdown of section ``section_id`` including its subsections.
+        """
+        if not 0 <= section_id < len(self.sections):
+            raise ResultNotFound("Section not found")
+        section = self.sections[section_id]
+        return self.read(section["start"], section["end"]).decode("utf-8")
+
+    def chunks(self, max_bytes=DEFAULT_CHUNK_BYTES, include_text=False):
+        """
+        Split the result into consecutive chunks of at most ``max_bytes``.
+
+        Chunks cover the document without gaps or overlap. They break at
+        paragraph boundaries, and at a heading or page once the current chunk
+        holds a quarter of ``max_bytes``; only a paragraph that is too long on
+        its own is split between lines, or inside a line. Ids are derived
+        from the result id and the byte range, so the same document chunked
+        with the same size always yields the same ids.
+        """
+        if not MIN_CHUNK_BYTES <= max_bytes <= MAX_CHUNK_BYTES:
+            raise ResultStoreError(f"max_bytes must be between {MIN_CHUNK_BYTES} and {MAX_CHUNK_BYTES}")
+        chunks = []
+        starts = [section["start"] for section in self.sections]
+        start = 0
+        end = 0
+        with open(self.data_path, "rb") as handle:
+            for piece_start, piece_end, opens_section in _pieces(handle, max_bytes):
+                full = piece_end - start > max_bytes
+                if end > start and (full or (opens_section and end - start >= max_bytes // 4)):
+                    chunks.append(self._chunk(len(chunks), start, end, starts))
+                    start = piece_start
+                end = piece_end
+            if end > start:
+                chunks.append(self._chunk(len(chunks), start, end, starts))
+            if include_text:
+                for chunk in chunks:
+                    handle.seek(chunk["start"])
+                    chunk["markdown"] = handle.read(chunk["bytes"]).decode("utf-8")
+        return chunks
+
+    def _chunk(self, index, start, end, starts):
+        # Sections are listed in document order, so the last one starting at or before the chunk holds it
+        section = bisect.bisect_right(starts, start) - 1
+        return {
+            "id": hashlib.sha256(f"{self.id}:{start}:{end}".encode("ascii")).hexdigest()[:16],
+            "index": index,
+            "start": start,
+            "end": end,
+            "bytes": end - start,
+            "section": section if section >= 0 else None,
+        }
+
+
+def _pieces(handle, max_bytes):
+    """
+    Yield ``(start, end, opens_section)`` for the paragraphs of a markdown
+    file, split further wherever one exceeds ``max_bytes``.
+
+    A paragraph runs up to and including the blank lines after it; code
+    fences are kept whole unless they are too long.
+    """
+    block = []
+    opens = False
+    after_blank = False
+    for offset, line, fenced, section in _lines(handle):
+        blank = not line.strip()
+        if block and (section is not None or (after_blank and not blank)):
+            yield from _split(block, opens, max_bytes)
+            block = []
+        if not block:
+            opens = section is not None
+        block.append((offset, line))
+        # Blank lines inside a code fence do not end a paragraph
+        after_blank = blank and not fenced
+    if block:
+        yield from _split(block, opens, max_bytes)
+
+
+def _split(block, opens, max_bytes):
+    start = block[0][0]
+    end = block[-1][0] + len(block[-1][1])
+    if end - start <= max_bytes:
+        yield start, end, opens
+        return
+    for offset, line in block:
+        if len(line) <= max_bytes:
+            yield offset, offset + len(line), opens
+        else:
+            position = 0
+            while position < len(line):
+                cut = min(position + max_bytes, len(line))
+                # Never cut inside a multi-byte UTF-8 character
+                while cut < len(line) and line[cut] & 0xC0 == 0x80:
+                    cut -= 1
+                yield offset + position, offset + cut, opens and position == 0
+                position = cut
+        opens = False
+
+
+class ResultStore:
+    """
+    Converted markdown kept on disk with a section index, for partial retrieval.
+
+    Results are content-addressed: the id is the SHA-256 of the markdown, so
+    storing the same output twice is a no-op and ids stay valid across
+    reconversions and server processes sharing ``root``. Each result is a
+    directory with the markdown and a JSON index of its headings, pages and
+    slides. Results unread for ``ttl`` seconds are removed, and the least
+    recently read go first once the store holds more than ``max_bytes``.
+    Results under ``min_bytes`` are not stored: they are cheap to fetch
+    whole, and writing them would put disk I/O on every small conversion.
+    ``max_bytes=0`` disables the store.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, min_bytes=DEFAULT_MIN_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.min_bytes = min_bytes
+        self._last_sweep = 0.0
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Read FILE2MD_RESULT_DIR, FILE2MD_RESULT_MAX_BYTES, FILE2MD_RESULT_TTL
+        and FILE2MD_RESULT_MIN_BYTES.
+        """
+        return cls(
+            root=os.getenv("FILE2MD_RESULT_DIR") or os.path.join(tempfile.gettempdir(), "file2md-results"),
+            max_bytes=parse_size(os.getenv("FILE2MD_RESULT_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            ttl=float(os.getenv("FILE2MD_RESULT_TTL", DEFAULT_TTL)),
+            min_bytes=parse_size(os.getenv("FILE2MD_RESULT_MIN_BYTES", DEFAULT_MIN_BYTES)),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def save(self, markdown):
+        """
+        Store ``markdown`` and return its result id, or ``None`` when it is too
+        small to store or does not fit.
+        """
+        data = markdown.encode("utf-8")
+        if not self.enabled or not self.min_bytes <= len(data) <= self.max_bytes:
+            return None
+        result_id = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.root, result_id)
+        try:
+            os.utime(os.path.join(path, "index.json"), None)
+            return result_id
+        except OSError:
+            pass
+
+        temp_path = tempfile.mkdtemp(dir=self.root, prefix=_TEMP_PREFIX)
+        try:
+            with open(os.path.join(temp_path, "result.md"), "wb") as handle:
+                handle.write(data)
+            with open(os.path.join(temp_path, "result.md"), "rb") as handle:
+                sections = build_index(handle)
+            with open(os.path.join(temp_path, "index.json"), "w", encoding="utf-8") as handle:
+                json.dump({"bytes": len(data), "sections": sections}, handle)
+            try:
+                os.rename(temp_path, path)
+            except OSError:
+                # Another process stored the same result first
+                shutil.rmtree(temp_path, ignore_errors=True)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+        self._maybe_sweep()
+        return result_id
+
+    def get(self, result_id):
+        """
+        Return the ``StoredResult`` for ``result_id`` or raise ``ResultNotFound``.
+        """
+        path = self._result_path(result_id)
+        if path is None:
+            raise ResultNotFound("Result not found")
+        index_path = os.path.join(path, "index.json")
+        try:
+            if self.ttl and os.path.getmtime(index_path) < time.time() - self.ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                raise ResultNotFound("Result not found")
+            with open(index_path, encoding="utf-8") as handle:
+                index = json.load(handle)
+            # Reading a result counts as use for expiry and eviction
+            os.utime(index_path, None)
+        except (OSError, ValueError):
+            raise ResultNotFound("Result not found")
+        self._maybe_sweep()
+        return StoredResult(result_id, path, index["bytes"], index["sections"])
+
+    def _result_path(self, result_id):
+        # Result ids are SHA-256 hex digests; anything else must not become a path
+        if not self.enabled or len(result_id) != 64 or any(char not in "0123456789abcdef" for char in result_id):
+            return None
+        return os.path.join(self.root, result_id)
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = time.time()
+        cutoff = time.time() - self.ttl if self.ttl else None
+        results = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            path = self._result_path(name)
+            if path is None:
+                if name.startswith(_TEMP_PREFIX):
+                    self._sweep_temp(os.path.join(self.root, name))
+                continue
+            try:
+                used = os.path.getmtime(os.path.join(path, "index.json"))
+                size = os.path.getsize(os.path.join(path, "result.md"))
+            except OSError:
+                continue
+            if cutoff is not None and used < cutoff:
+                logger.debug("Removing expired result %s", name)
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            results.append((used, size, path))
+        total = sum(size for _, size, _ in results)
+        for _, size, path in sorted(results):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def _sweep_temp(self, path):
+        try:
+            if os.path.getmtime(path) >= time.time() - STALE_TEMP_SECONDS:
+                return
+        except OSError:
+            return
+        logger.debug("Removing abandoned result directory %s", path)
+        shutil.rmtree(path, ignore_errors=True)
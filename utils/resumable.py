@@ -0,0 +1,253 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from utils.uploads import parse_size
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_SESSION_TTL = 24 * 3600
+SWEEP_INTERVAL = 60
+
+_COPY_BUFFER = 1024 * 1024
+
+
+class UploadSessionError(Exception):
+    """
+    Raised for a chunk or session request that does not fit the session.
+    """
+
+
+class UploadNotFound(UploadSessionError):
+    """
+    Raised for an unknown or expired upload id.
+    """
+
+
+class UploadIncomplete(UploadSessionError):
+    """
+    Raised when an upload is completed before every chunk has arrived.
+    """
+
+    def __init__(self, missing):
+        self.missing = missing
+        super().__init__(f"{len(missing)} chunks have not been received")
+
+
+class UploadSession:
+    def __init__(self, upload_id, filename, size, chunk_size, created_at, path):
+        self.id = upload_id
+        self.filename = filename
+        self.size = size
+        self.chunk_size = chunk_size
+        self.created_at = created_at
+        self.path = path
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    @property
+    def data_path(self):
+        return os.path.join(self.path, "data")
+
+    def chunk_length(self, index):
+        if index == self.chunk_count - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    def received(self):
+        """
+        Return the sorted indexes of chunks that have been written in full.
+        """
+        try:
+            names = os.listdir(os.path.join(self.path, "chunks"))
+        except OSError:
+            return []
+        return sorted(int(name) for name in names if name.isdigit())
+
+    def to_dict(self):
+        received = self.received()
+        missing = sorted(set(range(self.chunk_count)) - set(received))
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "chunks": self.chunk_count,
+            "received": received,
+            "received_bytes": sum(self.chunk_length(index) for index in received),
+            "next_chunk": missing[0] if missing else None,
+            "complete": not missing,
+            "created_at": self.created_at,
+        }
+
+
+class UploadSessions:
+    """
+    Chunked, resumable uploads assembled in place on disk.
+
+    A session preallocates a file of the declared size. Each chunk is
+    written straight to its offset, so chunks may arrive in any order and in
+    parallel, and "assembly" is a no-op. A chunk counts as received once it
+    has been written in full, marked by an empty file named after its index.
+    Because all state lives under ``root``, any server process sharing the
+    directory can accept chunks for any session, and a client can resume by
+    asking which chunks are still missing. Sessions not completed within
+    ``ttl`` seconds are deleted.
+    """
+
+    def __init__(self, root, chunk_size=DEFAULT_CHUNK_SIZE, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_SESSION_TTL):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._last_sweep = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Read FILE2MD_UPLOAD_DIR, FILE2MD_UPLOAD_CHUNK_BYTES, FILE2MD_CHUNKED_MAX_BYTES
+        and FILE2MD_UPLOAD_SESSION_TTL.
+        """
+        return cls(
+            root=os.getenv("FILE2MD_UPLOAD_DIR") or os.path.join(tempfile.gettempdir(), "file2md-uploads"),
+            chunk_size=parse_size(os.getenv("FILE2MD_UPLOAD_CHUNK_BYTES", DEFAULT_CHUNK_SIZE)),
+            max_bytes=parse_size(os.getenv("FILE2MD_CHUNKED_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            ttl=float(os.getenv("FILE2MD_UPLOAD_SESSION_TTL", DEFAULT_SESSION_TTL)),
+        )
+
+    def create(self, filename, size, chunk_size=None):
+        """
+        Start a session for ``size`` bytes and return it.
+        """
+        self._maybe_sweep()
+        chunk_size = chunk_size or self.chunk_size
+        if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            raise UploadSessionError(f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes")
+        if size < 0:
+            raise UploadSessionError("size must not be negative")
+        upload_id = uuid.uuid4().hex
+        session = UploadSession(upload_id, filename, size, chunk_size, time.time(), os.path.join(self.root, upload_id))
+        os.makedirs(os.path.join(session.path, "chunks"))
+        with open(session.data_path, "wb") as handle:
+            handle.truncate(size)
+        self._write_meta(session)
+        return session
+
+    def get(self, upload_id):
+        """
+        Return the session for ``upload_id`` or raise ``UploadNotFound``.
+        """
+        path = self._session_path(upload_id)
+        if path is None:
+            raise UploadNotFound("Upload not found")
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            raise UploadNotFound("Upload not found")
+        session = UploadSession(upload_id, meta["filename"], meta["size"], meta["chunk_size"], meta["created_at"], path)
+        if self.ttl and session.created_at < time.time() - self.ttl:
+            self.discard(upload_id)
+            raise UploadNotFound("Upload not found")
+        return session
+
+    def write_chunk(self, session, index, stream, length, checksum=None):
+        """
+        Copy ``length`` bytes from ``stream`` to chunk ``index`` of the session.
+
+        ``checksum`` is an optional hex SHA-256 of the chunk. The chunk is only
+        marked received once every byte is on disk and the checksum matches.
+        """
+        if not 0 <= index < session.chunk_count:
+            raise UploadSessionError(f"Chunk index must be between 0 and {session.chunk_count - 1}")
+        expected = session.chunk_length(index)
+        if length != expected:
+            raise UploadSessionError(f"Chunk {index} must be {expected} bytes, got {length}")
+        digest = hashlib.sha256()
+        offset = index * session.chunk_size
+        written = 0
+        fd = os.open(session.data_path, os.O_WRONLY)
+        try:
+            while written < expected:
+                block = stream.read(min(_COPY_BUFFER, expected - written))
+                if not block:
+                    break
+                os.pwrite(fd, block, offset + written)
+                digest.update(block)
+                written += len(block)
+        finally:
+            os.close(fd)
+        if written != expected:
+            raise UploadSessionError(f"Chunk {index} ended after {written} of {expected} bytes")
+        if checksum and digest.hexdigest() != checksum.lower():
+            raise UploadSessionError(f"Chunk {index} does not match its checksum")
+        open(os.path.join(session.path, "chunks", str(index)), "wb").close()
+        return session.to_dict()
+
+    def open_data(self, session):
+        """
+        Return the assembled file of a finished upload, open for reading.
+        Raises ``UploadIncomplete`` while chunks are missing.
+
+        The handle stays readable after ``discard`` removes the session, so
+        the file can be handed to a conversion without copying it.
+        """
+        missing = sorted(set(range(session.chunk_count)) - set(session.received()))
+        if missing:
+            raise UploadIncomplete(missing)
+        return open(session.data_path, "rb")
+
+    def discard(self, upload_id):
+        path = self._session_path(upload_id)
+        if path:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _session_path(self, upload_id):
+        # Upload ids are uuid4 hex strings; anything else must not become a path
+        if len(upload_id) != 32 or any(char not in "0123456789abcdef" for char in upload_id):
+            return None
+        return os.path.join(self.root, upload_id)
+
+    def _write_meta(self, session):
+        meta = {
+            "filename": session.filename,
+            "size": session.size,
+            "chunk_size": session.chunk_size,
+            "created_at": session.created_at,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=session.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+        os.replace(temp_path, os.path.join(session.path, "meta.json"))
+
+    def _maybe_sweep(self):
+        if not self.ttl or time.time() - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = time.time()
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            path = self._session_path(name)
+            if path is None:
+                continue
+            try:
+                if os.path.getmtime(os.path.join(path, "meta.json")) < cutoff:
+                    logger.debug("Removing expired upload %s", name)
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
@@ -0,0 +1,284 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.metrics import record_stage, registry
+
+FAST = "fast"
+STANDARD = "standard"
+PRIORITIES = {"low": -1, "normal": 0, "high": 1}
+_PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+DEFAULT_FAST_WORKERS = 2
+DEFAULT_FAST_MAX_COST = 1.0
+DEFAULT_CLIENT_CONCURRENCY = 2
+DEFAULT_CLIENT_QUEUE = 16
+DEFAULT_MAX_WAIT = 60.0
+
+# Rough conversion seconds per MB of input, used to order work and pick a lane
+COST_PER_MB = {
+    ".pdf": 3.0,
+    ".docx": 0.5,
+    ".pptx": 0.5,
+    ".xlsx": 2.0,
+    ".csv": 0.5,
+    ".html": 4.0,
+    ".json": 0.1,
+    ".xml": 0.6,
+    ".png": 0.5,
+    ".jpg": 0.5,
+    ".jpeg": 0.5,
+    ".gif": 0.5,
+    ".wav": 6.0,
+    ".mp3": 60.0,
+}
+DEFAULT_COST_PER_MB = 1.0
+# Fixed cost of any conversion, so empty files still count
+BASE_COST = 0.01
+
+queue_seconds = registry.histogram(
+    "file2md_queue_wait_seconds", "Time conversions waited for a scheduler slot.", ("lane", "priority")
+)
+rejections_total = registry.counter(
+    "file2md_scheduler_rejections_total", "Conversions refused by the scheduler.", ("reason",)
+)
+
+
+def estimate_cost(extension, size):
+    """
+    Estimate the conversion time of ``size`` bytes of ``extension`` in seconds.
+    """
+    per_mb = COST_PER_MB.get(extension.lower(), DEFAULT_COST_PER_MB)
+    return BASE_COST + per_mb * size / (1024 * 1024)
+
+
+class SchedulerFull(Exception):
+    """
+    Raised when a client has too many conversions waiting, or one waited too long.
+    """
+
+
+class _Ticket:
+    def __init__(self, client, cost, priority, lane, tag, sequence, background):
+        self.client = client
+        self.cost = cost
+        self.priority = priority
+        self.lane = lane
+        self.tag = tag
+        self.sequence = sequence
+        self.background = background
+        self.slot = None
+
+    def rank(self):
+        """
+        Order among the tickets of one client: priority first, then arrival.
+        """
+        return -self.priority, self.sequence
+
+
+class Scheduler:
+    """
+    Admission control for conversions, fair between clients.
+
+    Each conversion is costed from its format and size. Conversions costing
+    at most ``fast_max_cost`` go to the fast lane, which has ``fast_workers``
+    slots of its own and may also borrow idle standard slots, so quick HTML
+    or CSV conversions never wait behind a queue of large PDFs. Everything
+    else shares the ``workers`` standard slots.
+
+    Clients take turns by start-time fair queueing over estimated cost: a
+    client's tag advances by the cost of everything it submitted, so a
+    client sending large files falls behind one sending small files instead
+    of starving it. Priority only reorders a client's own waiting
+    conversions, since it comes from the request and would otherwise let any
+    caller jump the queue. A client runs at most
+    ``client_concurrency`` conversions at once and may have at most
+    ``client_queue`` waiting. A request that would exceed that, or that waits
+    longer than ``max_wait`` seconds, gets ``SchedulerFull``. Background
+    work (jobs and batches, already accepted by their own queues) is exempt
+    from both and only waits its turn.
+
+    ``workers=0`` disables scheduling.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        fast_workers=DEFAULT_FAST_WORKERS,
+        fast_max_cost=DEFAULT_FAST_MAX_COST,
+        client_concurrency=DEFAULT_CLIENT_CONCURRENCY,
+        client_queue=DEFAULT_CLIENT_QUEUE,
+        max_wait=DEFAULT_MAX_WAIT,
+    ):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.fast_workers = fast_workers
+        self.fast_max_cost = fast_max_cost
+        self.client_concurrency = client_concurrency
+        self.client_queue = client_queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = {FAST: 0, STANDARD: 0}
+        self._client_running = {}
+        self._client_waiting = {}
+        # Start-time fair queueing: the system's virtual time and each client's next start tag
+        self._virtual = 0.0
+        self._client_tags = {}
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a scheduler configured from FILE2MD_SCHEDULER_* environment variables.
+        """
+        workers = os.getenv("FILE2MD_SCHEDULER_WORKERS")
+        return cls(
+            workers=int(workers) if workers else None,
+            fast_workers=int(os.getenv("FILE2MD_SCHEDULER_FAST_WORKERS", DEFAULT_FAST_WORKERS)),
+            fast_max_cost=float(os.getenv("FILE2MD_SCHEDULER_FAST_MAX_COST", DEFAULT_FAST_MAX_COST)),
+            client_concurrency=int(os.getenv("FILE2MD_SCHEDULER_CLIENT_CONCURRENCY", DEFAULT_CLIENT_CONCURRENCY)),
+            client_queue=int(os.getenv("FILE2MD_SCHEDULER_CLIENT_QUEUE", DEFAULT_CLIENT_QUEUE)),
+            max_wait=float(os.getenv("FILE2MD_SCHEDULER_MAX_WAIT", DEFAULT_MAX_WAIT)),
+        )
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    @contextmanager
+    def slot(self, client, extension, size, priority=0, background=False):
+        """
+        Wait for a conversion slot for ``client`` and hold it for the ``with`` block.
+
+        The wait is recorded as the ``queue`` stage, separately from the
+        conversion itself.
+        """
+        ticket = self.acquire(client, extension, size, priority, background)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def acquire(self, client, extension, size, priority=0, background=False):
+        """
+        Wait for a conversion slot and return its ticket, for work that
+        outlives a ``with`` block such as a streamed response. Pass the
+        ticket to ``release`` when done; releasing it again is harmless.
+        """
+        if not self.enabled:
+            return None
+        return self._acquire(client, estimate_cost(extension, size), priority, background)
+
+    def release(self, ticket):
+        if ticket is not None:
+            self._release(ticket)
+
+    def stats(self):
+        with self._cond:
+            waiting = {FAST: 0, STANDARD: 0}
+            for ticket in self._waiting:
+                waiting[ticket.lane] += 1
+            return {
+                "workers": self.workers,
+                "fast_workers": self.fast_workers,
+                "running_fast": self._running[FAST],
+                "running_standard": self._running[STANDARD],
+                "waiting_fast": waiting[FAST],
+                "waiting_standard": waiting[STANDARD],
+                "clients": len(set(self._client_running) | set(self._client_waiting)),
+            }
+
+    def _acquire(self, client, cost, priority, background):
+        started = time.perf_counter()
+        lane = FAST if cost <= self.fast_max_cost else STANDARD
+        with self._cond:
+            if not background and self.client_queue and self._client_waiting.get(client, 0) >= self.client_queue:
+                rejections_total.inc(reason="quota")
+                raise SchedulerFull("Too many conversions queued for this client, try again later")
+            tag = max(self._virtual, self._client_tags.get(client, 0.0))
+            self._client_tags[client] = tag + cost
+            ticket = _Ticket(client, cost, priority, lane, tag, next(self._sequence), background)
+            self._waiting.append(ticket)
+            self._client_waiting[client] = self._client_waiting.get(client, 0) + 1
+            self._dispatch()
+
+            deadline = None if background or not self.max_wait else started + self.max_wait
+            while ticket.slot is None:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._forget_waiting(client)
+                    rejections_total.inc(reason="timeout")
+                    raise SchedulerFull(f"No conversion slot became free within {self.max_wait:g} seconds")
+                self._cond.wait(remaining)
+
+        waited = time.perf_counter() - started
+        record_stage("queue", waited)
+        queue_seconds.observe(waited, lane=lane, priority=_PRIORITY_NAMES.get(priority, priority))
+        return ticket
+
+    def _release(self, ticket):
+        with self._cond:
+            if ticket.slot is None:
+                return
+            self._running[ticket.slot] -= 1
+            ticket.slot = None
+            running = self._client_running[ticket.client] - 1
+            if running:
+                self._client_running[ticket.client] = running
+            else:
+                del self._client_running[ticket.client]
+                if ticket.client not in self._client_waiting and self._client_tags.get(ticket.client, 0.0) <= self._virtual:
+                    # An idle client's tag is behind virtual time and would be replaced by it anyway
+                    self._client_tags.pop(ticket.client, None)
+            self._dispatch()
+
+    def _forget_waiting(self, client):
+        waiting = self._client_waiting[client] - 1
+        if waiting:
+            self._client_waiting[client] = waiting
+        else:
+            del self._client_waiting[client]
+
+    def _free_slot(self, lane):
+        if lane == FAST and self._running[FAST] < self.fast_workers:
+            return FAST
+        if self._running[STANDARD] < self.workers:
+            return STANDARD
+        return None
+
+    def _dispatch(self):
+        """
+        Hand free slots to the best waiting tickets. Called with the lock held.
+        """
+        admitted = False
+        while True:
+            # Per client, the ticket with the earliest tag and the one that should run first
+            earliest = {}
+            first = {}
+            for ticket in self._waiting:
+                if self.client_concurrency and self._client_running.get(ticket.client, 0) >= self.client_concurrency:
+                    continue
+                if self._free_slot(ticket.lane) is None:
+                    continue
+                if ticket.client not in earliest or ticket.tag < earliest[ticket.client].tag:
+                    earliest[ticket.client] = ticket
+                if ticket.client not in first or ticket.rank() < first[ticket.client].rank():
+                    first[ticket.client] = ticket
+            if not earliest:
+                break
+            client = min(earliest, key=lambda name: (earliest[name].tag, earliest[name].sequence))
+            best, turn = first[client], earliest[client]
+            # The client's turn goes to its most urgent ticket, which hands its own tag to the one it overtook
+            best.tag, turn.tag = turn.tag, best.tag
+            best.slot = self._free_slot(best.lane)
+            self._running[best.slot] += 1
+            self._waiting.remove(best)
+            self._forget_waiting(best.client)
+            self._client_running[best.client] = self._client_running.get(best.client, 0) + 1
+            self._virtual = max(self._virtual, best.tag)
+            admitted = True
+        if admitted:
+            self._cond.notify_all()
@@ -0,0 +1,132 @@
+import logging
+import os
+import zipfile
+
+from utils.metrics import record_sniff
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 4096
+
+# What each accepted extension's content must look like
+EXPECTED_KIND = {
+    "pdf": "pdf",
+    "docx": "docx",
+    "pptx": "pptx",
+    "xlsx": "xlsx",
+    "png": "png",
+    "jpg": "jpeg",
+    "jpeg": "jpeg",
+    "gif": "gif",
+    "mp3": "mp3",
+    "wav": "wav",
+    "html": "text",
+    "csv": "text",
+    "json": "text",
+    "xml": "text",
+}
+
+# Part that identifies each Office Open XML format inside its ZIP container
+_OOXML_PARTS = (
+    ("word/document.xml", "docx"),
+    ("ppt/presentation.xml", "pptx"),
+    ("xl/workbook.xml", "xlsx"),
+)
+
+# Bytes a PDF header may follow at the very start of a file: a UTF-8 BOM and whitespace
+_PDF_LEADING = b"\xef\xbb\xbf \t\r\n\f\x00"
+
+# Control bytes that never appear in text files
+_BINARY_BYTES = bytes(set(range(32)) - {8, 9, 10, 12, 13, 27})
+
+
+class ContentMismatch(Exception):
+    """
+    Raised when an upload's content does not match its file extension.
+    """
+
+    def __init__(self, filename, declared, detected):
+        self.filename = filename
+        self.declared = declared
+        self.detected = detected
+        found = f"{detected} content" if detected else "unrecognised content"
+        super().__init__(f"{filename} has a .{declared} extension but contains {found}")
+
+
+def sniff(stream, declared=None):
+    """
+    Identify a binary stream from its leading bytes and, for ZIP files, its
+    member names. Returns a kind such as ``"pdf"``, ``"docx"``, ``"png"`` or
+    ``"text"``, or ``None`` when the content is not recognised.
+
+    A PDF header counts only at the start of the data, unless ``declared``
+    is ``"pdf"``: PDF readers accept one anywhere in the first kilobyte, but
+    a text file that merely mentions one is not a PDF.
+
+    Only the head of the stream and the ZIP central directory are read; the
+    stream position is restored before returning.
+    """
+    position = stream.tell()
+    try:
+        head = stream.read(SNIFF_BYTES)
+        if head[:4] == b"PK\x03\x04" or head[:4] == b"PK\x05\x06":
+            stream.seek(position)
+            return _sniff_zip(stream)
+        return _sniff_head(head, declared)
+    finally:
+        stream.seek(position)
+
+
+def _sniff_head(head, declared=None):
+    if head.lstrip(_PDF_LEADING).startswith(b"%PDF-") or (declared == "pdf" and b"%PDF-" in head[:1024]):
+        return "pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "text"
+    if len(head.translate(None, _BINARY_BYTES)) != len(head):
+        return None
+    return "text"
+
+
+def _sniff_zip(stream):
+    try:
+        names = set(zipfile.ZipFile(stream).namelist())
+    except (zipfile.BadZipFile, OSError, ValueError):
+        return None
+    if "[Content_Types].xml" in names:
+        for part, kind in _OOXML_PARTS:
+            if part in names:
+                return kind
+    return "zip"
+
+
+def check_upload(stream, filename, mode="strict"):
+    """
+    Sniff an upload and compare it with its extension.
+
+    Returns the detected kind. In ``strict`` mode a mismatch raises
+    ``ContentMismatch`` so it can be refused before any parser runs; in
+    ``log`` mode it is only logged and counted. ``off`` skips sniffing.
+    """
+    if mode == "off":
+        return None
+    declared = os.path.splitext(filename)[1].lstrip(".").lower()
+    expected = EXPECTED_KIND.get(declared)
+    detected = sniff(stream, declared)
+    if expected is None or detected == expected:
+        record_sniff(declared, detected, "match")
+        return detected
+    record_sniff(declared, detected, "mismatch")
+    logger.warning("Content mismatch for %s: expected %s, found %s", filename, expected, detected)
+    if mode == "strict":
+        raise ContentMismatch(filename, declared, detected)
+    return detected
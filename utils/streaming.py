@@ -0,0 +1,62 @@
+import io
+import logging
+import os
+
+from utils.converter import convert_stream_to_markdown, iter_ooxml_markdown, markup_limits, transcriber
+from utils.markup import MARKUP_EXTENSIONS, iter_markup_markdown
+from utils.pdf_pages import count_pages, iter_page_texts, parse_page_ranges
+from utils.tables import iter_csv_markdown, iter_xlsx_markdown
+
+logger = logging.getLogger(__name__)
+
+# Formats whose structure (pages, slides, paragraphs, rows, audio chunks, markup elements) lets markdown be produced piecewise
+STREAMED_EXTENSIONS = {".pdf", ".docx", ".pptx", ".xlsx", ".csv", ".wav", ".mp3"} | MARKUP_EXTENSIONS
+
+
+def iter_markdown(stream, filename, pages=None, table_options=None, image_mode=None):
+    """
+    Convert a binary stream to markdown, yielding it one chunk at a time.
+
+    PDFs yield one chunk per page, presentations one per slide and Word
+    documents a run of paragraphs at a time. Workbooks and CSV files yield
+    batches of table rows, audio one partial transcript per chunk of
+    recording, and JSON, XML and HTML a run of elements at a time. Either
+    way, callers can forward output before the whole document has been read. Other formats are
+    converted in one piece. ``pages`` restricts a PDF to a range such as
+    ``"1-3,7"``, ``table_options`` selects spreadsheet rows, sheets and
+    columns, and ``image_mode`` is passed on for images.
+    """
+    _, extension = os.path.splitext(filename)
+    extension = extension.lower()
+    if extension not in STREAMED_EXTENSIONS:
+        yield convert_stream_to_markdown(stream, filename, image_mode=image_mode)
+        return
+
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BytesIO(stream.read())
+    try:
+        if extension == ".pdf":
+            chunks = _iter_pdf_pages(stream, pages)
+        elif extension in (".docx", ".pptx"):
+            chunks = iter_ooxml_markdown(stream, extension)
+        elif extension == ".xlsx":
+            chunks = iter_xlsx_markdown(stream, table_options)
+        elif extension in (".wav", ".mp3"):
+            chunks = transcriber.iter_markdown(stream, extension)
+        elif extension in MARKUP_EXTENSIONS:
+            chunks = iter_markup_markdown(stream, extension, markup_limits)
+        else:
+            chunks = iter_csv_markdown(stream, table_options)
+        for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        logger.error("Error converting file: %s", e)
+        raise Exception(f"Failed to convert file: {str(e)}")
+
+
+def _iter_pdf_pages(stream, pages=None):
+    indexes = None
+    if pages:
+        indexes = parse_page_ranges(pages, count_pages(stream))
+    for _, text in iter_page_texts(stream, indexes):
+        yield text
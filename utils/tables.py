@@ -0,0 +1,248 @@
+import codecs
+import csv
+import io
+import logging
+import os
+
+from utils.jobs import report_progress
+
+logger = logging.getLogger(__name__)
+
+TABULAR_EXTENSIONS = {".csv", ".xlsx"}
+
+# Files from this size are written row by row instead of through the full converter
+STREAM_MIN_BYTES = 8 * 1024 * 1024
+
+# Markdown rows are handed out in batches of this many to keep generator overhead low
+BATCH_ROWS = 500
+
+_SNIFF_ENCODING_BYTES = 64 * 1024
+
+
+class TableOptionError(ValueError):
+    """
+    Raised when a sheet or column selection does not match the document.
+    """
+
+
+class TableOptions:
+    """
+    Row, sheet and column selection for tabular conversions.
+
+    ``sheets`` holds sheet names or 1-based sheet numbers, ``columns`` header
+    names or 1-based column numbers. ``max_rows`` caps the data rows written
+    per sheet, not counting the header.
+    """
+
+    def __init__(self, max_rows=None, sheets=None, columns=None):
+        self.max_rows = max_rows
+        self.sheets = list(sheets) if sheets else None
+        self.columns = list(columns) if columns else None
+
+    @classmethod
+    def parse(cls, max_rows=None, sheets=None, columns=None):
+        """
+        Build options from comma-separated strings such as request parameters.
+        """
+        if max_rows in (None, ""):
+            rows = None
+        else:
+            try:
+                rows = int(max_rows)
+            except ValueError:
+                raise TableOptionError(f"Invalid max_rows: {max_rows!r}")
+            if rows < 0:
+                raise TableOptionError(f"Invalid max_rows: {max_rows!r}")
+        return cls(rows, _split(sheets), _split(columns))
+
+    @property
+    def selective(self):
+        return self.max_rows is not None or bool(self.sheets) or bool(self.columns)
+
+
+def _split(value):
+    if not value:
+        return None
+    return [part.strip() for part in str(value).split(",") if part.strip()]
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    return str(value).replace("|", "\\|").replace("\r\n", " ").replace("\n", " ")
+
+
+def _column_indexes(header, columns):
+    if not columns:
+        return None
+    names = [_cell(value).strip() for value in header]
+    indexes = []
+    for column in columns:
+        if column in names:
+            indexes.append(names.index(column))
+        elif column.isdigit() and 1 <= int(column) <= len(names):
+            indexes.append(int(column) - 1)
+        else:
+            raise TableOptionError(f"Unknown column: {column!r}")
+    return indexes
+
+
+def iter_table_rows(rows, max_rows=None, columns=None, width=None):
+    """
+    Render an iterable of rows as markdown table lines, yielding batches of
+    text as rows arrive. The first non-empty row is the header.
+
+    Only one batch of rows is held at a time. Without knowing every row up
+    front, the table is as wide as ``width`` or the header, and longer rows
+    keep their extra cells.
+    """
+    rows = iter(rows)
+    header = None
+    for row in rows:
+        if any(value is not None and value != "" for value in row):
+            header = list(row)
+            break
+    if header is None:
+        return
+
+    selected = _column_indexes(header, columns)
+
+    def pick(row):
+        if selected is None:
+            return row
+        return [row[index] if index < len(row) else None for index in selected]
+
+    header = pick(header)
+    width = len(header) if selected is not None else max(width or 0, len(header))
+    header = header + [None] * (width - len(header))
+    batch = [
+        "| " + " | ".join(_cell(value) for value in header) + " |",
+        "| " + " | ".join(["---"] * width) + " |",
+    ]
+    written = 0
+    for row in rows:
+        if max_rows is not None and written >= max_rows:
+            batch.append(f"\n*Only the first {max_rows} rows are shown.*")
+            break
+        if not any(value is not None and value != "" for value in row):
+            continue
+        cells = pick(list(row))
+        cells = cells + [None] * (width - len(cells))
+        batch.append("| " + " | ".join(_cell(value) for value in cells) + " |")
+        written += 1
+        if len(batch) >= BATCH_ROWS:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def iter_xlsx_markdown(stream, options=None):
+    """
+    Yield markdown for a workbook one batch of rows at a time, one
+    ``## Sheet`` section per selected sheet, with flat memory use.
+    """
+    import openpyxl
+
+    options = options or TableOptions()
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        sheets = _selected_sheets(workbook, options.sheets)
+        for done, sheet in enumerate(sheets):
+            width = sheet.max_column if isinstance(sheet.max_column, int) else None
+            # The heading rides on the first batch and the blank line on the last,
+            # so a small sheet still comes out as a single chunk
+            heading, pending = f"## {sheet.title}\n", None
+            for text in iter_table_rows(sheet.iter_rows(values_only=True), options.max_rows, options.columns, width):
+                if pending is not None:
+                    yield pending
+                pending, heading = heading + text, ""
+            report_progress(done + 1, len(sheets))
+            yield (pending if pending is not None else heading) + "\n"
+    finally:
+        workbook.close()
+
+
+def _selected_sheets(workbook, sheets):
+    if not sheets:
+        return list(workbook.worksheets)
+    selected = []
+    for name in sheets:
+        if name in workbook.sheetnames:
+            selected.append(workbook[name])
+        elif name.isdigit() and 1 <= int(name) <= len(workbook.worksheets):
+            selected.append(workbook.worksheets[int(name) - 1])
+        else:
+            raise TableOptionError(f"Unknown sheet: {name!r}")
+    return selected
+
+
+def iter_csv_markdown(stream, options=None):
+    """
+    Yield markdown for a CSV file one batch of rows at a time with flat
+    memory use. The encoding is detected from the first 64 KB.
+    """
+    options = options or TableOptions()
+    if options.sheets:
+        raise TableOptionError("CSV files have no sheets to select")
+    start = stream.tell()
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell() - start
+    stream.seek(start)
+    text = io.TextIOWrapper(stream, encoding=detect_encoding(stream), errors="replace", newline="")
+    try:
+        for chunk in iter_table_rows(csv.reader(text), options.max_rows, options.columns):
+            # The wrapper reads ahead, so this is where the reader is in the file to within its buffer
+            report_progress(stream.tell() - start, size)
+            yield chunk
+    finally:
+        # Leave the underlying upload open for the caller
+        text.detach()
+
+
+def detect_encoding(stream):
+    """
+    Guess the text encoding of a binary stream from its first 64 KB, leaving
+    the stream where it was.
+    """
+    position = stream.tell()
+    head = stream.read(_SNIFF_ENCODING_BYTES)
+    stream.seek(position)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        head.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sample boundary is still UTF-8
+        if e.start >= len(head) - 3:
+            return "utf-8"
+    from charset_normalizer import from_bytes
+
+    match = from_bytes(head).best()
+    return match.encoding if match is not None else "utf-8"
+
+
+def iter_table_markdown(stream, filename, options=None):
+    """
+    Stream a ``.csv`` or ``.xlsx`` upload as markdown table text.
+    """
+    _, extension = os.path.splitext(filename)
+    if extension.lower() == ".xlsx":
+        return iter_xlsx_markdown(stream, options)
+    return iter_csv_markdown(stream, options)
+
+
+def write_table_markdown(input_path, output_path, options=None):
+    """
+    Convert a spreadsheet on disk straight into a markdown file, never holding
+    more than one batch of rows. Returns the number of bytes written.
+
+    Module-level so it can run in a worker process.
+    """
+    written = 0
+    with open(input_path, "rb") as source, open(output_path, "w", encoding="utf-8") as target:
+        for chunk in iter_table_markdown(source, input_path, options):
+            target.write(chunk)
+            written += len(chunk.encode("utf-8"))
+    return written
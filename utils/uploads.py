@@ -0,0 +1,152 @@
+import os
+import re
+import threading
+
+DEFAULT_MAX_UPLOAD = 100 * 1024 * 1024
+DEFAULT_INFLIGHT_BYTES = 256 * 1024 * 1024
+
+# Formats whose parsers hold many times the input size in memory get lower caps
+DEFAULT_FORMAT_LIMITS = {
+    "html": 25 * 1024 * 1024,
+    "xml": 25 * 1024 * 1024,
+    "json": 25 * 1024 * 1024,
+    "csv": 50 * 1024 * 1024,
+    "png": 25 * 1024 * 1024,
+    "jpg": 25 * 1024 * 1024,
+    "jpeg": 25 * 1024 * 1024,
+    "gif": 25 * 1024 * 1024,
+}
+
+_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+
+
+class UploadTooLarge(Exception):
+    """
+    Raised when an upload is over the size limit for its format.
+    """
+
+
+def parse_size(value):
+    """
+    Parse a byte size such as ``"1048576"``, ``"512KB"`` or ``"20MB"``.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([a-zA-Z]*)\s*", str(value))
+    if not match or match.group(2).lower() not in _UNITS:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(match.group(1)) * _UNITS[match.group(2).lower()]
+
+
+def format_size(size):
+    for unit, factor in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+        if size >= factor:
+            return f"{size / factor:.0f} {unit}"
+    return f"{size} bytes"
+
+
+class UploadLimits:
+    """
+    Upload size caps: one for the whole request and optional ones per format.
+
+    The request cap is enforced by Werkzeug from ``Content-Length`` before the
+    body is read. Format caps are checked when a file part starts, from its
+    filename and the request length, so an oversized PDF is rejected without
+    buffering it.
+    """
+
+    def __init__(self, max_upload=DEFAULT_MAX_UPLOAD, format_limits=None):
+        self.max_upload = max_upload
+        self.format_limits = dict(DEFAULT_FORMAT_LIMITS if format_limits is None else format_limits)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Read FILE2MD_MAX_UPLOAD_BYTES and FILE2MD_FORMAT_LIMITS (``pdf=200MB,csv=20MB``).
+        """
+        format_limits = dict(DEFAULT_FORMAT_LIMITS)
+        for entry in os.getenv("FILE2MD_FORMAT_LIMITS", "").split(","):
+            if not entry.strip():
+                continue
+            extension, _, size = entry.partition("=")
+            format_limits[extension.strip().lstrip(".").lower()] = parse_size(size)
+        return cls(parse_size(os.getenv("FILE2MD_MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD)), format_limits)
+
+    def limit_for(self, filename):
+        """
+        Return the byte limit for ``filename``: its format cap or the request cap.
+        """
+        extension = filename.rsplit(".", 1)[1].lower() if filename and "." in filename else ""
+        limit = self.format_limits.get(extension)
+        if limit is None:
+            return self.max_upload
+        return min(limit, self.max_upload) if self.max_upload else limit
+
+    def check(self, filename, size):
+        """
+        Raise ``UploadTooLarge`` when ``size`` bytes are over the limit for ``filename``.
+        """
+        limit = self.limit_for(filename)
+        if limit and size is not None and size > limit:
+            raise UploadTooLarge(f"{filename} is larger than the {format_size(limit)} limit for this file type")
+
+
+class ByteBudget:
+    """
+    Admission control on the upload bytes held in memory or spool files at once.
+
+    Each request reserves its declared body size before the body is read.
+    A request is refused when the reservation would push the total past
+    ``max_bytes``, unless nothing else is in flight. That way a single upload
+    larger than the budget can still be served on an idle worker.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_INFLIGHT_BYTES):
+        self.max_bytes = max_bytes
+        self._in_flight = 0
+        self._requests = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(parse_size(os.getenv("FILE2MD_INFLIGHT_BYTES", DEFAULT_INFLIGHT_BYTES)))
+
+    def try_reserve(self, size):
+        """
+        Reserve ``size`` bytes, returning a reservation or ``None`` when over budget.
+        """
+        with self._lock:
+            if self.max_bytes and self._requests and self._in_flight + size > self.max_bytes:
+                self._rejected += 1
+                return None
+            self._in_flight += size
+            self._requests += 1
+        return _Reservation(self, size)
+
+    def _release(self, size):
+        with self._lock:
+            self._in_flight -= size
+            self._requests -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight_bytes": self._in_flight,
+                "in_flight_requests": self._requests,
+                "max_bytes": self.max_bytes,
+                "rejected": self._rejected,
+            }
+
+
+class _Reservation:
+    def __init__(self, budget, size):
+        self.size = size
+        self._budget = budget
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._budget._release(self.size)